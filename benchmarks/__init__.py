@@ -0,0 +1,15 @@
+"""Бенчмарки MAX Focus Campus.
+
+Запуск из корня репозитория, например: ``python -m benchmarks.bench_nlp_parser``.
+Модули проекта читают ``Config`` при импорте, поэтому бенчмарки подставляют
+фиктивный токен и временный каталог данных, чтобы не трогать ``data/``.
+Глобальные хранилища работают в режиме журнала, чтобы наполнение данных
+для замеров не переписывало файл на каждую запись.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="campus-bench-"))
+os.environ.setdefault("STORAGE_MODE", "journal")
+os.environ.setdefault("JOURNAL_COMPACT_EVERY", str(10 ** 9))
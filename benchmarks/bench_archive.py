@@ -0,0 +1,78 @@
+"""Перевод просроченных задач по индексу дедлайнов и перенос истории в архив:
+время прохода, объём горячих файлов и время их загрузки до и после."""
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.dataset import write_dataset
+from database.archive import Archive
+from database.storage import TaskStorage, FocusStorage
+from database.timezones import now_utc
+
+
+def _size(*paths) -> int:
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+def _archive_size(directory: str) -> int:
+    return _size(*(os.path.join(directory, name) for name in os.listdir(directory)))
+
+
+def _load_seconds(data_dir: str) -> float:
+    return TaskStorage(data_dir).load_seconds + FocusStorage(data_dir).load_seconds
+
+
+def run(users: int = 10_000, tasks_per_user: int = 10, sessions_per_user: int = 20, batch: int = 5_000) -> list:
+    data_dir = tempfile.mkdtemp(prefix="campus-bench-archive-")
+    write_dataset(data_dir, users=users, tasks_per_user=tasks_per_user, sessions_per_user=sessions_per_user)
+    hot_files = [os.path.join(data_dir, name) for name in ("tasks.json", "focus_sessions.json")]
+    archive = Archive(os.path.join(data_dir, "archive"))
+    task_storage = TaskStorage(data_dir, archive=archive)
+    focus_storage = FocusStorage(data_dir, archive=archive)
+
+    started = time.perf_counter()
+    overdue = len(task_storage.expire_overdue())
+    sweep_seconds = time.perf_counter() - started
+
+    hot_bytes_before = _size(*hot_files)
+    load_seconds_before = _load_seconds(data_dir)
+    stats_before = [
+        (task_storage.get_user_stats(user_id), focus_storage.get_user_stats(user_id))
+        for user_id in range(1, users + 1)
+    ]
+
+    # Граница — текущий момент: в архив уходит вся завершённая история набора
+    before = now_utc()
+    archived = 0
+    started = time.perf_counter()
+    for storage in (task_storage, focus_storage):
+        candidates = storage.archive_candidates(before)
+        for start in range(0, len(candidates), batch):
+            archived += storage.archive_history(candidates[start:start + batch])
+    archive_seconds = time.perf_counter() - started
+
+    stats_after = [
+        (task_storage.get_user_stats(user_id), focus_storage.get_user_stats(user_id))
+        for user_id in range(1, users + 1)
+    ]
+    return [{
+        "name": "history_archive",
+        "users": users,
+        "tasks": users * tasks_per_user,
+        "focus_sessions": users * sessions_per_user,
+        "overdue_marked": overdue,
+        "overdue_sweep_seconds": sweep_seconds,
+        "archived_records": archived,
+        "archive_seconds": archive_seconds,
+        "hot_bytes_before": hot_bytes_before,
+        "hot_bytes_after": _size(*hot_files),
+        "archive_bytes": _archive_size(archive.directory),
+        "load_seconds_before": load_seconds_before,
+        "load_seconds_after": _load_seconds(data_dir),
+        "stats_unchanged": stats_before == stats_after,
+    }]
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
@@ -0,0 +1,144 @@
+"""Импорт .ics-календарей через CalendarSyncService с локальным сервером-заглушкой.
+
+Сервер отдаёт сгенерированные ленты с ETag и Last-Modified и отвечает 304
+на условные запросы; замеряются первый импорт и повторная синхронизация.
+Пользователи разбиты на группы по ``group_size`` с общей ссылкой на ленту,
+поэтому сервер должен получить по одному запросу на группу.
+"""
+import asyncio
+import hashlib
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from database.storage import TaskStorage, UserStorage
+from services.calendar_sync import CalendarSyncService
+
+PORT = 18766
+
+
+def make_ics(feed_id: int, events: int, now: datetime) -> bytes:
+    """Лента с ``events`` событиями: свёрнутые строки, VALARM, TZID и UTC"""
+    rng = random.Random(feed_id)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//campus//bench//RU"]
+    for n in range(events):
+        start = now + timedelta(days=rng.randint(1, 50), hours=rng.randint(8, 18))
+        if n % 2:
+            dtstart = f"DTSTART;TZID=Europe/Moscow:{start:%Y%m%dT%H%M%S}"
+        else:
+            dtstart = f"DTSTART:{start:%Y%m%dT%H%M%S}Z"
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{feed_id}-{n}@campus.example",
+            dtstart,
+            f"SUMMARY:Контрольная по математике №{n}",
+            "DESCRIPTION:Аудитория 101\\, принести калькулятор. Длинное описание, которое",
+            " переносится на следующую строку",
+            "BEGIN:VALARM",
+            "ACTION:DISPLAY",
+            "DESCRIPTION:Напоминание",
+            "END:VALARM",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def make_app(feeds: dict, stats: dict) -> web.Application:
+    async def feed(request: web.Request) -> web.Response:
+        body, etag, modified = feeds[int(request.match_info["feed_id"])]
+        if request.headers.get("If-None-Match") == etag:
+            stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        stats["full"] += 1
+        return web.Response(
+            body=body, content_type="text/calendar", headers={"ETag": etag, "Last-Modified": modified}
+        )
+
+    app = web.Application()
+    app.router.add_get("/cal/{feed_id}.ics", feed)
+    return app
+
+
+async def _run(users: int, events: int, group_size: int) -> dict:
+    now = datetime.now()
+    modified = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime())
+    feeds = {}
+    for feed_id in range(-(-users // group_size)):
+        body = make_ics(feed_id, events, now)
+        feeds[feed_id] = (body, '"' + hashlib.md5(body).hexdigest() + '"', modified)
+    stats = {"full": 0, "not_modified": 0}
+
+    runner = web.AppRunner(make_app(feeds, stats), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        user_storage = UserStorage(data_dir)
+        task_storage = TaskStorage(data_dir)
+        # Как при работе StorageFlusher: запись на диск отложена
+        user_storage.write_behind = task_storage.write_behind = True
+        user_ids = range(1, users + 1)
+        for user_id in user_ids:
+            user = user_storage.create_user(user_id)
+            user.calendar_url = f"http://127.0.0.1:{PORT}/cal/{(user_id - 1) // group_size}.ics"
+
+        service = CalendarSyncService(
+            SimpleNamespace(user_storage=user_storage, task_storage=task_storage), concurrency=8
+        )
+        await service.start()
+        service.task.cancel()
+        try:
+            async def sync_all():
+                slots = asyncio.Semaphore(service.concurrency)
+
+                async def one(user_id):
+                    async with slots:
+                        return await service.sync_user(user_id)
+                started = time.perf_counter()
+                results = await asyncio.gather(*(one(user_id) for user_id in user_ids))
+                return time.perf_counter() - started, results
+
+            first_seconds, first = await sync_all()
+            # Следующий цикл обновления: кэш лент устарел, запросы условные
+            for feed in service._feeds.values():
+                feed["fetched_at"] -= service.interval
+            second_seconds, second = await sync_all()
+        finally:
+            await service.stop()
+            await runner.cleanup()
+        tasks = len(task_storage.tasks)
+
+    return {
+        "name": "calendar_sync",
+        "users": users,
+        "group_size": group_size,
+        "feeds": len(feeds),
+        "events_per_feed": events,
+        "first_sync_seconds": first_seconds,
+        "imported_events_per_second": users * events / first_seconds,
+        "added": sum(result.get("added", 0) for result in first),
+        "second_sync_seconds": second_seconds,
+        "not_modified": sum(result["status"] == "not_modified" for result in second),
+        "tasks": tasks,
+        "server_full_responses": stats["full"],
+        "server_not_modified": stats["not_modified"],
+    }
+
+
+def run(users: int = 200, events: int = 200) -> list:
+    return [
+        # У каждого своя лента
+        asyncio.run(_run(users, events, group_size=1)),
+        # Общая лента на группу из 25 студентов
+        asyncio.run(_run(users, events, group_size=25)),
+    ]
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
@@ -0,0 +1,61 @@
+"""Отрисовка страниц /deadlines для пользователя с большим числом задач."""
+import json
+import random
+import time
+from datetime import timedelta
+
+from database import user_storage, task_storage
+from database.models import Task
+from database.timezones import now_utc
+from routers.deadlines import PAGE_CALLBACK, deadline_pages, render_deadlines_page
+
+HEAVY_USER_ID = 10 ** 9 + 1
+
+
+def _populate(tasks: int):
+    rng = random.Random(tasks)
+    now = now_utc()
+    task_storage.add_tasks([
+        Task(HEAVY_USER_ID, f"Задача {i}", now + timedelta(minutes=rng.randint(1, 60 * 1440)))
+        for i in range(tasks)
+    ])
+    return user_storage.get_user(HEAVY_USER_ID) or user_storage.create_user(HEAVY_USER_ID)
+
+
+def _timed(func, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - started) / repeats
+
+
+def run(tasks: int = 5_000, repeats: int = 200) -> list:
+    user = _populate(tasks)
+
+    def first_page_cold():
+        deadline_pages.clear()
+        render_deadlines_page(user)
+
+    def all_pages():
+        page, after = 1, None
+        while True:
+            _, next_payload = render_deadlines_page(user, page, after)
+            if next_payload is None:
+                return page
+            page, _, after = next_payload[len(PAGE_CALLBACK):].partition(":")
+            page = int(page)
+
+    deadline_pages.clear()
+    pages = all_pages()
+    return [{
+        "name": "deadlines_page",
+        "tasks": tasks,
+        "pages": pages,
+        "first_page_cold_seconds": _timed(first_page_cold, repeats),
+        "first_page_cached_seconds": _timed(lambda: render_deadlines_page(user), repeats),
+        "all_pages_cached_seconds": _timed(all_pages, 10),
+    }]
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
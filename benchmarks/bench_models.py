@@ -0,0 +1,56 @@
+"""Память на запись и время загрузки TaskStorage/FocusStorage."""
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.dataset import write_dataset
+from database.storage import TaskStorage, FocusStorage, STORAGE_MODE_SNAPSHOT
+
+SIZES = [10_000, 100_000]
+TASKS_PER_USER = 10
+
+
+def bench_memory(data_dir: str, storage_class) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    storage = storage_class(data_dir, STORAGE_MODE_SNAPSHOT)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    records = len(storage._items())
+    return {
+        "records": records,
+        "bytes_per_record": current / records if records else 0.0,
+        "peak_bytes_per_record": peak / records if records else 0.0,
+        # Время загрузки под tracemalloc завышено, важно соотношение
+        "load_seconds_traced": elapsed,
+    }
+
+
+def bench_load(data_dir: str, storage_class) -> float:
+    started = time.perf_counter()
+    storage_class(data_dir, STORAGE_MODE_SNAPSHOT)
+    return time.perf_counter() - started
+
+
+def run(sizes=SIZES) -> list:
+    results = []
+    for size in sizes:
+        data_dir = tempfile.mkdtemp(prefix="campus-bench-models-")
+        write_dataset(data_dir, users=size // TASKS_PER_USER, tasks_per_user=TASKS_PER_USER,
+                      sessions_per_user=TASKS_PER_USER)
+        for storage_class in (TaskStorage, FocusStorage):
+            result = {"name": "models", "storage": storage_class.__name__, "size": size}
+            result.update(bench_memory(data_dir, storage_class))
+            result["load_seconds"] = bench_load(data_dir, storage_class)
+            results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
@@ -0,0 +1,72 @@
+"""Пропускная способность extract_deadline_info, iter_deadlines и кэша extract_deadlines."""
+import json
+import time
+
+from benchmarks.corpus import DATE_CASES, DIGEST_CASES, MESSAGES
+from services.nlp_parser import _parse_cache, extract_deadline_info, extract_deadlines, iter_deadlines
+
+
+def run(rounds: int = 2000) -> list:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in MESSAGES:
+            extract_deadline_info(text)
+    elapsed = time.perf_counter() - started
+
+    total = rounds * len(MESSAGES)
+    mismatches = []
+    for text, expected in DATE_CASES:
+        info = extract_deadline_info(text)
+        found = info['deadline'].date().isoformat() if info else None
+        if found != expected:
+            mismatches.append({"text": text, "expected": expected, "found": found})
+    results = [{
+        "name": "extract_deadline_info",
+        "messages": total,
+        "seconds": elapsed,
+        "messages_per_sec": total / elapsed,
+        "date_mismatches": mismatches,
+    }]
+
+    # Весь корпус одним сообщением — как пересланный дайджест
+    digest = "\n".join(MESSAGES)
+    digest_rounds = max(rounds // 10, 1)
+    started = time.perf_counter()
+    for _ in range(digest_rounds):
+        found = sum(1 for _ in iter_deadlines(digest))
+    elapsed = time.perf_counter() - started
+    results.append({
+        "name": "iter_deadlines",
+        "digests": digest_rounds,
+        "digest_chars": len(digest),
+        "deadlines_per_digest": found,
+        "seconds": elapsed,
+        "digests_per_sec": digest_rounds / elapsed,
+    })
+
+    mismatches = []
+    for text, expected in DIGEST_CASES:
+        found = [(item['title'], item['deadline'].date().isoformat()) for item in extract_deadlines(text)]
+        if found != expected:
+            mismatches.append({"text": text, "expected": expected, "found": found})
+
+    # Пересылки: каждое сообщение корпуса приходит от многих студентов подряд
+    _parse_cache.clear()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in MESSAGES:
+            extract_deadlines(text)
+    elapsed = time.perf_counter() - started
+    results.append({
+        "name": "extract_deadlines_cached",
+        "messages": total,
+        "seconds": elapsed,
+        "messages_per_sec": total / elapsed,
+        "hit_rate": _parse_cache.metrics()["hit_rate"],
+        "digest_mismatches": mismatches,
+    })
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
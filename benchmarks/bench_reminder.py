@@ -0,0 +1,108 @@
+"""Время ReminderService._check_deadlines на 10k пользователей
+и число исходящих сообщений за неделю с дайджестом и без."""
+import asyncio
+import json
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from benchmarks.dataset import write_dataset
+from benchmarks.fakes import FakeBot
+from database.models import Task
+from database.reminder_policy import policy_for
+from database.storage import UserStorage, TaskStorage
+from database.timezones import now_utc
+from services.dispatcher import MessageDispatcher
+from services.reminder import ReminderService
+
+
+class FakeCampusBot:
+    """Минимальная замена FocusCampusBot с полями, которые читают сервисы."""
+
+    def __init__(self, data_dir: str):
+        self.bot = FakeBot()
+        self.user_storage = UserStorage(data_dir)
+        self.task_storage = TaskStorage(data_dir)
+        # Как при работе StorageFlusher: запись на диск отложена
+        self.user_storage.write_behind = self.task_storage.write_behind = True
+        self.dispatcher = MessageDispatcher(self.bot.send_message)
+
+
+async def _run(users: int, tasks_per_user: int, repeats: int) -> dict:
+    data_dir = tempfile.mkdtemp(prefix="campus-bench-reminder-")
+    write_dataset(data_dir, users=users, tasks_per_user=tasks_per_user)
+    campus = FakeCampusBot(data_dir)
+    service = ReminderService(campus)
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await service._check_deadlines()
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "name": "reminder_check_deadlines",
+        "users": users,
+        "tasks": users * tasks_per_user,
+        "reminders_queued": campus.dispatcher.queue_depth,
+        "first_tick_seconds": timings[0],
+        "min_tick_seconds": min(timings),
+    }
+
+
+async def _run_week(users: int, tasks_per_user: int, digest: bool) -> dict:
+    """Неделя напоминаний с шагом в минуту: дедлайны в ближайшие 2–7 дней"""
+    campus = FakeCampusBot(tempfile.mkdtemp(prefix="campus-bench-digest-"))
+    user_storage = campus.user_storage
+    campus.task_storage = task_storage = TaskStorage(
+        campus.task_storage.data_dir,
+        reminder_policy=lambda task: policy_for(user_storage.get_user(task.user_id), task.subject),
+    )
+    task_storage.write_behind = True
+    rng = random.Random(users)
+    started_at = time.time()
+    for user_id in range(1, users + 1):
+        user = user_storage.create_user(user_id)
+        if digest:
+            user.reminder_policy = {"digest": 9}
+        task_storage.add_tasks([
+            Task(user_id, f"Задание {n}", now_utc() + timedelta(minutes=rng.randint(2 * 1440, 7 * 1440)))
+            for n in range(tasks_per_user)
+        ])
+    service = ReminderService(campus)
+    # Без ограничения частоты: отправка лишь подтверждает напоминания
+    campus.dispatcher.bucket.rate = campus.dispatcher.bucket.capacity = campus.dispatcher.bucket.tokens = 1e9
+    await campus.dispatcher.start()
+
+    busiest = 0
+    started = time.perf_counter()
+    for minute in range(1, 8 * 1440):
+        before = campus.dispatcher.queue_depth
+        await service._check_deadlines(started_at + minute * 60)
+        busiest = max(busiest, campus.dispatcher.queue_depth - before)
+    messages = campus.dispatcher.queue_depth
+    await campus.dispatcher.stop()
+    return {
+        "name": "reminder_week",
+        "digest": digest,
+        "users": users,
+        "tasks": users * tasks_per_user,
+        "reminders": sum(len(task.reminders_sent) for task in task_storage.tasks.values()),
+        "messages": messages,
+        "busiest_minute_messages": busiest,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def run(users: int = 10_000, tasks_per_user: int = 5, repeats: int = 5) -> list:
+    return [
+        asyncio.run(_run(users, tasks_per_user, repeats)),
+        # Десять дедлайнов на неделе: отдельные напоминания и дайджест в 9:00
+        asyncio.run(_run_week(users // 10, 10, digest=False)),
+        asyncio.run(_run_week(users // 10, 10, digest=True)),
+    ]
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
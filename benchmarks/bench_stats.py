@@ -0,0 +1,48 @@
+"""Задержка send_stats_message для пользователя с большой историей."""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fakes import FakeMessage
+from database import task_storage, focus_storage
+from database.models import Task, FocusSession, TaskStatus
+from services.statistics import send_stats_message
+
+HEAVY_USER_ID = 10 ** 9
+
+
+def _populate(tasks: int, sessions: int):
+    deadline = datetime.now() + timedelta(days=1)
+    for i in range(tasks):
+        task = Task(HEAVY_USER_ID, f"Задача {i}", deadline)
+        task_storage.add_task(task)
+        if i % 3:
+            task_storage.update_task_status(task.id, TaskStatus.COMPLETED)
+    for i in range(sessions):
+        session = FocusSession(HEAVY_USER_ID, 25)
+        focus_storage.add_session(session)
+        if i % 5:
+            focus_storage.mark_session_completed(session.id)
+
+
+async def _run(repeats: int) -> float:
+    message = FakeMessage(HEAVY_USER_ID, "/stats")
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await send_stats_message(message)
+    return (time.perf_counter() - started) / repeats
+
+
+def run(tasks: int = 5_000, sessions: int = 20_000, repeats: int = 50) -> list:
+    _populate(tasks, sessions)
+    return [{
+        "name": "send_stats_message",
+        "tasks": tasks,
+        "focus_sessions": sessions,
+        "latency_seconds": asyncio.run(_run(repeats)),
+    }]
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
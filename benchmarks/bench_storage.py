@@ -0,0 +1,63 @@
+"""Задержка TaskStorage.add_task и save_data и время загрузки data/*.json (обычной и lazy)."""
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.dataset import write_dataset
+from database.models import Task
+from database.storage import UserStorage, TaskStorage, FocusStorage, STORAGE_MODE_SNAPSHOT, STORAGE_MODE_JOURNAL
+
+SIZES = [1_000, 10_000, 100_000]
+TASKS_PER_USER = 10
+
+
+def bench_startup(data_dir: str, mode: str, lazy: bool = False) -> float:
+    started = time.perf_counter()
+    UserStorage(data_dir, mode, lazy=lazy)
+    TaskStorage(data_dir, mode, lazy=lazy)
+    FocusStorage(data_dir, mode, lazy=lazy)
+    return time.perf_counter() - started
+
+
+def bench_add_task(storage: TaskStorage, repeats: int) -> float:
+    deadline = datetime.now() + timedelta(days=3)
+    started = time.perf_counter()
+    for i in range(repeats):
+        storage.add_task(Task(1, f"Новая задача {i}", deadline))
+    return (time.perf_counter() - started) / repeats
+
+
+def bench_save_data(storage: TaskStorage, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        storage.save_data()
+    return (time.perf_counter() - started) / repeats
+
+
+def run(sizes=SIZES) -> list:
+    results = []
+    for size in sizes:
+        for mode in (STORAGE_MODE_SNAPSHOT, STORAGE_MODE_JOURNAL):
+            data_dir = tempfile.mkdtemp(prefix="campus-bench-storage-")
+            write_dataset(data_dir, users=size // TASKS_PER_USER, tasks_per_user=TASKS_PER_USER,
+                          sessions_per_user=TASKS_PER_USER)
+            startup = bench_startup(data_dir, mode)
+            startup_lazy = bench_startup(data_dir, mode, lazy=True)
+
+            storage = TaskStorage(data_dir, mode, compact_every=10 ** 9)
+            repeats = 3 if size >= 100_000 and mode == STORAGE_MODE_SNAPSHOT else 20
+            results.append({
+                "name": "storage",
+                "mode": mode,
+                "tasks": size,
+                "startup_seconds": startup,
+                "startup_lazy_seconds": startup_lazy,
+                "add_task_seconds": bench_add_task(storage, repeats),
+                "save_data_seconds": bench_save_data(storage, 3),
+            })
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
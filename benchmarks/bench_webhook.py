@@ -0,0 +1,111 @@
+"""Пропускная способность WebhookServer и локальный отправитель апдейтов.
+
+``python -m benchmarks.bench_webhook`` поднимает сервер в процессе
+с обработчиком-заглушкой; ``--url http://localhost:8000/webhook`` вместо
+этого шлёт апдейты в запущенного бота (``INGRESS_MODE=webhook``).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import aiohttp
+
+from benchmarks.corpus import MESSAGES
+from services.webhook import SECRET_HEADER, WebhookServer
+
+PORT = 18765
+
+
+def make_update(seq: int, user_id: int, text: str) -> dict:
+    """Апдейт message_created в формате MAX API"""
+    now = int(time.time() * 1000)
+    return {
+        "update_type": "message_created",
+        "timestamp": now,
+        "message": {
+            "sender": {"user_id": user_id, "first_name": "Студент", "name": "Студент", "is_bot": False,
+                       "last_activity_time": now},
+            "recipient": {"chat_id": user_id, "chat_type": "dialog", "user_id": user_id},
+            "timestamp": now,
+            "body": {"mid": f"mid.{seq}", "seq": seq, "text": text},
+        },
+        "user_locale": "ru",
+    }
+
+
+async def send_updates(url: str, count: int, concurrency: int, users: int = 100,
+                       secret: str = None) -> dict:
+    """Шлёт ``count`` апдейтов ``concurrency`` параллельными запросами"""
+    headers = {SECRET_HEADER: secret} if secret else {}
+    statuses = {}
+    latencies = []
+    seq = itertools.count()
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def sender():
+            while (n := next(seq)) < count:
+                update = make_update(n, 1 + n % users, MESSAGES[n % len(MESSAGES)])
+                started = time.perf_counter()
+                async with session.post(url, json=update) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(sender() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "updates": count,
+        "seconds": elapsed,
+        "updates_per_second": count / elapsed,
+        "ack_latency_p50": latencies[len(latencies) // 2],
+        "ack_latency_p99": latencies[int(len(latencies) * 0.99)],
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+    }
+
+
+async def _run(count: int, concurrency: int, handler_delay: float, queue_size: int) -> dict:
+    async def handle(update):
+        await asyncio.sleep(handler_delay)
+
+    server = WebhookServer(handle, host="127.0.0.1", port=PORT, workers=16, queue_size=queue_size)
+    await server.start()
+    try:
+        result = await send_updates(f"http://127.0.0.1:{PORT}/webhook", count, concurrency)
+    finally:
+        await server.stop(timeout=60)
+    result.update(name="webhook", handler_delay=handler_delay, queue_size=queue_size,
+                  processed=server.processed, rejected=server.rejected)
+    return result
+
+
+def run(count: int = 5_000) -> list:
+    return [
+        asyncio.run(_run(count, concurrency=50, handler_delay=0.0, queue_size=1000)),
+        # Медленные обработчики: очередь заполняется, лишнее отклоняется с 503
+        asyncio.run(_run(count // 5, concurrency=50, handler_delay=0.05, queue_size=100)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send fake MAX updates to a webhook")
+    parser.add_argument("--url", help="running bot webhook URL (in-process server by default)")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--secret")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(send_updates(args.url, args.count, args.concurrency, args.users, args.secret))
+    else:
+        results = run(args.count)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Корпус типичных сообщений студентов для бенчмарков парсера."""
+
+MESSAGES = [
+    "Сдать лабу по физике до 12.12",
+    "Контрольная по математике 15 декабря, не забыть повторить интегралы",
+    "Курсовая по программированию на Python сдаётся 20.05.2025",
+    "Эссе по английскому через 3 дня, тема: my future career",
+    "Привет! Кто-нибудь знает, когда коллоквиум по алгебре?",
+    "Домашка по геометрии: задачи 1-15, сдать до 01.10",
+    "Ребята, дедлайн по проекту на Java перенесли на 28 ноября",
+    "Лабораторная по оптике №4 — защита 03.03.26",
+    "Нужно прочитать главу про термодинамику через 7 дней будет тест",
+    "Speaking club в четверг, подготовить доклад",
+    "Реферат по истории 10 октября",
+    "Алгоритмы и структуры данных: ДЗ 5 до 15.11",
+    "Зачёт по механике 25 января в 10:00, аудитория 305",
+    "Сегодня пары отменили, отдыхаем",
+    "Не забудьте скинуть отчёт по практике через 2 дня",
+    "Семинар по матанализу перенесён, новая дата 17.02.2026",
+    "Напоминаю: тест по English grammar 5 марта",
+    "Код ревью проекта до 30.09, пушим в ветку dev",
+    "Коллеги, отчёт по НИР сдаём 1 июня, шаблон в чате",
+    "Кто идёт в столовую?",
+    "Экзамен по физике 20 июня, консультация 18 июня",
+    "Презентация по language processing до 22.04",
+    "Расчётно-графическая работа по теормеху 14.04.2025",
+    "Лекция по прогаммированию будет онлайн, ссылка позже",
+    "Сдать конспект по геометрии через 1 день",
+    "Олимпиада по программированию 9 апреля, регистрация открыта",
+    "Ссылка на таблицу с оценками: https://example.com/grades",
+    "Задание по английскому: написать письмо, срок 2 февраля",
+    "Итоговый проект по алгоритмам — дедлайн 31.05.2025 23:59",
+    "У кого есть методичка по оптике? Скиньте пожалуйста",
+    "Сдать до 12.12.2026 лабу",
+    "Отчёт до 05.06.2027",
+]
+
+# Сообщения с однозначной датой (с годом) и ожидаемый срок в формате ГГГГ-ММ-ДД
+DATE_CASES = [
+    ("Курсовая по программированию на Python сдаётся 20.05.2025", "2025-05-20"),
+    ("Семинар по матанализу перенесён, новая дата 17.02.2026", "2026-02-17"),
+    # «до» перед полной датой не должно сокращать её до «до 12.1»
+    ("Сдать до 12.12.2026 лабу", "2026-12-12"),
+    ("Отчёт до 05.06.2027", "2027-06-05"),
+]
+
+# Многострочные объявления для extract_deadlines: ожидаемые (название, ГГГГ-ММ-ДД) по порядку
+DIGEST_CASES = [
+    (
+        "Дедлайны на семестр:\n"
+        "1) Сдать до 12.12.2026 лабу по физике\n"
+        "2) Отчёт до 05.06.2027\n"
+        "3) Курсовая сдаётся 20.05.2027",
+        [
+            ("Сдать до 12.12.2026", "2026-12-12"),
+            ("Отчёт до 05.06.2027", "2027-06-05"),
+            ("Курсовая сдаётся 20.05.2027", "2027-05-20"),
+        ],
+    ),
+]
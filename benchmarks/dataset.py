@@ -0,0 +1,68 @@
+"""Генерация синтетических data/*.json в формате хранилищ."""
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+SUBJECTS = ["математика", "программирование", "физика", "английский", "другое"]
+STATUSES = ["ожидает", "выполнено", "выполнено", "просрочено"]
+
+
+def write_dataset(data_dir: str, users: int, tasks_per_user: int, sessions_per_user: int = 0):
+    """Пишет users.json, tasks.json и focus_sessions.json; возвращает число записей."""
+    os.makedirs(data_dir, exist_ok=True)
+    now = datetime.now()
+
+    user_records = {}
+    task_records = {}
+    session_records = {}
+    for user_id in range(1, users + 1):
+        user_records[str(user_id)] = {
+            "user_id": user_id,
+            "university": "МФТИ",
+            "group": f"Б05-{user_id % 1000:03d}",
+            "role": "бакалавр",
+            "calendar_url": None,
+            "tags": ["математика", "физика"],
+            "onboarding_completed": True,
+            "created_at": now.isoformat(),
+        }
+        for i in range(tasks_per_user):
+            task_id = str(uuid.uuid4())
+            task_records[task_id] = {
+                "id": task_id,
+                "user_id": user_id,
+                "title": f"Лабораторная работа №{i}",
+                "description": None,
+                "deadline": (now + timedelta(hours=(user_id * 13 + i * 37) % 840 - 120)).isoformat(),
+                "subject": SUBJECTS[i % len(SUBJECTS)],
+                "tags": [],
+                "status": STATUSES[i % len(STATUSES)],
+                "priority": 1,
+                "estimated_pomodoros": 1,
+                "completed_pomodoros": 0,
+            }
+        for i in range(sessions_per_user):
+            session_id = str(uuid.uuid4())
+            session_records[session_id] = {
+                "id": session_id,
+                "user_id": user_id,
+                "task_id": None,
+                "start_time": (now - timedelta(hours=i)).isoformat(),
+                "duration": 25,
+                "completed": True,
+            }
+
+    for name, records in (
+        ("users.json", user_records),
+        ("tasks.json", task_records),
+        ("focus_sessions.json", session_records),
+    ):
+        with open(os.path.join(data_dir, name), "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+
+    return {
+        "users": len(user_records),
+        "tasks": len(task_records),
+        "focus_sessions": len(session_records),
+    }
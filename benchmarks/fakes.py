@@ -0,0 +1,32 @@
+"""Заглушки aiomax для бенчмарков: бот и сообщение без сетевых запросов."""
+from aiomax.fsm import FSMStorage
+
+
+class FakeSender:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+
+
+class FakeBot:
+    """Вместо API складывает отправленные сообщения в список."""
+
+    def __init__(self):
+        self.storage = FSMStorage()
+        self.sent = []
+
+    async def send_message(self, text=None, user_id=None, **kwargs):
+        # Как и API, возвращает отправленное сообщение (диспетчер отличает его от неудачи)
+        message = (user_id, text)
+        self.sent.append(message)
+        return message
+
+
+class FakeMessage:
+    def __init__(self, user_id: int, content: str = "", bot: FakeBot = None):
+        self.sender = FakeSender(user_id)
+        self.content = content
+        self.bot = bot or FakeBot()
+        self.replies = []
+
+    async def reply(self, text=None, **kwargs):
+        self.replies.append(text)
@@ -0,0 +1,66 @@
+"""Запуск всех бенчмарков с выводом результатов в JSON.
+
+``python -m benchmarks.run --output bench.json`` — полный прогон;
+``--quick`` уменьшает объёмы данных для быстрой проверки.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import (
+    bench_archive, bench_calendar, bench_deadlines, bench_models, bench_nlp_parser, bench_reminder, bench_stats, bench_storage,
+    bench_webhook,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MAX Focus Campus benchmarks")
+    parser.add_argument("--output", help="file to write JSON results to (stdout by default)")
+    parser.add_argument("--quick", action="store_true", help="smaller datasets")
+    args = parser.parse_args()
+
+    if args.quick:
+        suites = [
+            lambda: bench_nlp_parser.run(rounds=200),
+            lambda: bench_storage.run(sizes=[1_000, 10_000]),
+            lambda: bench_models.run(sizes=[10_000]),
+            lambda: bench_reminder.run(users=1_000),
+            lambda: bench_stats.run(tasks=500, sessions=2_000),
+            lambda: bench_deadlines.run(tasks=1_000),
+            lambda: bench_webhook.run(count=1_000),
+            lambda: bench_calendar.run(users=20, events=50),
+            lambda: bench_archive.run(users=1_000),
+        ]
+    else:
+        suites = [
+            bench_nlp_parser.run, bench_storage.run, bench_models.run,
+            bench_reminder.run, bench_stats.run, bench_deadlines.run, bench_webhook.run, bench_calendar.run,
+            bench_archive.run,
+        ]
+
+    started = time.perf_counter()
+    results = []
+    for suite in suites:
+        results.extend(suite())
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "total_seconds": time.perf_counter() - started,
+        "results": results,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
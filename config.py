@@ -10,4 +10,91 @@ class Config:
         raise ValueError(
             "BOT_TOKEN not found in environment variables. "
             "Please create .env file with BOT_TOKEN=your_bot_token"
-        )
\ No newline at end of file
+        )
+
+    # Шардирование (sharding.py): число процессов-воркеров и номер текущего;
+    # воркер хранит данные в подкаталоге shard-<n> каталога DATA_DIR
+    SHARDS = int(os.getenv("SHARDS", "1"))
+    SHARD_INDEX = int(os.getenv("SHARD_INDEX")) if os.getenv("SHARD_INDEX") else None
+
+    # Хранилище: каталог с данными и режим записи (snapshot | journal)
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    if SHARD_INDEX is not None:
+        DATA_DIR = os.path.join(DATA_DIR, f"shard-{SHARD_INDEX}")
+    STORAGE_MODE = os.getenv("STORAGE_MODE", "snapshot")
+    JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", "1000"))
+    # Период фонового сброса JSON-хранилищ на диск; 0 — синхронная запись
+    STORAGE_FLUSH_INTERVAL_MS = int(os.getenv("STORAGE_FLUSH_INTERVAL_MS", "500"))
+    # Быстрый старт: история (завершённые задачи и сессии) загружается по требованию
+    STORAGE_LAZY_LOAD = os.getenv("STORAGE_LAZY_LOAD", "false").lower() in ("1", "true", "yes")
+
+    # Движок хранения: json (файлы в DATA_DIR) или sqlite
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+    SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(DATA_DIR, "campus.db"))
+    # Размер LRU-кэша профилей пользователей в SQLite-режиме
+    SQLITE_USER_CACHE_SIZE = int(os.getenv("SQLITE_USER_CACHE_SIZE", "10000"))
+
+    # Получение апдейтов: polling (long polling) или webhook (HTTP-сервер)
+    INGRESS_MODE = os.getenv("INGRESS_MODE", "polling")
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8000"))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    # Публичный HTTPS-адрес для подписки через /subscriptions (пусто — не подписываться)
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+    WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+    # Метрики Prometheus на /metrics; в режиме webhook на том же порту
+    # отдаются сервером вебхуков, воркер шарда n слушает METRICS_PORT + 1 + n
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "8000"))
+
+    # FSM-состояния сценариев: persistent (переживают рестарт) или memory
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "persistent")
+    FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+
+    # Найденные в сообщениях дедлайны, ожидающие подтверждения пользователем
+    PENDING_DEADLINES_TTL = int(os.getenv("PENDING_DEADLINES_TTL", "3600"))
+    PENDING_DEADLINES_MAX = int(os.getenv("PENDING_DEADLINES_MAX", "10000"))
+    PENDING_DEADLINES_PERSIST = os.getenv("PENDING_DEADLINES_PERSIST", "true").lower() in ("1", "true", "yes")
+
+    # Пояс по умолчанию: для пользователей, не указавших свой (/timezone),
+    # и для дат без пояса из старых записей
+    DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Europe/Moscow")
+
+    # Напоминания о дедлайнах по умолчанию: за сколько минут до срока (через запятую);
+    # сколько смещений пользователь может задать командой /reminders
+    REMINDER_OFFSETS = [int(minutes) for minutes in os.getenv("REMINDER_OFFSETS", "1440,180,30").split(",")]
+    REMINDER_MAX_OFFSETS = int(os.getenv("REMINDER_MAX_OFFSETS", "5"))
+    # Режим дайджеста (/reminders дайджест): напоминания собираются в одно сообщение
+    # раз в REMINDER_DIGEST_WINDOW минут, начиная с часа REMINDER_DIGEST_HOUR по местному времени
+    REMINDER_DIGEST_WINDOW = int(os.getenv("REMINDER_DIGEST_WINDOW", "1440"))
+    REMINDER_DIGEST_HOUR = int(os.getenv("REMINDER_DIGEST_HOUR", "9"))
+
+    # Активная задача получает статус «просрочено» через OVERDUE_GRACE_MINUTES после срока
+    OVERDUE_GRACE_MINUTES = int(os.getenv("OVERDUE_GRACE_MINUTES", "0"))
+    # Архив истории: завершённые и просроченные задачи и завершённые фокус-сессии старше
+    # ARCHIVE_AFTER_DAYS дней раз в ARCHIVE_INTERVAL секунд переносятся из памяти
+    # в сжатые файлы ARCHIVE_DIR пачками по ARCHIVE_BATCH записей
+    ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+    ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", "86400"))
+    ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "5000"))
+
+    # Синхронизация календарей пользователей (.ics): период обновления в секундах,
+    # случайный разброс (доля периода), число одновременных загрузок
+    CALENDAR_SYNC_ENABLED = os.getenv("CALENDAR_SYNC_ENABLED", "true").lower() in ("1", "true", "yes")
+    CALENDAR_SYNC_INTERVAL = int(os.getenv("CALENDAR_SYNC_INTERVAL", "3600"))
+    CALENDAR_SYNC_JITTER = float(os.getenv("CALENDAR_SYNC_JITTER", "0.1"))
+    CALENDAR_SYNC_CONCURRENCY = int(os.getenv("CALENDAR_SYNC_CONCURRENCY", "8"))
+    CALENDAR_SYNC_HORIZON_DAYS = int(os.getenv("CALENDAR_SYNC_HORIZON_DAYS", "60"))
+    CALENDAR_FETCH_TIMEOUT = int(os.getenv("CALENDAR_FETCH_TIMEOUT", "30"))
+    CALENDAR_MAX_BYTES = int(os.getenv("CALENDAR_MAX_BYTES", str(5 * 1024 * 1024)))
+
+    # Исходящие сообщения фоновых сервисов (напоминания, таймеры)
+    DISPATCH_CONCURRENCY = int(os.getenv("DISPATCH_CONCURRENCY", "8"))
+    DISPATCH_RATE = float(os.getenv("DISPATCH_RATE", "25"))
+    DISPATCH_BURST = float(os.getenv("DISPATCH_BURST", "25"))
+    DISPATCH_MAX_RETRIES = int(os.getenv("DISPATCH_MAX_RETRIES", "3"))
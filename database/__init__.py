@@ -1,5 +1,49 @@
-from .storage import UserStorage, TaskStorage, FocusStorage
+import time
 
-user_storage = UserStorage()
-task_storage = TaskStorage()
-focus_storage = FocusStorage()
\ No newline at end of file
+from config import Config
+from .archive import Archive
+from .reminder_policy import policy_for
+
+_started = time.perf_counter()
+
+
+def _task_policy(task):
+    # Правило напоминаний по настройкам владельца задачи (/reminders, /timezone)
+    return policy_for(user_storage.get_user(task.user_id), task.subject)
+
+
+# Сжатый архив завершённой истории; без него история остаётся в основном хранилище
+archive = Archive(Config.ARCHIVE_DIR) if Config.ARCHIVE_ENABLED else None
+
+
+if Config.STORAGE_BACKEND == "sqlite":
+    from .sqlite_storage import (
+        connect, SQLiteUserStorage, SQLiteTaskStorage, SQLiteFocusStorage, SQLiteFSMStorage,
+        SQLitePendingDeadlineStorage,
+    )
+
+    _connection = connect(Config.SQLITE_PATH)
+    user_storage = SQLiteUserStorage(_connection, cache_size=Config.SQLITE_USER_CACHE_SIZE)
+    task_storage = SQLiteTaskStorage(_connection, reminder_policy=_task_policy, archive=archive)
+    focus_storage = SQLiteFocusStorage(_connection, archive=archive)
+    fsm_store = SQLiteFSMStorage(_connection)
+    pending_store = SQLitePendingDeadlineStorage(_connection)
+else:
+    from .storage import UserStorage, TaskStorage, FocusStorage, FSMStateStorage, PendingDeadlineStorage
+
+    _storage_options = dict(
+        data_dir=Config.DATA_DIR,
+        mode=Config.STORAGE_MODE,
+        compact_every=Config.JOURNAL_COMPACT_EVERY,
+        lazy=Config.STORAGE_LAZY_LOAD,
+    )
+
+    user_storage = UserStorage(**_storage_options)
+    task_storage = TaskStorage(**_storage_options, reminder_policy=_task_policy, archive=archive)
+    focus_storage = FocusStorage(**_storage_options, archive=archive)
+    fsm_store = FSMStateStorage(**_storage_options)
+    pending_store = PendingDeadlineStorage(**_storage_options)
+
+# Время загрузки хранилищ; логируется при старте бота (логирование
+# настраивается в main.py уже после импорта этого модуля)
+startup_seconds = time.perf_counter() - _started
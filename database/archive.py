@@ -0,0 +1,128 @@
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .models import TaskStatus
+
+logger = logging.getLogger("max_focus_campus.archive")
+
+# Статусы задач, которые переносятся в архив, и их счётчики в сводке архива
+TASK_COUNTERS = {TaskStatus.COMPLETED: "completed_tasks", TaskStatus.OVERDUE: "overdue_tasks"}
+
+
+class Archive:
+    """Холодное хранилище истории: сжатые сегменты JSON Lines.
+
+    Записи одного вида (``tasks``, ``sessions``) раскладываются по месяцам
+    даты записи: ``<kind>-YYYY-MM.jsonl.gz``. Каждая пачка дописывается
+    в сегмент отдельным gzip-членом, поэтому сегмент не переписывается.
+    Счётчики для /stats хранятся сводкой в ``summary.json`` и читаются
+    без распаковки сегментов.
+
+    Сегмент пишется раньше, чем запись удаляется из горячего хранилища:
+    при сбое между этими шагами запись может попасть в архив повторно,
+    но не теряется.
+    """
+
+    SUMMARY_FILE = "summary.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.summary_path = os.path.join(directory, self.SUMMARY_FILE)
+        # user_id -> {имя счётчика: значение}
+        self.user_stats: Dict[int, Dict[str, int]] = {}
+        if os.path.exists(self.summary_path):
+            try:
+                with open(self.summary_path, "r", encoding="utf-8") as f:
+                    self.user_stats = {int(user_id): stats for user_id, stats in json.load(f).items()}
+            except Exception as e:
+                logger.error(f"Error loading {self.summary_path}: {e}")
+
+    def _segment_path(self, kind: str, month: str) -> str:
+        return os.path.join(self.directory, f"{kind}-{month}.jsonl.gz")
+
+    def append(self, kind: str, records: List[Tuple[datetime, dict]], counters: Dict[int, Dict[str, int]]):
+        """Дописывает пачку записей (дата, словарь) и прибавляет ``counters`` к сводке"""
+        if not records:
+            return
+        self.write(kind, records, counters)
+        self.add_counters(counters)
+
+    def write(self, kind: str, records: List[Tuple[datetime, dict]], counters: Dict[int, Dict[str, int]]):
+        """Дисковая часть ``append``: сегменты и сводка с учётом ``counters``.
+
+        Счётчики в памяти не меняются, поэтому метод можно вызывать
+        из отдельного потока; ``add_counters`` вызывается после него
+        в цикле событий, вместе с удалением записей из горячего хранилища.
+        """
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        by_month: Dict[str, List[dict]] = {}
+        for moment, record in records:
+            by_month.setdefault(moment.strftime("%Y-%m"), []).append(record)
+        for month, batch in by_month.items():
+            with open(self._segment_path(kind, month), "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                    for record in batch:
+                        f.write(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8"))
+                        f.write(b"\n")
+                raw.flush()
+                os.fsync(raw.fileno())
+
+        summary = {user_id: dict(stats) for user_id, stats in self.user_stats.items()}
+        self._merge(summary, counters)
+        self._write_summary(summary)
+        logger.info(f"Archived {len(records)} {kind} records into {len(by_month)} segments")
+
+    def add_counters(self, counters: Dict[int, Dict[str, int]]):
+        """Прибавляет ``counters`` к сводке в памяти (файл уже записан ``write``)"""
+        self._merge(self.user_stats, counters)
+
+    @staticmethod
+    def _merge(summary: Dict[int, Dict[str, int]], counters: Dict[int, Dict[str, int]]):
+        for user_id, values in counters.items():
+            stats = summary.setdefault(user_id, {})
+            for name, value in values.items():
+                stats[name] = stats.get(name, 0) + value
+
+    def _write_summary(self, summary: Dict[int, Dict[str, int]]):
+        tmp_path = self.summary_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({str(user_id): stats for user_id, stats in summary.items()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.summary_path)
+
+    def get_user_stats(self, user_id: int) -> Dict[str, int]:
+        return dict(self.user_stats.get(user_id, {}))
+
+    def iter_records(
+        self, kind: str, user_id: Optional[int] = None, since: Optional[datetime] = None
+    ) -> Iterator[dict]:
+        """Записи из архива по порядку месяцев; ``since`` пропускает более ранние сегменты.
+
+        Фильтр по ``since`` грубый (по месяцу сегмента), точное сравнение дат —
+        на стороне вызывающего.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        prefix = f"{kind}-"
+        first_month = since.strftime("%Y-%m") if since else ""
+        for name in sorted(os.listdir(self.directory)):
+            if not name.startswith(prefix) or not name.endswith(".jsonl.gz"):
+                continue
+            if name[len(prefix):len(prefix) + 7] < first_month:
+                continue
+            try:
+                with gzip.open(os.path.join(self.directory, name), "rt", encoding="utf-8") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if user_id is None or record.get("user_id") == user_id:
+                            yield record
+            except (OSError, EOFError, json.JSONDecodeError) as e:
+                # Оборванный последний член gzip после сбоя: читаем, что успели записать
+                logger.warning(f"Stopped reading damaged archive segment {name}: {e}")
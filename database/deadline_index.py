@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .models import Task
+from .reminder_policy import DEFAULT_POLICY, MAX_GRACE, ReminderPolicy
+from .timezones import timestamp
+
+
+class DeadlineIndex:
+    """Глобальная очередь напоминаний, упорядоченная по времени срабатывания.
+
+    Для каждой активной задачи в min-heap лежит по записи на каждый момент
+    срабатывания из её правила напоминаний (``policy_for(task)``, по умолчанию
+    ``DEFAULT_POLICY``); уже отправленные напоминания (``task.reminders_sent``)
+    не планируются. Удаление ленивое: у задачи есть номер версии,
+    и устаревшие записи отбрасываются при извлечении.
+
+    Моменты срабатывания заранее переводятся в целые секунды Unix-времени:
+    сравнение не зависит от поясов и не создаёт объектов datetime.
+
+    Во второй куче лежат сами сроки активных задач (с той же версией):
+    по ней фоновый сервис находит просроченные задачи (``pop_expired``),
+    не обходя хранилище.
+    """
+
+    def __init__(self, policy_for: Optional[Callable[[Task], ReminderPolicy]] = None):
+        self.policy_for = policy_for
+        self._heap: List[Tuple[int, int, str, int, int]] = []
+        self._expiry: List[Tuple[int, int, str]] = []
+        self._versions: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._listeners: List[Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Подписка на появление новых записей (например, чтобы разбудить планировщик)."""
+        self._listeners.append(callback)
+
+    def clear(self):
+        self._heap = []
+        self._expiry = []
+        self._versions = {}
+
+    def add(self, task: Task, now: Optional[float] = None):
+        """Добавляет (или перепланирует) напоминания и срок задачи."""
+        now = time.time() if now is None else now
+        version = self._versions[task.id] = next(self._counter)
+        deadline = timestamp(task.deadline)
+        heapq.heappush(self._expiry, (deadline, version, task.id))
+
+        policy = self.policy_for(task) if self.policy_for else DEFAULT_POLICY
+        for fire_at, offset, grace in policy.fire_times(deadline, now):
+            if fire_at + grace < now or offset in task.reminders_sent:
+                continue
+            heapq.heappush(self._heap, (fire_at, version, task.id, offset, grace))
+
+        for callback in self._listeners:
+            callback()
+
+    def retry(self, task_id: str, offset: int, at: float):
+        """Повторно планирует напоминание задачи на момент ``at`` (после неудачной отправки).
+
+        Перепланирование или снятие задачи отменяет и повтор.
+        """
+        version = self._versions.get(task_id)
+        if version is None:
+            return
+        heapq.heappush(self._heap, (int(at), version, task_id, offset, MAX_GRACE))
+        for callback in self._listeners:
+            callback()
+
+    def discard(self, task_id: str):
+        """Снимает все будущие напоминания и срок задачи."""
+        self._versions.pop(task_id, None)
+
+    def _drop_stale(self, heap: list):
+        while heap:
+            version, task_id = heap[0][1], heap[0][2]
+            if self._versions.get(task_id) == version:
+                return
+            heapq.heappop(heap)
+
+    def next_fire_time(self) -> Optional[int]:
+        """Unix-время ближайшего напоминания"""
+        self._drop_stale(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Tuple[str, int, int]]:
+        """Извлекает все наступившие напоминания как (task_id, смещение, момент срабатывания).
+
+        Напоминания, опоздавшие больше чем на допустимое окно, пропускаются.
+        """
+        now = time.time() if now is None else now
+        due = []
+        while True:
+            self._drop_stale(self._heap)
+            if not self._heap or self._heap[0][0] > now:
+                break
+            fire_at, _, task_id, offset, grace = heapq.heappop(self._heap)
+            if fire_at + grace >= now:
+                due.append((task_id, offset, fire_at))
+        return due
+
+    def next_expiry_time(self) -> Optional[int]:
+        """Unix-время ближайшего срока активной задачи"""
+        self._drop_stale(self._expiry)
+        return self._expiry[0][0] if self._expiry else None
+
+    def pop_expired(self, now: Optional[float] = None) -> List[str]:
+        """Извлекает задачи, срок которых наступил к ``now``; их напоминания снимаются."""
+        now = time.time() if now is None else now
+        expired = []
+        while True:
+            self._drop_stale(self._expiry)
+            if not self._expiry or self._expiry[0][0] > now:
+                break
+            _, _, task_id = heapq.heappop(self._expiry)
+            self._versions.pop(task_id, None)
+            expired.append(task_id)
+        return expired
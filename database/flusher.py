@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import List
+
+from .storage import JsonStorage
+
+logger = logging.getLogger("max_focus_campus.flusher")
+
+
+class StorageFlusher:
+    """Фоновый сброс JSON-хранилищ на диск.
+
+    Пока флашер запущен, мутации только помечают записи изменёнными,
+    а раз в ``interval_ms`` все накопленные изменения пишутся одной
+    атомарной записью на хранилище. При остановке выполняется финальный сброс.
+    """
+
+    def __init__(self, storages, interval_ms: int = 500):
+        # SQLite-хранилища пишут транзакционно и в сбросе не нуждаются
+        self.storages: List[JsonStorage] = [
+            storage for storage in storages if isinstance(storage, JsonStorage)
+        ]
+        self.interval = interval_ms / 1000
+        self.task = None
+        self._stopping = None
+
+    async def start(self):
+        if not self.storages or self.interval <= 0:
+            return
+        for storage in self.storages:
+            storage.write_behind = True
+        self._stopping = asyncio.Event()
+        self.task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Storage flusher started (every {int(self.interval * 1000)} ms)")
+
+    async def stop(self):
+        if self.task is None:
+            return
+        # Не отменяем задачу, чтобы не прервать запись на середине
+        self._stopping.set()
+        await self.task
+        self.task = None
+
+        await self.flush()
+        for storage in self.storages:
+            storage.write_behind = False
+        logger.info("Storage flusher stopped")
+
+    async def flush(self):
+        for storage in self.storages:
+            await storage.flush_async()
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error in storage flusher: {e}")
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import Any, List
+
+from aiomax.fsm import FSMStorage
+
+from metrics import registry
+
+FSM_CACHE = registry.counter(
+    "campus_fsm_cache_total", "FSM state lookups by cache result (hit, miss)", ["result"]
+)
+
+
+class PersistentFSMStorage(FSMStorage):
+    """FSM-хранилище aiomax поверх постоянного хранилища.
+
+    ``store`` — ``FSMStateStorage`` (JSON) или ``SQLiteFSMStorage``
+    с методами ``load``, ``save`` и ``delete``. Перед ним стоит LRU-кэш
+    на ``cache_size`` пользователей: повторные обращения активных
+    пользователей (в том числе «состояния нет») не доходят до хранилища.
+    Каждое изменение сразу передаётся в ``store``.
+    """
+
+    def __init__(self, store, cache_size: int = 10_000):
+        super().__init__()
+        self.store = store
+        self.cache_size = cache_size
+        # user_id -> [state, data]
+        self._cache: "OrderedDict[int, List[Any]]" = OrderedDict()
+
+    def _entry(self, user_id: int) -> List[Any]:
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            self._cache.move_to_end(user_id)
+            FSM_CACHE.inc("hit")
+            return entry
+
+        FSM_CACHE.inc("miss")
+        loaded = self.store.load(user_id)
+        entry = list(loaded) if loaded is not None else [None, None]
+        self._cache[user_id] = entry
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return entry
+
+    def _save(self, user_id: int, entry: List[Any]):
+        if entry[0] is None and entry[1] is None:
+            self.store.delete(user_id)
+        else:
+            self.store.save(user_id, entry[0], entry[1])
+
+    def get_state(self, user_id: int) -> Any:
+        return self._entry(user_id)[0]
+
+    def get_data(self, user_id: int) -> Any:
+        return self._entry(user_id)[1]
+
+    def change_state(self, user_id: int, new: Any):
+        entry = self._entry(user_id)
+        entry[0] = new
+        self._save(user_id, entry)
+
+    def change_data(self, user_id: int, new: Any):
+        entry = self._entry(user_id)
+        entry[1] = new
+        self._save(user_id, entry)
+
+    def clear_state(self, user_id: int) -> Any:
+        entry = self._entry(user_id)
+        old, entry[0] = entry[0], None
+        self._save(user_id, entry)
+        return old
+
+    def clear_data(self, user_id: int) -> Any:
+        entry = self._entry(user_id)
+        old, entry[1] = entry[1], None
+        self._save(user_id, entry)
+        return old
+
+    def clear(self, user_id: int):
+        entry = self._entry(user_id)
+        if entry[0] is not None or entry[1] is not None:
+            entry[0] = entry[1] = None
+            self.store.delete(user_id)
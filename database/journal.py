@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger("max_focus_campus.journal")
+
+
+class Journal:
+    """Журнал изменений хранилища: одна JSON-запись на строку, только дозапись.
+
+    Каждая мутация дописывает в конец файла запись вида
+    ``{"op": "put" | "del", "key": ..., "data": {...}}``. При старте журнал
+    проигрывается поверх снапшота, а при компактации обнуляется.
+    """
+
+    PUT = "put"
+    DELETE = "del"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def append(self, op: str, key: str, data: Optional[dict] = None):
+        record = {"op": op, "key": key}
+        if data is not None:
+            record["data"] = data
+        f = self._open()
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        self.count += 1
+
+    def replay(self) -> Iterator[Tuple[str, str, Optional[dict]]]:
+        """Читает журнал по порядку; обрезанная последняя строка пропускается."""
+        self.count = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping broken journal record {self.path}:{line_no}")
+                    continue
+                self.count += 1
+                yield record["op"], record["key"], record.get("data")
+
+    def truncate(self):
+        """Очищает журнал после того, как его содержимое попало в снапшот."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,76 @@
+"""Однократный перенос данных из JSON-файлов в SQLite.
+
+Запуск: ``python -m database.migrate --data-dir data --db data/campus.db``
+"""
+import argparse
+
+from .sqlite_storage import (
+    connect, SQLiteUserStorage, SQLiteTaskStorage, SQLiteFocusStorage, SQLiteFSMStorage,
+    SQLitePendingDeadlineStorage,
+)
+from .storage import (
+    UserStorage, TaskStorage, FocusStorage, FSMStateStorage, PendingDeadlineStorage,
+    STORAGE_MODE_JOURNAL,
+)
+
+
+def migrate_json_to_sqlite(data_dir: str, db_path: str) -> dict:
+    """Переносит пользователей, задачи, фокус-сессии, состояния FSM
+    и неподтверждённые дедлайны одной транзакцией.
+
+    Повторный запуск безопасен: записи с теми же id перезаписываются.
+    """
+    # Журнальный режим проигрывает незаписанный в снапшот журнал
+    users = UserStorage(data_dir, STORAGE_MODE_JOURNAL)
+    tasks = TaskStorage(data_dir, STORAGE_MODE_JOURNAL)
+    sessions = FocusStorage(data_dir, STORAGE_MODE_JOURNAL)
+    fsm_states = FSMStateStorage(data_dir, STORAGE_MODE_JOURNAL)
+    pending = PendingDeadlineStorage(data_dir, STORAGE_MODE_JOURNAL)
+
+    conn = connect(db_path)
+    sqlite_users = SQLiteUserStorage(conn)
+    sqlite_tasks = SQLiteTaskStorage(conn)
+    sqlite_sessions = SQLiteFocusStorage(conn)
+    sqlite_fsm = SQLiteFSMStorage(conn)
+    sqlite_pending = SQLitePendingDeadlineStorage(conn)
+
+    with conn:
+        for user in users.users.values():
+            sqlite_users.save_user(user)
+        for task in tasks.tasks.values():
+            sqlite_tasks.save_task(task)
+        for session in sessions.sessions.values():
+            sqlite_sessions.save_session(session)
+        for user_id, record in fsm_states.states.items():
+            sqlite_fsm._write(user_id, record.get("state"), record.get("data"))
+        for user_id, deadlines, expires_at in pending.load_all():
+            sqlite_pending._write(user_id, deadlines, expires_at)
+    sqlite_tasks.rebuild_stats()
+    sqlite_sessions.rebuild_stats()
+    conn.close()
+
+    return {
+        "users": len(users.users),
+        "tasks": len(tasks.tasks),
+        "focus_sessions": len(sessions.sessions),
+        "fsm_states": len(fsm_states.states),
+        "pending_deadlines": len(pending.pending),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate data/*.json into SQLite")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--db", default="data/campus.db")
+    args = parser.parse_args()
+
+    counts = migrate_json_to_sqlite(args.data_dir, args.db)
+    print(
+        f"Migrated {counts['users']} users, {counts['tasks']} tasks, "
+        f"{counts['focus_sessions']} focus sessions, {counts['fsm_states']} FSM states, "
+        f"{counts['pending_deadlines']} pending deadlines into {args.db}"
+    )
+
+
+if __name__ == "__main__":
+    main()
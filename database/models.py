@@ -1,7 +1,13 @@
-from typing import List, Optional
+import copy
+import secrets
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 
+from .timezones import as_utc, now_utc
+
 class UserRole(str, Enum):
     FRESHMAN = "первокурсник"
     BACHELOR = "бакалавр"
@@ -14,38 +20,162 @@ class TaskStatus(str, Enum):
     COMPLETED = "выполнено"
     OVERDUE = "просрочено"
 
+
+def new_id() -> str:
+    """Короткий случайный идентификатор записи (16 символов, 96 бит)."""
+    return secrets.token_urlsafe(12)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Повторяющиеся строки (предметы, вузы, группы) хранятся в одном экземпляре
+    return sys.intern(value) if value is not None else None
+
+
+# Записи хранилищ: to_record() пишет только значимые поля,
+# from_record() принимает и старый формат (полный __dict__ объекта).
+# Моменты времени хранятся в UTC; значения без пояса из старых записей
+# и из конструктора переводятся в UTC из DEFAULT_TIMEZONE.
+
+@dataclass(slots=True, eq=False)
 class User:
-    def __init__(self, user_id: int):
-        self.user_id = user_id
-        self.university: Optional[str] = None
-        self.group: Optional[str] = None
-        self.role: Optional[UserRole] = None
-        self.calendar_url: Optional[str] = None
-        self.tags: List[str] = []
-        self.onboarding_completed: bool = False
-        self.created_at = datetime.now()
+    user_id: int
+    university: Optional[str] = None
+    group: Optional[str] = None
+    role: Optional[UserRole] = None
+    calendar_url: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+    onboarding_completed: bool = False
+    created_at: datetime = field(default_factory=now_utc)
+    # Имя пояса IANA; None — DEFAULT_TIMEZONE
+    timezone: Optional[str] = None
+    # Настройки напоминаний (/reminders): {"offsets": [минуты], "subjects":
+    # {предмет: [минуты]}, "quiet": [с, до]}; None — REMINDER_OFFSETS
+    reminder_policy: Optional[Dict] = None
+
+    def to_record(self) -> dict:
+        return {
+            'user_id': self.user_id,
+            'university': self.university,
+            'group': self.group,
+            'role': self.role.value if self.role else None,
+            'calendar_url': self.calendar_url,
+            'tags': list(self.tags),
+            'onboarding_completed': self.onboarding_completed,
+            'created_at': self.created_at.isoformat(),
+            'timezone': self.timezone,
+            'reminder_policy': copy.deepcopy(self.reminder_policy),
+        }
 
+    @classmethod
+    def from_record(cls, data: dict) -> "User":
+        user = cls(int(data['user_id']))
+        user.university = _intern(data.get('university'))
+        user.group = _intern(data.get('group'))
+        if data.get('role'):
+            user.role = UserRole(data['role'])
+        user.calendar_url = data.get('calendar_url')
+        user.tags = [sys.intern(tag) for tag in data.get('tags') or []]
+        user.onboarding_completed = bool(data.get('onboarding_completed'))
+        if data.get('created_at'):
+            user.created_at = as_utc(datetime.fromisoformat(data['created_at']))
+        user.timezone = data.get('timezone')
+        user.reminder_policy = data.get('reminder_policy')
+        return user
+
+@dataclass(slots=True, eq=False)
 class Task:
-    def __init__(self, user_id: int, title: str, deadline: datetime):
-        import uuid
-        self.id = str(uuid.uuid4())
-        self.user_id = user_id
-        self.title = title
-        self.description: Optional[str] = None
-        self.deadline = deadline
-        self.subject: str = "другое"
-        self.tags: List[str] = []
-        self.status: TaskStatus = TaskStatus.PENDING
-        self.priority: int = 1
-        self.estimated_pomodoros: int = 1
-        self.completed_pomodoros: int = 0
+    user_id: int
+    title: str
+    deadline: datetime
+    id: str = field(default_factory=new_id)
+    description: Optional[str] = None
+    subject: str = "другое"
+    tags: Tuple[str, ...] = ()
+    status: TaskStatus = TaskStatus.PENDING
+    priority: int = 1
+    estimated_pomodoros: int = 1
+    completed_pomodoros: int = 0
+    # Смещения (в минутах) уже отправленных напоминаний
+    reminders_sent: Tuple[int, ...] = ()
+
+    def __post_init__(self):
+        self.deadline = as_utc(self.deadline)
+
+    def to_record(self) -> dict:
+        record = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'title': self.title,
+            'deadline': self.deadline.isoformat(),
+            'subject': self.subject,
+            'status': self.status.value,
+        }
+        if self.description is not None:
+            record['description'] = self.description
+        if self.tags:
+            record['tags'] = list(self.tags)
+        if self.priority != 1:
+            record['priority'] = self.priority
+        if self.estimated_pomodoros != 1:
+            record['estimated_pomodoros'] = self.estimated_pomodoros
+        if self.completed_pomodoros:
+            record['completed_pomodoros'] = self.completed_pomodoros
+        if self.reminders_sent:
+            record['reminders_sent'] = list(self.reminders_sent)
+        return record
+
+    @classmethod
+    def from_record(cls, data: dict) -> "Task":
+        task = cls(
+            data['user_id'],
+            data['title'],
+            datetime.fromisoformat(data['deadline']),
+            id=data['id'],
+            description=data.get('description'),
+            subject=sys.intern(data.get('subject') or "другое"),
+            tags=tuple(data.get('tags') or ()),
+            status=TaskStatus(data['status']),
+            priority=data.get('priority', 1),
+            estimated_pomodoros=data.get('estimated_pomodoros', 1),
+            completed_pomodoros=data.get('completed_pomodoros', 0),
+            reminders_sent=tuple(data.get('reminders_sent') or ()),
+        )
+        return task
 
+@dataclass(slots=True, eq=False)
 class FocusSession:
-    def __init__(self, user_id: int, duration: int):
-        import uuid
-        self.id = str(uuid.uuid4())
-        self.user_id = user_id
-        self.task_id: Optional[str] = None
-        self.start_time = datetime.now()
-        self.duration = duration
-        self.completed: bool = False
+    user_id: int
+    duration: int
+    id: str = field(default_factory=new_id)
+    task_id: Optional[str] = None
+    start_time: datetime = field(default_factory=now_utc)
+    completed: bool = False
+
+    def __post_init__(self):
+        self.start_time = as_utc(self.start_time)
+
+    def to_record(self) -> dict:
+        record = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'start_time': self.start_time.isoformat(),
+            'duration': self.duration,
+            'completed': self.completed,
+        }
+        if self.task_id is not None:
+            record['task_id'] = self.task_id
+        return record
+
+    @classmethod
+    def from_record(cls, data: dict) -> "FocusSession":
+        try:
+            duration = int(data.get('duration', 0))
+        except (TypeError, ValueError):
+            duration = 0
+
+        session = cls(int(data['user_id']), duration, id=data['id'])
+        session.task_id = data.get('task_id')
+        if data.get('start_time'):
+            session.start_time = as_utc(datetime.fromisoformat(data['start_time']))
+        session.completed = bool(data.get('completed'))
+        return session
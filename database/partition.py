@@ -0,0 +1,114 @@
+"""Раскладка данных из DATA_DIR по шардам для запуска через sharding.py.
+
+Запуск: ``python -m database.partition --data-dir data --shards 4``
+"""
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime
+
+from sharding import LAYOUT_FILE, check_layout, shard_data_dir, shard_for
+from .archive import Archive
+from .storage import (
+    UserStorage, TaskStorage, FocusStorage, FSMStateStorage, PendingDeadlineStorage,
+    STORAGE_MODE_JOURNAL,
+)
+
+
+def partition_data_dir(data_dir: str, shards: int) -> dict:
+    """Раскладывает записи по ``shard-<n>`` по ``user_id % shards``.
+
+    Исходные файлы переименовываются в ``*.presharded`` и больше не читаются.
+    """
+    if os.path.exists(os.path.join(data_dir, LAYOUT_FILE)):
+        raise RuntimeError(f"{data_dir} is already partitioned")
+
+    counts = {}
+    for storage_class in (UserStorage, TaskStorage, FocusStorage, FSMStateStorage, PendingDeadlineStorage):
+        # Журнальный режим заодно проигрывает и сворачивает незаписанный журнал
+        source = storage_class(data_dir, STORAGE_MODE_JOURNAL)
+        targets = [storage_class(shard_data_dir(data_dir, i)) for i in range(shards)]
+        for target in targets:
+            if target._items():
+                raise RuntimeError(f"{target.path} already contains data")
+
+        items = source._items()
+        for key, obj in items:
+            # Записи FSM и неподтверждённые дедлайны — словари, ключ которых и есть user_id
+            user_id = key if isinstance(obj, dict) else obj.user_id
+            target = targets[shard_for(user_id, shards)]
+            target._load_record(str(key), source._encode(obj))
+        for target in targets:
+            target.save_data()
+
+        source.journal.close()
+        for path in (source.path, source.journal.path):
+            if os.path.exists(path):
+                os.replace(path, path + ".presharded")
+        counts[storage_class.file_name] = len(items)
+
+    counts["archive"] = partition_archive(data_dir, shards)
+    check_layout(data_dir, shards)
+    return counts
+
+
+def partition_archive(data_dir: str, shards: int) -> int:
+    """Раскладывает сегменты и сводку ``data/archive`` по ``shard-<n>/archive``.
+
+    Сегмент ``<kind>-YYYY-MM.jsonl.gz`` делится по ``user_id`` записей
+    с тем же именем в каталоге шарда. Исходный каталог переименовывается
+    в ``archive.presharded``. Возвращает число перенесённых записей.
+    """
+    directory = os.path.join(data_dir, "archive")
+    if not os.path.isdir(directory):
+        return 0
+    source = Archive(directory)
+    targets = [Archive(os.path.join(shard_data_dir(data_dir, i), "archive")) for i in range(shards)]
+    for target in targets:
+        if os.path.isdir(target.directory) and os.listdir(target.directory):
+            raise RuntimeError(f"{target.directory} already contains data")
+
+    moved = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl.gz"):
+            continue
+        kind, year, month = name[:-len(".jsonl.gz")].rsplit("-", 2)
+        moment = datetime(int(year), int(month), 1)
+        by_shard = {}
+        with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                by_shard.setdefault(shard_for(record["user_id"], shards), []).append((moment, record))
+        for index, records in by_shard.items():
+            targets[index].write(kind, records, {})
+            moved += len(records)
+
+    for user_id, stats in source.user_stats.items():
+        targets[shard_for(user_id, shards)].add_counters({user_id: stats})
+    for target in targets:
+        if target.user_stats:
+            os.makedirs(target.directory, exist_ok=True)
+            target._write_summary(target.user_stats)
+
+    os.replace(directory, directory + ".presharded")
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split data/*.json into per-shard directories")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--shards", type=int, required=True)
+    args = parser.parse_args()
+
+    counts = partition_data_dir(args.data_dir, args.shards)
+    print(
+        f"Partitioned {counts['users.json']} users, {counts['tasks.json']} tasks, "
+        f"{counts['focus_sessions.json']} focus sessions, {counts['fsm_states.json']} FSM states, "
+        f"{counts['archive']} archived records "
+        f"into {args.shards} shards"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Правила напоминаний о дедлайнах.
+
+Правило — смещения до срока (в минутах), «тихие часы» и режим дайджеста
+в поясе пользователя. Смещения задаются для пользователя целиком и отдельно
+для предметов (команда ``/reminders``); без настроек действуют ``REMINDER_OFFSETS``.
+Моменты срабатывания вычисляются один раз, когда задача попадает в индекс.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import Config
+from .timezones import get_zone
+
+# Допустимое опоздание напоминания: шестая часть смещения, но не больше часа
+MAX_GRACE = 3600
+
+# «24ч», «30 мин», «2д», «90» (минуты)
+OFFSET_RE = re.compile(r'^(\d{1,4})\s*(д|дн|дня|дней|ч|час|часа|часов|м|мин|минут)?$')
+_UNIT_MINUTES = {'д': 1440, 'ч': 60, 'м': 1}
+# «23-8», «23:00-08:00»
+QUIET_RE = re.compile(r'^(\d{1,2})(?::00)?\s*-\s*(\d{1,2})(?::00)?$')
+
+
+@dataclass(frozen=True, slots=True)
+class ReminderPolicy:
+    # Минуты до срока, по убыванию
+    offsets: Tuple[int, ...]
+    # Часы местного времени (с, до), когда напоминания не отправляются
+    quiet_hours: Optional[Tuple[int, int]] = None
+    zone: Optional[ZoneInfo] = None
+    # Дайджест: час местного времени первой рассылки и период в секундах
+    digest_hour: Optional[int] = None
+    digest_window: int = 0
+
+    def fire_times(self, deadline: int, now: float) -> List[Tuple[int, int, int]]:
+        """(момент срабатывания, смещение, допустимое опоздание) для срока ``deadline``.
+
+        Моменты и опоздание — в секундах Unix-времени. В режиме дайджеста
+        напоминание переносится на ближайшую предшествующую рассылку: у всех
+        задач пользователя моменты совпадают, и за одну рассылку уходит одно
+        сообщение (если рассылка уже прошла — остаётся исходный момент).
+        Напоминание, попавшее в тихие часы, переносится на их начало (раньше,
+        а не позже срока); совпавшие после переноса моменты отправляются
+        одним напоминанием.
+        """
+        result = []
+        seen = set()
+        for offset in self.offsets:
+            fire_at = deadline - offset * 60
+            if self.digest_window:
+                slot = self._digest_slot(fire_at)
+                if slot >= now:
+                    fire_at = slot
+            if self.quiet_hours:
+                fire_at = self._before_quiet(fire_at)
+            if fire_at in seen:
+                continue
+            seen.add(fire_at)
+            result.append((fire_at, offset, min(offset * 10, MAX_GRACE)))
+        return result
+
+    def _digest_slot(self, fire_at: int) -> int:
+        local = datetime.fromtimestamp(fire_at, self.zone)
+        anchor = int(local.replace(hour=self.digest_hour, minute=0, second=0, microsecond=0).timestamp())
+        return fire_at - (fire_at - anchor) % self.digest_window
+
+    def _before_quiet(self, fire_at: int) -> int:
+        start, end = self.quiet_hours
+        local = datetime.fromtimestamp(fire_at, self.zone)
+        if start < end:
+            quiet = start <= local.hour < end
+        else:
+            quiet = local.hour >= start or local.hour < end
+        if not quiet:
+            return fire_at
+        quiet_start = local.replace(hour=start, minute=0, second=0, microsecond=0)
+        if quiet_start > local:
+            quiet_start -= timedelta(days=1)
+        return int(quiet_start.timestamp())
+
+
+DEFAULT_POLICY = ReminderPolicy(tuple(sorted(Config.REMINDER_OFFSETS, reverse=True)))
+
+
+@lru_cache(maxsize=1024)
+def _policy(
+    offsets: Tuple[int, ...],
+    quiet_hours: Optional[Tuple[int, int]],
+    digest_hour: Optional[int],
+    zone_name: Optional[str],
+):
+    if offsets == DEFAULT_POLICY.offsets and quiet_hours is None and digest_hour is None:
+        return DEFAULT_POLICY
+    return ReminderPolicy(
+        offsets,
+        quiet_hours,
+        get_zone(zone_name) if quiet_hours or digest_hour is not None else None,
+        digest_hour,
+        Config.REMINDER_DIGEST_WINDOW * 60 if digest_hour is not None else 0,
+    )
+
+
+def policy_for(user, subject: Optional[str] = None) -> ReminderPolicy:
+    """Правило для задачи пользователя: смещения предмета, пользователя или по умолчанию"""
+    settings = getattr(user, "reminder_policy", None)
+    if not settings:
+        return DEFAULT_POLICY
+    offsets = (settings.get("subjects") or {}).get(subject) or settings.get("offsets")
+    quiet_hours = settings.get("quiet")
+    return _policy(
+        tuple(offsets) if offsets else DEFAULT_POLICY.offsets,
+        tuple(quiet_hours) if quiet_hours else None,
+        settings.get("digest"),
+        user.timezone,
+    )
+
+
+def parse_offsets(tokens: List[str]) -> Optional[Tuple[int, ...]]:
+    """Смещения в минутах (по убыванию, без повторов) или None, если что-то не распознано"""
+    offsets = set()
+    for token in tokens:
+        match = OFFSET_RE.match(token.lower())
+        if not match:
+            return None
+        value, unit = match.groups()
+        minutes = int(value) * _UNIT_MINUTES[unit[0]] if unit else int(value)
+        if not 0 < minutes <= 30 * 1440:
+            return None
+        offsets.add(minutes)
+    if not offsets or len(offsets) > Config.REMINDER_MAX_OFFSETS:
+        return None
+    return tuple(sorted(offsets, reverse=True))
+
+
+def parse_quiet_hours(text: str) -> Optional[Tuple[int, int]]:
+    match = QUIET_RE.match(text.strip())
+    if not match:
+        return None
+    start, end = map(int, match.groups())
+    if start > 23 or end > 23 or start == end:
+        return None
+    return start, end
+
+
+def _plural(value: int, one: str, few: str, many: str) -> str:
+    if value % 10 == 1 and value % 100 != 11:
+        return f"{value} {one}"
+    if 2 <= value % 10 <= 4 and not 12 <= value % 100 <= 14:
+        return f"{value} {few}"
+    return f"{value} {many}"
+
+
+def format_time_left(minutes: int) -> str:
+    """«24 часа», «3 часа», «1 час 30 минут», «2 дня», «1 день 3 часа»"""
+    if minutes > 1440:
+        days, hours = divmod(minutes // 60, 24)
+        text = _plural(days, "день", "дня", "дней")
+        return f"{text} {_plural(hours, 'час', 'часа', 'часов')}" if hours else text
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(_plural(hours, "час", "часа", "часов"))
+    if minutes or not hours:
+        parts.append(_plural(minutes, "минуту", "минуты", "минут"))
+    return " ".join(parts)
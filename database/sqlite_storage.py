@@ -0,0 +1,681 @@
+import json
+import os
+import sqlite3
+import sys
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .archive import TASK_COUNTERS
+from .deadline_index import DeadlineIndex
+from .models import User, Task, FocusSession, UserRole, TaskStatus
+from .timezones import as_utc, now_utc
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    university TEXT,
+    group_name TEXT,
+    role TEXT,
+    calendar_url TEXT,
+    tags TEXT NOT NULL DEFAULT '[]',
+    onboarding_completed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    timezone TEXT,
+    reminder_policy TEXT
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    deadline TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 1,
+    estimated_pomodoros INTEGER NOT NULL DEFAULT 1,
+    completed_pomodoros INTEGER NOT NULL DEFAULT 0,
+    reminders_sent TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_status_deadline ON tasks (user_id, status, deadline);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_deadline ON tasks (status, deadline);
+
+CREATE TABLE IF NOT EXISTS focus_sessions (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    task_id TEXT,
+    start_time TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_focus_sessions_user ON focus_sessions (user_id);
+CREATE INDEX IF NOT EXISTS idx_focus_sessions_active ON focus_sessions (completed) WHERE completed = 0;
+
+CREATE TABLE IF NOT EXISTS task_stats (
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, status)
+);
+
+CREATE TABLE IF NOT EXISTS focus_stats (
+    user_id INTEGER PRIMARY KEY,
+    completed_sessions INTEGER NOT NULL,
+    focus_minutes INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fsm_states (
+    user_id INTEGER PRIMARY KEY,
+    state TEXT,
+    data TEXT
+);
+
+CREATE TABLE IF NOT EXISTS pending_deadlines (
+    user_id INTEGER PRIMARY KEY,
+    deadline_info TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Колонки, добавленные после первой версии схемы: (таблица, колонка, тип)
+ADDED_COLUMNS = [
+    ("users", "timezone", "TEXT"),
+    ("users", "reminder_policy", "TEXT"),
+    ("tasks", "reminders_sent", "TEXT NOT NULL DEFAULT '[]'"),
+]
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Открывает базу в режиме WAL и создаёт схему при необходимости."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    for table, column, column_type in ADDED_COLUMNS:
+        columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    return conn
+
+
+class SQLiteUserStorage:
+    def __init__(self, conn: sqlite3.Connection, cache_size: int = 10_000):
+        self.conn = conn
+        # LRU-кэш профилей активных пользователей: повторные обращения
+        # не разбирают строку заново. Изменения сразу пишутся в таблицу.
+        self.cache_size = cache_size
+        self.users: "OrderedDict[int, User]" = OrderedDict()
+
+    def _cache(self, user: User):
+        self.users[user.user_id] = user
+        self.users.move_to_end(user.user_id)
+        if len(self.users) > self.cache_size:
+            self.users.popitem(last=False)
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> User:
+        user = User(row["user_id"])
+        user.university = sys.intern(row["university"]) if row["university"] else None
+        user.group = sys.intern(row["group_name"]) if row["group_name"] else None
+        user.role = UserRole(row["role"]) if row["role"] else None
+        user.calendar_url = row["calendar_url"]
+        user.tags = json.loads(row["tags"])
+        user.onboarding_completed = bool(row["onboarding_completed"])
+        if row["created_at"]:
+            user.created_at = as_utc(datetime.fromisoformat(row["created_at"]))
+        user.timezone = row["timezone"]
+        if row["reminder_policy"]:
+            user.reminder_policy = json.loads(row["reminder_policy"])
+        return user
+
+    def save_user(self, user: User):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO users (user_id, university, group_name, role, "
+            "calendar_url, tags, onboarding_completed, created_at, timezone, reminder_policy) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                user.user_id,
+                user.university,
+                user.group,
+                user.role.value if user.role else None,
+                user.calendar_url,
+                json.dumps(user.tags, ensure_ascii=False),
+                int(user.onboarding_completed),
+                user.created_at.isoformat() if user.created_at else None,
+                user.timezone,
+                json.dumps(user.reminder_policy, ensure_ascii=False) if user.reminder_policy else None,
+            ),
+        )
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        user = self.users.get(user_id)
+        if user is None:
+            row = self.conn.execute(
+                "SELECT * FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            user = self._from_row(row)
+        self._cache(user)
+        return user
+
+    def create_user(self, user_id: int) -> User:
+        user = User(user_id)
+        self._cache(user)
+        with self.conn:
+            self.save_user(user)
+        return user
+
+    def get_calendar_user_ids(self) -> List[int]:
+        rows = self.conn.execute(
+            "SELECT user_id FROM users WHERE calendar_url IS NOT NULL AND calendar_url != ''"
+        )
+        return [row["user_id"] for row in rows]
+
+    def update_user(self, user: User):
+        self._cache(user)
+        with self.conn:
+            self.save_user(user)
+
+
+class SQLiteTaskStorage:
+    def __init__(self, conn: sqlite3.Connection, reminder_policy=None, archive=None):
+        self.conn = conn
+        self.deadline_index = DeadlineIndex(reminder_policy)
+        # Холодное хранилище завершённой истории (database.archive.Archive)
+        self.archive = archive
+        # Номер изменения списка задач пользователя (ключ кэша отрисованных страниц)
+        self.user_versions: Dict[int, int] = {}
+        self._load_deadline_index()
+        if not self.conn.execute("SELECT 1 FROM task_stats LIMIT 1").fetchone():
+            self.rebuild_stats()
+
+    def _load_deadline_index(self):
+        # Все активные задачи: по прошедшим срокам напоминаний уже не будет,
+        # но фоновый сервис переведёт их в «просрочено»
+        for row in self.conn.execute(
+            "SELECT * FROM tasks WHERE status = ?", (TaskStatus.PENDING.value,)
+        ):
+            self.deadline_index.add(self._from_row(row))
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Task:
+        return Task(
+            row["user_id"],
+            row["title"],
+            datetime.fromisoformat(row["deadline"]),
+            id=row["id"],
+            description=row["description"],
+            subject=sys.intern(row["subject"]),
+            tags=tuple(json.loads(row["tags"])),
+            status=TaskStatus(row["status"]),
+            priority=row["priority"],
+            estimated_pomodoros=row["estimated_pomodoros"],
+            completed_pomodoros=row["completed_pomodoros"],
+            reminders_sent=tuple(json.loads(row["reminders_sent"])),
+        )
+
+    def save_task(self, task: Task):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tasks (id, user_id, title, description, deadline, "
+            "subject, tags, status, priority, estimated_pomodoros, completed_pomodoros, "
+            "reminders_sent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                task.id,
+                task.user_id,
+                task.title,
+                task.description,
+                task.deadline.isoformat(),
+                task.subject,
+                json.dumps(list(task.tags), ensure_ascii=False),
+                task.status.value,
+                task.priority,
+                task.estimated_pomodoros,
+                task.completed_pomodoros,
+                json.dumps(list(task.reminders_sent)),
+            ),
+        )
+
+    def _count_task(self, user_id: int, status: TaskStatus, delta: int):
+        self.conn.execute(
+            "INSERT INTO task_stats (user_id, status, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, status) DO UPDATE SET count = count + excluded.count",
+            (user_id, status.value, delta),
+        )
+
+    def get_user_stats(self, user_id: int) -> Dict[str, int]:
+        counts = dict(self.conn.execute(
+            "SELECT status, count FROM task_stats WHERE user_id = ?", (user_id,)
+        ).fetchall())
+        archived = self.archive.get_user_stats(user_id) if self.archive else {}
+        return {
+            'completed_tasks': counts.get(TaskStatus.COMPLETED.value, 0) + archived.get('completed_tasks', 0),
+            'overdue_tasks': counts.get(TaskStatus.OVERDUE.value, 0) + archived.get('overdue_tasks', 0),
+            'active_tasks': counts.get(TaskStatus.PENDING.value, 0),
+        }
+
+    def rebuild_stats(self):
+        """Пересчитывает счётчики с нуля по таблице задач"""
+        with self.conn:
+            self.conn.execute("DELETE FROM task_stats")
+            self.conn.execute(
+                "INSERT INTO task_stats (user_id, status, count) "
+                "SELECT user_id, status, COUNT(*) FROM tasks GROUP BY user_id, status"
+            )
+
+    def add_task(self, task: Task):
+        self.add_tasks([task])
+
+    def add_tasks(self, tasks: List[Task]):
+        """Добавляет пачку задач в одной транзакции"""
+        with self.conn:
+            for task in tasks:
+                self.save_task(task)
+                self._count_task(task.user_id, task.status, 1)
+        for task in tasks:
+            if task.status == TaskStatus.PENDING:
+                self.deadline_index.add(task)
+            self._touch(task.user_id)
+
+    def _touch(self, user_id: int):
+        self.user_versions[user_id] = self.user_versions.get(user_id, 0) + 1
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        row = self.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def update_task(self, task: Task):
+        """Сохраняет изменённые поля задачи; статус меняется через update_task_status"""
+        with self.conn:
+            self.save_task(task)
+        if task.status == TaskStatus.PENDING:
+            self.deadline_index.add(task)
+        self._touch(task.user_id)
+
+    def update_task_status(self, task_id: str, status: TaskStatus):
+        task = self.get_task(task_id)
+        if not task:
+            return
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ? WHERE id = ?", (status.value, task_id)
+            )
+            self._count_task(task.user_id, task.status, -1)
+            self._count_task(task.user_id, status, 1)
+        task.status = status
+        if status == TaskStatus.PENDING:
+            self.deadline_index.add(task)
+        else:
+            self.deadline_index.discard(task_id)
+        self._touch(task.user_id)
+
+    def delete_tasks(self, task_ids: List[str]) -> int:
+        """Удаляет задачи в одной транзакции; возвращает число удалённых"""
+        removed = [task for task in (self.get_task(task_id) for task_id in task_ids) if task is not None]
+        with self.conn:
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(task.id,) for task in removed])
+            for task in removed:
+                self._count_task(task.user_id, task.status, -1)
+        for task in removed:
+            self.deadline_index.discard(task.id)
+            self._touch(task.user_id)
+        return len(removed)
+
+    def expire_overdue(self, now: Optional[float] = None) -> List[Task]:
+        """Переводит в «просрочено» активные задачи, чей срок наступил к ``now`` (одна транзакция)"""
+        expired = []
+        with self.conn:
+            for task_id in self.deadline_index.pop_expired(now):
+                task = self.get_task(task_id)
+                if task is None or task.status != TaskStatus.PENDING:
+                    continue
+                self.conn.execute(
+                    "UPDATE tasks SET status = ? WHERE id = ?", (TaskStatus.OVERDUE.value, task_id)
+                )
+                self._count_task(task.user_id, task.status, -1)
+                self._count_task(task.user_id, TaskStatus.OVERDUE, 1)
+                task.status = TaskStatus.OVERDUE
+                expired.append(task)
+        for task in expired:
+            self._touch(task.user_id)
+        return expired
+
+    def archive_candidates(self, before: datetime) -> List[str]:
+        """Завершённые и просроченные задачи со сроком раньше ``before`` (по индексу status, deadline)"""
+        rows = self.conn.execute(
+            "SELECT id FROM tasks WHERE status IN (?, ?) AND deadline < ? ORDER BY deadline",
+            (TaskStatus.COMPLETED.value, TaskStatus.OVERDUE.value, before.isoformat()),
+        )
+        return [row["id"] for row in rows]
+
+    def archive_history(self, task_ids: List[str]) -> int:
+        """Переносит в архив задачи из ``archive_candidates``; см. TaskStorage.archive_history"""
+        archived, records, counters = self.archive_batch(task_ids)
+        if not archived:
+            return 0
+        self.archive.write("tasks", records, counters)
+        return self.drop_archived(archived, counters)
+
+    def archive_batch(self, task_ids: List[str]) -> Tuple[List[Task], list, Dict[int, Dict[str, int]]]:
+        """Задачи из ``task_ids``, которые всё ещё завершены или просрочены, их записи для архива и счётчики"""
+        if self.archive is None:
+            return [], [], {}
+        archived = []
+        for task_id in task_ids:
+            task = self.get_task(task_id)
+            if task is not None and task.status in TASK_COUNTERS:
+                archived.append(task)
+
+        counters = {}
+        for task in archived:
+            name = TASK_COUNTERS[task.status]
+            user_counters = counters.setdefault(task.user_id, {})
+            user_counters[name] = user_counters.get(name, 0) + 1
+        return archived, [(task.deadline, task.to_record()) for task in archived], counters
+
+    def drop_archived(self, archived: List[Task], counters: Dict[int, Dict[str, int]]) -> int:
+        """Удаляет записанные в архив задачи из таблицы, счётчики /stats переходят в сводку архива"""
+        self.archive.add_counters(counters)
+        with self.conn:
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(task.id,) for task in archived])
+            for task in archived:
+                self._count_task(task.user_id, task.status, -1)
+        return len(archived)
+
+    def get_archived_tasks(self, user_id: int, since: Optional[datetime] = None) -> List[Task]:
+        """Задачи пользователя из архива (со сроком не раньше ``since``)"""
+        if self.archive is None:
+            return []
+        tasks = (Task.from_record(record) for record in self.archive.iter_records("tasks", user_id, since))
+        return [task for task in tasks if since is None or task.deadline >= since]
+
+    def mark_reminder_sent(self, task: Task, offset: int):
+        """Запоминает отправленное напоминание: после рестарта оно не повторится"""
+        task.reminders_sent += (offset,)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET reminders_sent = ? WHERE id = ?",
+                (json.dumps(list(task.reminders_sent)), task.id),
+            )
+
+    def reschedule_reminders(self, user_id: int):
+        """Перепланирует напоминания пользователя после смены правил или пояса"""
+        for row in self.conn.execute(
+            "SELECT * FROM tasks WHERE user_id = ? AND status = ?",
+            (user_id, TaskStatus.PENDING.value),
+        ):
+            self.deadline_index.add(self._from_row(row))
+
+    def get_user_tasks(self, user_id: int) -> List[Task]:
+        rows = self.conn.execute(
+            "SELECT * FROM tasks WHERE user_id = ? ORDER BY rowid", (user_id,)
+        )
+        return [self._from_row(row) for row in rows]
+
+    def get_upcoming_deadlines(self, user_id: int, days: int = 7) -> List[Task]:
+        """Активные задачи со сроком в ближайшие ``days`` дней, по возрастанию срока"""
+        tasks, _, _ = self.get_deadline_page(user_id, days=days, limit=None)
+        return tasks
+
+    def get_deadline_page(
+        self, user_id: int, days: int = 30, after: Optional[str] = None, limit: Optional[int] = 10
+    ) -> Tuple[List[Task], Optional[str], int]:
+        """Страница по индексу (user_id, status, deadline); см. TaskStorage.get_deadline_page"""
+        where = "user_id = ? AND status = ? AND deadline <= ?"
+        params = [user_id, TaskStatus.PENDING.value, (now_utc() + timedelta(days=days)).isoformat()]
+        total = self.conn.execute(f"SELECT COUNT(*) FROM tasks WHERE {where}", params).fetchone()[0]
+        start_key = None
+        if after:
+            # Курсор — строка срока из базы и id последней задачи страницы;
+            # испорченный курсор (например, из старой кнопки) даёт первую страницу
+            try:
+                deadline, task_id = after.split("|", 1)
+                datetime.fromisoformat(deadline)
+                start_key = (deadline, task_id)
+            except ValueError:
+                pass
+        if start_key is not None:
+            where += " AND (deadline > ? OR (deadline = ? AND id > ?))"
+            params += [start_key[0], start_key[0], start_key[1]]
+        query = f"SELECT * FROM tasks WHERE {where} ORDER BY deadline, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self.conn.execute(query, params).fetchall()
+        cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            cursor = f"{rows[-1]['deadline']}|{rows[-1]['id']}"
+        return [self._from_row(row) for row in rows], cursor, total
+
+
+class SQLiteFocusStorage:
+    def __init__(self, conn: sqlite3.Connection, archive=None):
+        self.conn = conn
+        # Холодное хранилище завершённой истории (database.archive.Archive)
+        self.archive = archive
+        if not self.conn.execute("SELECT 1 FROM focus_stats LIMIT 1").fetchone():
+            self.rebuild_stats()
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> FocusSession:
+        return FocusSession(
+            row["user_id"],
+            row["duration"],
+            id=row["id"],
+            task_id=row["task_id"],
+            start_time=datetime.fromisoformat(row["start_time"]),
+            completed=bool(row["completed"]),
+        )
+
+    def save_session(self, session: FocusSession):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO focus_sessions (id, user_id, task_id, start_time, "
+            "duration, completed) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                session.id,
+                session.user_id,
+                session.task_id,
+                session.start_time.isoformat(),
+                session.duration,
+                int(session.completed),
+            ),
+        )
+
+    def _count_session(self, user_id: int, duration: int, sign: int = 1):
+        self.conn.execute(
+            "INSERT INTO focus_stats (user_id, completed_sessions, focus_minutes) "
+            "VALUES (?, ?, ?) ON CONFLICT (user_id) DO UPDATE SET "
+            "completed_sessions = completed_sessions + excluded.completed_sessions, "
+            "focus_minutes = focus_minutes + excluded.focus_minutes",
+            (user_id, sign, sign * duration),
+        )
+
+    def get_user_stats(self, user_id: int) -> Dict[str, int]:
+        row = self.conn.execute(
+            "SELECT completed_sessions, focus_minutes FROM focus_stats WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        stats = {'completed_sessions': 0, 'focus_minutes': 0}
+        if row is not None:
+            stats = {'completed_sessions': row["completed_sessions"], 'focus_minutes': row["focus_minutes"]}
+        if self.archive:
+            archived = self.archive.get_user_stats(user_id)
+            for name in stats:
+                stats[name] += archived.get(name, 0)
+        return stats
+
+    def rebuild_stats(self):
+        """Пересчитывает счётчики с нуля по таблице сессий"""
+        with self.conn:
+            self.conn.execute("DELETE FROM focus_stats")
+            self.conn.execute(
+                "INSERT INTO focus_stats (user_id, completed_sessions, focus_minutes) "
+                "SELECT user_id, COUNT(*), SUM(duration) FROM focus_sessions "
+                "WHERE completed = 1 GROUP BY user_id"
+            )
+
+    def add_session(self, session: FocusSession):
+        with self.conn:
+            self.save_session(session)
+            if session.completed:
+                self._count_session(session.user_id, session.duration)
+
+    def mark_session_completed(self, session_id: str):
+        self.mark_sessions_completed([session_id])
+
+    def mark_sessions_completed(self, session_ids: List[str]):
+        with self.conn:
+            for session_id in session_ids:
+                row = self.conn.execute(
+                    "SELECT user_id, duration FROM focus_sessions WHERE id = ? AND completed = 0",
+                    (session_id,),
+                ).fetchone()
+                if row is None:
+                    continue
+                self.conn.execute(
+                    "UPDATE focus_sessions SET completed = 1 WHERE id = ?", (session_id,)
+                )
+                self._count_session(row["user_id"], row["duration"])
+
+    def get_active_sessions(self) -> List[FocusSession]:
+        rows = self.conn.execute("SELECT * FROM focus_sessions WHERE completed = 0")
+        return [self._from_row(row) for row in rows]
+
+    def get_user_sessions(self, user_id: int) -> List[FocusSession]:
+        rows = self.conn.execute(
+            "SELECT * FROM focus_sessions WHERE user_id = ? ORDER BY rowid", (user_id,)
+        )
+        return [self._from_row(row) for row in rows]
+
+    def archive_candidates(self, before: datetime) -> List[str]:
+        """Завершённые сессии, начатые раньше ``before``"""
+        rows = self.conn.execute(
+            "SELECT id FROM focus_sessions WHERE completed = 1 AND start_time < ?", (before.isoformat(),)
+        )
+        return [row["id"] for row in rows]
+
+    def archive_history(self, session_ids: List[str]) -> int:
+        """Переносит в архив завершённые сессии из ``archive_candidates``"""
+        archived, records, counters = self.archive_batch(session_ids)
+        if not archived:
+            return 0
+        self.archive.write("sessions", records, counters)
+        return self.drop_archived(archived, counters)
+
+    def archive_batch(
+        self, session_ids: List[str]
+    ) -> Tuple[List[FocusSession], list, Dict[int, Dict[str, int]]]:
+        """Завершённые сессии из ``session_ids``, их записи для архива и счётчики"""
+        if self.archive is None:
+            return [], [], {}
+        archived = []
+        for session_id in session_ids:
+            row = self.conn.execute(
+                "SELECT * FROM focus_sessions WHERE id = ? AND completed = 1", (session_id,)
+            ).fetchone()
+            if row is not None:
+                archived.append(self._from_row(row))
+
+        counters = {}
+        for session in archived:
+            stats = counters.setdefault(session.user_id, {'completed_sessions': 0, 'focus_minutes': 0})
+            stats['completed_sessions'] += 1
+            stats['focus_minutes'] += session.duration
+        return archived, [(session.start_time, session.to_record()) for session in archived], counters
+
+    def drop_archived(self, archived: List[FocusSession], counters: Dict[int, Dict[str, int]]) -> int:
+        """Удаляет записанные в архив сессии из таблицы"""
+        self.archive.add_counters(counters)
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM focus_sessions WHERE id = ?", [(session.id,) for session in archived]
+            )
+            for session in archived:
+                self._count_session(session.user_id, session.duration, -1)
+        return len(archived)
+
+    def get_archived_sessions(self, user_id: int, since: Optional[datetime] = None) -> List[FocusSession]:
+        """Сессии пользователя из архива (начатые не раньше ``since``)"""
+        if self.archive is None:
+            return []
+        sessions = (
+            FocusSession.from_record(record) for record in self.archive.iter_records("sessions", user_id, since)
+        )
+        return [session for session in sessions if since is None or session.start_time >= since]
+
+
+class SQLiteFSMStorage:
+    """Состояния и данные FSM aiomax в таблице fsm_states (данные — JSON)"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def load(self, user_id: int) -> Optional[Tuple[Any, Any]]:
+        row = self.conn.execute(
+            "SELECT state, data FROM fsm_states WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row["state"], json.loads(row["data"]) if row["data"] is not None else None
+
+    def save(self, user_id: int, state: Any, data: Any):
+        with self.conn:
+            self._write(user_id, state, data)
+
+    def _write(self, user_id: int, state: Any, data: Any):
+        """Запись без собственной транзакции (для переноса пачкой)"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO fsm_states (user_id, state, data) VALUES (?, ?, ?)",
+            (
+                user_id,
+                state,
+                json.dumps(data, ensure_ascii=False) if data is not None else None,
+            ),
+        )
+
+    def delete(self, user_id: int):
+        with self.conn:
+            self.conn.execute("DELETE FROM fsm_states WHERE user_id = ?", (user_id,))
+
+
+class SQLitePendingDeadlineStorage:
+    """Неподтверждённые дедлайны (для TTLCache) в таблице pending_deadlines: список на пользователя"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def load_all(self) -> List[Tuple[int, List[dict], float]]:
+        items = []
+        for row in self.conn.execute("SELECT * FROM pending_deadlines"):
+            deadlines = json.loads(row["deadline_info"])
+            # Прежний формат — один дедлайн вместо списка
+            if isinstance(deadlines, dict):
+                deadlines = [deadlines]
+            for info in deadlines:
+                info["deadline"] = datetime.fromisoformat(info["deadline"])
+            items.append((row["user_id"], deadlines, row["expires_at"]))
+        return items
+
+    def save(self, user_id: int, deadlines: List[dict], expires_at: float):
+        with self.conn:
+            self._write(user_id, deadlines, expires_at)
+
+    def _write(self, user_id: int, deadlines: List[dict], expires_at: float):
+        """Запись без собственной транзакции (для переноса пачкой)"""
+        encoded = [dict(info, deadline=info["deadline"].isoformat()) for info in deadlines]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pending_deadlines (user_id, deadline_info, expires_at) "
+            "VALUES (?, ?, ?)",
+            (user_id, json.dumps(encoded, ensure_ascii=False), expires_at),
+        )
+
+    def delete(self, user_id: int):
+        with self.conn:
+            self.conn.execute("DELETE FROM pending_deadlines WHERE user_id = ?", (user_id,))
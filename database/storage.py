@@ -1,184 +1,853 @@
+import asyncio
+import bisect
+import copy
 import json
+import logging
 import os
-from typing import Dict, List, Optional
-from datetime import datetime
-from .models import User, Task, FocusSession, UserRole, TaskStatus
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from .archive import TASK_COUNTERS
+from .deadline_index import DeadlineIndex
+from .journal import Journal
+from metrics import registry
+from .models import User, Task, FocusSession, TaskStatus
+from .timezones import as_utc, now_utc
 
-class UserStorage:
-    def __init__(self):
-        self.users: Dict[int, User] = {}
+logger = logging.getLogger("max_focus_campus.storage")
+
+STORAGE_SAVE_SECONDS = registry.histogram(
+    "campus_storage_save_seconds", "JSON storage write time", ["storage", "kind"]
+)
+
+STORAGE_MODE_SNAPSHOT = "snapshot"
+STORAGE_MODE_JOURNAL = "journal"
+
+# Быстрое сопоставление строки статуса из файла с перечислением
+_STATUS_BY_VALUE = {status.value: status for status in TaskStatus}
+
+
+class JsonStorage:
+    """Базовое хранилище поверх JSON-файла в каталоге data/.
+
+    В режиме ``snapshot`` каждая мутация переписывает файл целиком.
+    В режиме ``journal`` мутация дописывает одну запись в ``<file>.journal``,
+    а полный снапшот пишется раз в ``compact_every`` записей и при старте.
+
+    С ``lazy=True`` при старте объекты создаются только для записей, нужных
+    фоновым сервисам (активные задачи и сессии); остальные хранятся как
+    словари из файла и превращаются в объекты при первом обращении.
+    """
+
+    file_name: str = ""
+
+    def __init__(
+        self,
+        data_dir: str = "data",
+        mode: str = STORAGE_MODE_SNAPSHOT,
+        compact_every: int = 1000,
+        lazy: bool = False,
+    ):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, self.file_name)
+        self.compact_every = compact_every
+        self.write_behind = False
+        self._dirty = set()
+        self._flush_lock = asyncio.Lock()
+        self.lazy = lazy
+        # Отложенные записи (режим lazy): ключ -> словарь из файла
+        self._raw: Dict = {}
+        self.load_seconds = 0.0
+        self.journal: Optional[Journal] = None
+        if mode == STORAGE_MODE_JOURNAL:
+            self.journal = Journal(self.path + ".journal")
         self.load_data()
-    
+
     def load_data(self):
-        if os.path.exists("data/users.json"):
+        started = time.perf_counter()
+        data = {}
+        if os.path.exists(self.path):
             try:
-                with open("data/users.json", "r", encoding="utf-8") as f:
+                with open(self.path, "r", encoding="utf-8") as f:
                     data = json.load(f)
-                    for user_id_str, user_data in data.items():
-                        user = User(int(user_id_str))
-                        # Convert string dates back to datetime
-                        if user_data.get('created_at'):
-                            user_data['created_at'] = datetime.fromisoformat(user_data['created_at'])
-                        user.__dict__.update(user_data)
-                        # Convert role string back to enum
-                        if user_data.get('role'):
-                            user.role = UserRole(user_data['role'])
-                        self.users[int(user_id_str)] = user
             except Exception as e:
-                print(f"Error loading users: {e}")
-    
+                logger.error(f"Error loading {self.path}: {e}")
+
+        if self.journal:
+            for op, key, record in self.journal.replay():
+                if op == Journal.DELETE:
+                    data.pop(key, None)
+                else:
+                    data[key] = record
+
+        self._raw = {}
+        self._reset()
+        for key, record in data.items():
+            try:
+                self._load_record(key, record)
+            except Exception as e:
+                logger.error(f"Error loading record {key} from {self.path}: {e}")
+
+        # Сворачиваем проигранный журнал в свежий снапшот
+        if self.journal and self.journal.count:
+            self.save_data()
+
+        self.load_seconds = time.perf_counter() - started
+        logger.info(
+            f"Loaded {len(data)} records from {self.path} in {self.load_seconds:.3f}s"
+            f" ({len(self._raw)} deferred)"
+        )
+
     def save_data(self):
-        os.makedirs("data", exist_ok=True)
-        data = {}
-        for user_id, user in self.users.items():
-            user_dict = user.__dict__.copy()
-            # Convert datetime to string
-            if user_dict.get('created_at'):
-                user_dict['created_at'] = user_dict['created_at'].isoformat()
-            # Convert enum to string
-            if user_dict.get('role'):
-                user_dict['role'] = user_dict['role'].value
-            data[str(user_id)] = user_dict
-        
-        with open("data/users.json", "w", encoding="utf-8") as f:
+        self._write_snapshot(self._snapshot_data(self._items(), list(self._raw.items())))
+
+    def _snapshot_data(self, items, raw_items=()) -> dict:
+        """Содержимое снапшота из свежих словарей, не связанных с живыми объектами."""
+        data = {str(key): self._encode(obj) for key, obj in items}
+        # Отложенные записи не менялись с загрузки и пишутся как есть
+        data.update((str(key), record) for key, record in raw_items)
+        return data
+
+    def _write_snapshot(self, data: dict):
+        """Атомарная запись снапшота: временный файл, fsync и переименование."""
+        started = time.perf_counter()
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-    
-    def get_user(self, user_id: int) -> Optional[User]:
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        if self.journal:
+            self.journal.truncate()
+        STORAGE_SAVE_SECONDS.observe(time.perf_counter() - started, self.file_name, "snapshot")
+
+    def _journal_entries(self, items) -> list:
+        """Записи журнала (операция, ключ, словарь) для пар из ``_collect``"""
+        return [
+            (Journal.DELETE, str(key), None) if obj is None else (Journal.PUT, str(key), self._encode(obj))
+            for key, obj in items
+        ]
+
+    def _append_journal(self, entries):
+        with STORAGE_SAVE_SECONDS.time(self.file_name, "journal"):
+            for op, key, record in entries:
+                self.journal.append(op, key, record)
+
+    def _collect(self, keys):
+        """Пары (ключ, объект); для удалённых записей объект — None"""
+        items = []
+        for key in keys:
+            obj = self._get(key)
+            if obj is None and key in self._raw:
+                continue
+            items.append((key, obj))
+        return items
+
+    def _needs_snapshot(self, pending: int) -> bool:
+        return self.journal is None or self.journal.count + pending >= self.compact_every
+
+    def _persist(self, key):
+        """Сохраняет изменение одной записи согласно режиму хранилища."""
+        self._persist_many([key])
+
+    def _persist_many(self, keys):
+        """Сохраняет пачку изменений: в режиме snapshot — одной перезаписью файла.
+
+        При отложенной записи (``write_behind``) ключи только помечаются
+        изменёнными, а на диск их сбрасывает ``flush_async``.
+        """
+        if self.write_behind:
+            self._dirty.update(keys)
+            return
+
+        if self._needs_snapshot(len(keys)):
+            self.save_data()
+        else:
+            self._append_journal(self._journal_entries(self._collect(keys)))
+
+    def flush(self):
+        """Синхронно сбрасывает накопленные изменения."""
+        if not self._dirty:
+            return
+        keys, self._dirty = self._dirty, set()
+        if self._needs_snapshot(len(keys)):
+            self.save_data()
+        else:
+            self._append_journal(self._journal_entries(self._collect(keys)))
+
+    async def flush_async(self):
+        """Сбрасывает накопленные изменения одной записью в отдельном потоке.
+
+        Записи превращаются в словари в цикле событий, поэтому поток не видит
+        живых объектов, которые меняют обработчики; в потоке идут только
+        сериализация и запись на диск. Сбросы одного хранилища не пересекаются.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            keys, self._dirty = self._dirty, set()
+            try:
+                if self._needs_snapshot(len(keys)):
+                    data = self._snapshot_data(self._items(), list(self._raw.items()))
+                    await asyncio.to_thread(self._write_snapshot, data)
+                else:
+                    entries = self._journal_entries(self._collect(keys))
+                    await asyncio.to_thread(self._append_journal, entries)
+            except Exception as e:
+                self._dirty |= keys
+                logger.error(f"Error flushing {self.path}: {e}")
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _items(self):
+        """Список пар (ключ, объект) всех записей."""
+        raise NotImplementedError
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _load_record(self, key: str, data: dict):
+        raise NotImplementedError
+
+    def _encode(self, obj) -> dict:
+        raise NotImplementedError
+
+
+class UserStorage(JsonStorage):
+    file_name = "users.json"
+
+    def __init__(self, *args, **kwargs):
+        self.users: Dict[int, User] = {}
+        super().__init__(*args, **kwargs)
+
+    def _reset(self):
+        self.users = {}
+
+    def _items(self):
+        return list(self.users.items())
+
+    def _get(self, user_id: int):
         return self.users.get(user_id)
-    
+
+    def _load_record(self, user_id_str: str, user_data: dict):
+        user_data.setdefault('user_id', user_id_str)
+        if self.lazy:
+            self._raw[int(user_data['user_id'])] = user_data
+            return
+        user = User.from_record(user_data)
+        self.users[user.user_id] = user
+
+    def _encode(self, user: User) -> dict:
+        return user.to_record()
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        user = self.users.get(user_id)
+        if user is None and user_id in self._raw:
+            user = self.users[user_id] = User.from_record(self._raw.pop(user_id))
+        return user
+
     def create_user(self, user_id: int) -> User:
         user = User(user_id)
+        self._raw.pop(user_id, None)
         self.users[user_id] = user
-        self.save_data()
+        self._persist(user_id)
         return user
-    
+
     def update_user(self, user: User):
+        self._raw.pop(user.user_id, None)
         self.users[user.user_id] = user
-        self.save_data()
+        self._persist(user.user_id)
+
+    def get_calendar_user_ids(self) -> List[int]:
+        """Пользователи с подключённым календарём (включая отложенные записи)"""
+        user_ids = [user.user_id for user in self.users.values() if user.calendar_url]
+        user_ids.extend(user_id for user_id, record in self._raw.items() if record.get('calendar_url'))
+        return user_ids
+
+class TaskStorage(JsonStorage):
+    file_name = "tasks.json"
 
-class TaskStorage:
-    def __init__(self):
+    def __init__(self, *args, reminder_policy=None, archive=None, **kwargs):
         self.tasks: Dict[str, Task] = {}
         self.user_tasks: Dict[int, List[str]] = {}
-        self.load_data()
-    
-    def load_data(self):
-        if os.path.exists("data/tasks.json"):
-            try:
-                with open("data/tasks.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for task_id, task_data in data.items():
-                        task = Task(task_data['user_id'], task_data['title'], 
-                                   datetime.fromisoformat(task_data['deadline']))
-                        task.__dict__.update(task_data)
-                        # Convert string dates
-                        task.deadline = datetime.fromisoformat(task_data['deadline'])
-                        # Convert status to enum
-                        task.status = TaskStatus(task_data['status'])
-                        self.tasks[task_id] = task
-                        
-                        if task.user_id not in self.user_tasks:
-                            self.user_tasks[task.user_id] = []
-                        self.user_tasks[task.user_id].append(task_id)
-            except Exception as e:
-                print(f"Error loading tasks: {e}")
-    
-    def save_data(self):
-        os.makedirs("data", exist_ok=True)
-        data = {}
-        for task_id, task in self.tasks.items():
-            task_dict = task.__dict__.copy()
-            # Convert datetime to string
-            task_dict['deadline'] = task_dict['deadline'].isoformat()
-            # Convert enum to string
-            task_dict['status'] = task_dict['status'].value
-            data[task_id] = task_dict
-        
-        with open("data/tasks.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-    
+        # Счётчики задач пользователя по статусам для /stats
+        self.user_stats: Dict[int, Dict[TaskStatus, int]] = {}
+        self.deadline_index = DeadlineIndex(reminder_policy)
+        # Активные задачи пользователя, отсортированные по сроку: [(срок, task_id)];
+        # ключ каждой задачи хранится отдельно, чтобы удалить его после смены срока
+        self.user_deadlines: Dict[int, List[Tuple[datetime, str]]] = {}
+        self._deadline_keys: Dict[str, Tuple[datetime, str]] = {}
+        # Номер изменения списка задач пользователя (ключ кэша отрисованных страниц)
+        self.user_versions: Dict[int, int] = {}
+        # Холодное хранилище завершённой истории (database.archive.Archive)
+        self.archive = archive
+        super().__init__(*args, **kwargs)
+
+    def _reset(self):
+        self.tasks = {}
+        self.user_tasks = {}
+        self.user_stats = {}
+        self.user_deadlines = {}
+        self._deadline_keys = {}
+        self.deadline_index.clear()
+
+    def _items(self):
+        return list(self.tasks.items())
+
+    def _get(self, task_id: str):
+        return self.tasks.get(task_id)
+
+    def _load_record(self, task_id: str, task_data: dict):
+        task_data.setdefault('id', task_id)
+        if self.lazy and task_data['status'] != TaskStatus.PENDING.value:
+            # Завершённые и просроченные задачи нужны только для истории
+            user_id = task_data['user_id']
+            self._count_status(user_id, _STATUS_BY_VALUE[task_data['status']], 1)
+            self._raw[task_id] = task_data
+            self.user_tasks.setdefault(user_id, []).append(task_id)
+            return
+        task = Task.from_record(task_data)
+        # Ключ словаря — та же строка, что и task.id (одна копия на запись)
+        self.tasks[task.id] = task
+
+        if task.user_id not in self.user_tasks:
+            self.user_tasks[task.user_id] = []
+        self.user_tasks[task.user_id].append(task.id)
+        self._count_task(task, 1)
+        if task.status == TaskStatus.PENDING:
+            self.deadline_index.add(task)
+            self._index_deadline(task)
+
+    def _index_deadline(self, task: Task):
+        """Ставит задачу в отсортированный список сроков (или убирает, если она не активна)"""
+        deadlines = self._unindex_deadline(task)
+        if task.status == TaskStatus.PENDING:
+            key = self._deadline_keys[task.id] = (task.deadline, task.id)
+            bisect.insort(deadlines, key)
+        self.user_versions[task.user_id] = self.user_versions.get(task.user_id, 0) + 1
+
+    def _unindex_deadline(self, task: Task) -> List[Tuple[datetime, str]]:
+        """Убирает задачу из списка сроков пользователя; возвращает этот список"""
+        key = self._deadline_keys.pop(task.id, None)
+        deadlines = self.user_deadlines.setdefault(task.user_id, [])
+        if key is not None:
+            index = bisect.bisect_left(deadlines, key)
+            if index < len(deadlines) and deadlines[index] == key:
+                del deadlines[index]
+        return deadlines
+
+    def _encode(self, task: Task) -> dict:
+        return task.to_record()
+
     def add_task(self, task: Task):
+        self._insert_task(task)
+        self._persist(task.id)
+
+    def add_tasks(self, tasks: List[Task]):
+        """Добавляет пачку задач одной записью (одна перезапись снапшота или пачка в журнале)"""
+        for task in tasks:
+            self._insert_task(task)
+        self._persist_many([task.id for task in tasks])
+
+    def _insert_task(self, task: Task):
         self.tasks[task.id] = task
         if task.user_id not in self.user_tasks:
             self.user_tasks[task.user_id] = []
         self.user_tasks[task.user_id].append(task.id)
-        self.save_data()
-    
+        self._count_task(task, 1)
+        if task.status == TaskStatus.PENDING:
+            self.deadline_index.add(task)
+        self._index_deadline(task)
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        task = self.tasks.get(task_id)
+        if task is None and task_id in self._raw:
+            task = Task.from_record(self._raw.pop(task_id))
+            self.tasks[task_id] = task
+        return task
+
+    def update_task(self, task: Task):
+        """Сохраняет изменённые поля задачи; статус меняется через update_task_status"""
+        if task.status == TaskStatus.PENDING:
+            self.deadline_index.add(task)
+        self._index_deadline(task)
+        self._persist(task.id)
+
+    def update_task_status(self, task_id: str, status: TaskStatus):
+        task = self.get_task(task_id)
+        if not task:
+            return
+        self._set_status(task, status)
+        self._persist(task_id)
+
+    def delete_tasks(self, task_ids: List[str]) -> int:
+        """Удаляет задачи одной записью; возвращает число удалённых"""
+        removed = []
+        for task_id in task_ids:
+            task = self.get_task(task_id)
+            if task is None:
+                continue
+            del self.tasks[task_id]
+            self._count_task(task, -1)
+            self.deadline_index.discard(task_id)
+            self._unindex_deadline(task)
+            removed.append(task)
+        removed_ids = {task.id for task in removed}
+        for user_id in {task.user_id for task in removed}:
+            self.user_tasks[user_id] = [
+                task_id for task_id in self.user_tasks.get(user_id, []) if task_id not in removed_ids
+            ]
+            self.user_versions[user_id] = self.user_versions.get(user_id, 0) + 1
+        if removed:
+            self._persist_many(list(removed_ids))
+        return len(removed)
+
+    def _set_status(self, task: Task, status: TaskStatus):
+        self._count_task(task, -1)
+        task.status = status
+        self._count_task(task, 1)
+        if status == TaskStatus.PENDING:
+            self.deadline_index.add(task)
+        else:
+            self.deadline_index.discard(task.id)
+        self._index_deadline(task)
+
+    def expire_overdue(self, now: Optional[float] = None) -> List[Task]:
+        """Переводит в «просрочено» активные задачи, чей срок наступил к ``now``.
+
+        Кандидаты берутся из индекса дедлайнов, изменения сохраняются одной пачкой.
+        """
+        expired = []
+        for task_id in self.deadline_index.pop_expired(now):
+            task = self.tasks.get(task_id)
+            if task is not None and task.status == TaskStatus.PENDING:
+                self._set_status(task, TaskStatus.OVERDUE)
+                expired.append(task)
+        if expired:
+            self._persist_many([task.id for task in expired])
+        return expired
+
+    def archive_candidates(self, before: datetime) -> List[str]:
+        """Завершённые и просроченные задачи со сроком раньше ``before`` (один проход по хранилищу)"""
+        candidates = [
+            task.id for task in self.tasks.values() if task.status in TASK_COUNTERS and task.deadline < before
+        ]
+        # Отложенные записи проверяются по словарю, без создания объектов
+        for task_id, record in self._raw.items():
+            if _STATUS_BY_VALUE.get(record['status']) in TASK_COUNTERS and (
+                as_utc(datetime.fromisoformat(record['deadline'])) < before
+            ):
+                candidates.append(task_id)
+        return candidates
+
+    def archive_history(self, task_ids: List[str]) -> int:
+        """Переносит в архив задачи из ``archive_candidates`` за один синхронный шаг.
+
+        Сервис уборки делает то же по частям: ``archive_batch`` в цикле
+        событий, запись архива в отдельном потоке, затем ``drop_archived``.
+        Возвращает число перенесённых задач.
+        """
+        archived, records, counters = self.archive_batch(task_ids)
+        if not archived:
+            return 0
+        self.archive.write("tasks", records, counters)
+        return self.drop_archived(archived, counters)
+
+    def archive_batch(self, task_ids: List[str]) -> Tuple[List[Task], list, Dict[int, Dict[str, int]]]:
+        """Задачи из ``task_ids``, которые всё ещё завершены или просрочены, их записи для архива и счётчики"""
+        if self.archive is None:
+            return [], [], {}
+        archived = []
+        for task_id in task_ids:
+            record = self._raw.get(task_id)
+            task = self.tasks.get(task_id) or (Task.from_record(record) if record is not None else None)
+            if task is not None and task.status in TASK_COUNTERS:
+                archived.append(task)
+
+        counters = {}
+        for task in archived:
+            name = TASK_COUNTERS[task.status]
+            user_counters = counters.setdefault(task.user_id, {})
+            user_counters[name] = user_counters.get(name, 0) + 1
+        return archived, [(task.deadline, task.to_record()) for task in archived], counters
+
+    def drop_archived(self, archived: List[Task], counters: Dict[int, Dict[str, int]]) -> int:
+        """Удаляет записанные в архив задачи из памяти и файла, счётчики /stats переходят в сводку архива"""
+        self.archive.add_counters(counters)
+        removed = set()
+        for task in archived:
+            self.tasks.pop(task.id, None)
+            self._raw.pop(task.id, None)
+            self._count_task(task, -1)
+            removed.add(task.id)
+        for user_id in {task.user_id for task in archived}:
+            self.user_tasks[user_id] = [
+                task_id for task_id in self.user_tasks.get(user_id, []) if task_id not in removed
+            ]
+        self._persist_many(list(removed))
+        return len(archived)
+
+    def get_archived_tasks(self, user_id: int, since: Optional[datetime] = None) -> List[Task]:
+        """Задачи пользователя из архива (со сроком не раньше ``since``)"""
+        if self.archive is None:
+            return []
+        tasks = (Task.from_record(record) for record in self.archive.iter_records("tasks", user_id, since))
+        return [task for task in tasks if since is None or task.deadline >= since]
+
+    def mark_reminder_sent(self, task: Task, offset: int):
+        """Запоминает отправленное напоминание: после рестарта оно не повторится"""
+        task.reminders_sent += (offset,)
+        self._persist(task.id)
+
+    def reschedule_reminders(self, user_id: int):
+        """Перепланирует напоминания пользователя после смены правил или пояса"""
+        for task_id in self.user_tasks.get(user_id, []):
+            task = self.tasks.get(task_id)
+            if task is not None and task.status == TaskStatus.PENDING:
+                self.deadline_index.add(task)
+
+    def _count_task(self, task: Task, delta: int):
+        self._count_status(task.user_id, task.status, delta)
+
+    def _count_status(self, user_id: int, status: TaskStatus, delta: int):
+        counts = self.user_stats.setdefault(user_id, {})
+        counts[status] = counts.get(status, 0) + delta
+
+    def get_user_stats(self, user_id: int) -> Dict[str, int]:
+        counts = self.user_stats.get(user_id, {})
+        archived = self.archive.get_user_stats(user_id) if self.archive else {}
+        return {
+            'completed_tasks': counts.get(TaskStatus.COMPLETED, 0) + archived.get('completed_tasks', 0),
+            'overdue_tasks': counts.get(TaskStatus.OVERDUE, 0) + archived.get('overdue_tasks', 0),
+            'active_tasks': counts.get(TaskStatus.PENDING, 0),
+        }
+
+    def rebuild_stats(self):
+        """Пересчитывает счётчики с нуля по всем задачам"""
+        self.user_stats = {}
+        for task in self.tasks.values():
+            self._count_task(task, 1)
+        for record in self._raw.values():
+            self._count_status(record['user_id'], _STATUS_BY_VALUE[record['status']], 1)
+
     def get_user_tasks(self, user_id: int) -> List[Task]:
-        task_ids = self.user_tasks.get(user_id, [])
-        return [self.tasks[task_id] for task_id in task_ids if task_id in self.tasks]
-    
+        tasks = []
+        for task_id in self.user_tasks.get(user_id, []):
+            task = self.get_task(task_id)
+            if task:
+                tasks.append(task)
+        return tasks
+
     def get_upcoming_deadlines(self, user_id: int, days: int = 7) -> List[Task]:
-        from datetime import timedelta
-        user_tasks = self.get_user_tasks(user_id)
-        cutoff_date = datetime.now() + timedelta(days=days)
-        
-        return [task for task in user_tasks 
-                if task.deadline <= cutoff_date and task.status == TaskStatus.PENDING]
-
-class FocusStorage:
-    def __init__(self):
+        """Активные задачи со сроком в ближайшие ``days`` дней, по возрастанию срока"""
+        tasks, _, _ = self.get_deadline_page(user_id, days=days, limit=None)
+        return tasks
+
+    def get_deadline_page(
+        self, user_id: int, days: int = 30, after: Optional[str] = None, limit: Optional[int] = 10
+    ) -> Tuple[List[Task], Optional[str], int]:
+        """Страница активных задач со сроком в ближайшие ``days`` дней, по возрастанию срока.
+
+        ``after`` — курсор из предыдущего вызова. Возвращает задачи страницы,
+        курсор следующей страницы (None — страница последняя) и общее число задач.
+        """
+        # Активные задачи всегда загружены, отложенные записи не трогаем
+        deadlines = self.user_deadlines.get(user_id, [])
+        end = bisect.bisect_right(deadlines, (now_utc() + timedelta(days=days), '\uffff'))
+        start = 0
+        if after:
+            try:
+                deadline, task_id = after.split('|', 1)
+                key = (as_utc(datetime.fromisoformat(deadline)), task_id)
+            except ValueError:
+                # Испорченный курсор (например, из старой кнопки) — показываем первую страницу
+                key = None
+            if key is not None:
+                start = bisect.bisect_right(deadlines, key, 0, end)
+        stop = end if limit is None else min(start + limit, end)
+        page = deadlines[start:stop]
+        cursor = None
+        if stop < end:
+            cursor = f"{page[-1][0].isoformat()}|{page[-1][1]}"
+        return [self.tasks[task_id] for _, task_id in page], cursor, end
+
+class FocusStorage(JsonStorage):
+    file_name = "focus_sessions.json"
+
+    def __init__(self, *args, archive=None, **kwargs):
         self.sessions: Dict[str, FocusSession] = {}
         self.user_sessions: Dict[int, List[str]] = {}
-        self.load_data()
+        # Счётчики завершённых сессий и минут фокуса для /stats
+        self.user_stats: Dict[int, Dict[str, int]] = {}
+        # Холодное хранилище завершённой истории (database.archive.Archive)
+        self.archive = archive
+        super().__init__(*args, **kwargs)
 
-    def load_data(self):
-        if os.path.exists("data/focus_sessions.json"):
-            try:
-                with open("data/focus_sessions.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.sessions = {}
-                    self.user_sessions = {}
-                    for session_id, session_data in data.items():
-                        raw_user_id = session_data.get('user_id')
-                        try:
-                            user_id = int(raw_user_id)
-                        except (TypeError, ValueError):
-                            continue
-
-                        try:
-                            duration = int(session_data.get('duration', 0))
-                        except (TypeError, ValueError):
-                            duration = 0
-
-                        session = FocusSession(user_id, duration)
-                        session.__dict__.update(session_data)
-                        session.user_id = user_id
-                        session.duration = duration
-                        if session_data.get('start_time'):
-                            session.start_time = datetime.fromisoformat(session_data['start_time'])
-                        self.sessions[session_id] = session
-                        if session.user_id not in self.user_sessions:
-                            self.user_sessions[session.user_id] = []
-                        self.user_sessions[session.user_id].append(session_id)
-            except Exception as e:
-                print(f"Error loading focus sessions: {e}")
+    def _reset(self):
+        self.sessions = {}
+        self.user_sessions = {}
+        self.user_stats = {}
 
-    def save_data(self):
-        os.makedirs("data", exist_ok=True)
-        data = {}
-        for session_id, session in self.sessions.items():
-            session_dict = session.__dict__.copy()
-            if session_dict.get('start_time'):
-                session_dict['start_time'] = session.start_time.isoformat()
-            data[session_id] = session_dict
+    def _items(self):
+        return list(self.sessions.items())
 
-        with open("data/focus_sessions.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    def _get(self, session_id: str):
+        return self.sessions.get(session_id)
+
+    def _load_record(self, session_id: str, session_data: dict):
+        session_data.setdefault('id', session_id)
+        if self.lazy and session_data.get('completed'):
+            self._defer_session(session_id, session_data)
+            return
+        try:
+            session = FocusSession.from_record(session_data)
+        except (KeyError, TypeError, ValueError):
+            # Запись без корректного user_id пропускаем
+            return
+        self.sessions[session.id] = session
+        if session.user_id not in self.user_sessions:
+            self.user_sessions[session.user_id] = []
+        self.user_sessions[session.user_id].append(session.id)
+        self._count_session(session, 1)
+
+    def _defer_session(self, session_id: str, session_data: dict):
+        """Учитывает завершённую сессию в счётчиках, не создавая объект"""
+        try:
+            user_id = int(session_data['user_id'])
+        except (KeyError, TypeError, ValueError):
+            return
+        try:
+            duration = int(session_data.get('duration', 0))
+        except (TypeError, ValueError):
+            duration = 0
+        stats = self.user_stats.setdefault(user_id, {'completed_sessions': 0, 'focus_minutes': 0})
+        stats['completed_sessions'] += 1
+        stats['focus_minutes'] += duration
+        self._raw[session_id] = session_data
+        self.user_sessions.setdefault(user_id, []).append(session_id)
+
+    def _encode(self, session: FocusSession) -> dict:
+        return session.to_record()
 
     def add_session(self, session: FocusSession):
         self.sessions[session.id] = session
         if session.user_id not in self.user_sessions:
             self.user_sessions[session.user_id] = []
         self.user_sessions[session.user_id].append(session.id)
-        self.save_data()
+        self._count_session(session, 1)
+        self._persist(session.id)
 
     def mark_session_completed(self, session_id: str):
         session = self.sessions.get(session_id)
-        if session:
+        if session and not session.completed:
             session.completed = True
-            self.save_data()
+            self._count_session(session, 1)
+            self._persist(session_id)
+
+    def mark_sessions_completed(self, session_ids: List[str]):
+        completed = []
+        for session_id in session_ids:
+            session = self.sessions.get(session_id)
+            if session and not session.completed:
+                session.completed = True
+                self._count_session(session, 1)
+                completed.append(session_id)
+        if completed:
+            self._persist_many(completed)
+
+    def get_active_sessions(self) -> List[FocusSession]:
+        return [session for session in self.sessions.values() if not session.completed]
+
+    def _count_session(self, session: FocusSession, sign: int):
+        if not session.completed:
+            return
+        stats = self.user_stats.setdefault(
+            session.user_id, {'completed_sessions': 0, 'focus_minutes': 0}
+        )
+        stats['completed_sessions'] += sign
+        stats['focus_minutes'] += sign * session.duration
+
+    def get_user_stats(self, user_id: int) -> Dict[str, int]:
+        stats = dict(self.user_stats.get(user_id, {'completed_sessions': 0, 'focus_minutes': 0}))
+        if self.archive:
+            archived = self.archive.get_user_stats(user_id)
+            for name in stats:
+                stats[name] += archived.get(name, 0)
+        return stats
+
+    def archive_candidates(self, before: datetime) -> List[str]:
+        """Завершённые сессии, начатые раньше ``before`` (один проход по хранилищу)"""
+        candidates = [
+            session.id for session in self.sessions.values()
+            if session.completed and session.start_time < before
+        ]
+        # Отложенные записи — всегда завершённые сессии; проверяем только начало
+        for session_id, record in self._raw.items():
+            if record.get('start_time') and as_utc(datetime.fromisoformat(record['start_time'])) < before:
+                candidates.append(session_id)
+        return candidates
+
+    def archive_history(self, session_ids: List[str]) -> int:
+        """Переносит в архив завершённые сессии из ``archive_candidates``; см. TaskStorage.archive_history"""
+        archived, records, counters = self.archive_batch(session_ids)
+        if not archived:
+            return 0
+        self.archive.write("sessions", records, counters)
+        return self.drop_archived(archived, counters)
+
+    def archive_batch(
+        self, session_ids: List[str]
+    ) -> Tuple[List[FocusSession], list, Dict[int, Dict[str, int]]]:
+        """Завершённые сессии из ``session_ids``, их записи для архива и счётчики"""
+        if self.archive is None:
+            return [], [], {}
+        archived = []
+        for session_id in session_ids:
+            record = self._raw.get(session_id)
+            session = self.sessions.get(session_id) or (
+                FocusSession.from_record(record) if record is not None else None
+            )
+            if session is not None and session.completed:
+                archived.append(session)
+
+        counters = {}
+        for session in archived:
+            stats = counters.setdefault(session.user_id, {'completed_sessions': 0, 'focus_minutes': 0})
+            stats['completed_sessions'] += 1
+            stats['focus_minutes'] += session.duration
+        return archived, [(session.start_time, session.to_record()) for session in archived], counters
+
+    def drop_archived(self, archived: List[FocusSession], counters: Dict[int, Dict[str, int]]) -> int:
+        """Удаляет записанные в архив сессии из памяти и файла"""
+        self.archive.add_counters(counters)
+        removed = set()
+        for session in archived:
+            self.sessions.pop(session.id, None)
+            self._raw.pop(session.id, None)
+            self._count_session(session, -1)
+            removed.add(session.id)
+        for user_id in {session.user_id for session in archived}:
+            self.user_sessions[user_id] = [
+                session_id for session_id in self.user_sessions.get(user_id, []) if session_id not in removed
+            ]
+        self._persist_many(list(removed))
+        return len(archived)
+
+    def get_archived_sessions(self, user_id: int, since: Optional[datetime] = None) -> List[FocusSession]:
+        """Сессии пользователя из архива (начатые не раньше ``since``)"""
+        if self.archive is None:
+            return []
+        sessions = (
+            FocusSession.from_record(record) for record in self.archive.iter_records("sessions", user_id, since)
+        )
+        return [session for session in sessions if since is None or session.start_time >= since]
+
+    def rebuild_stats(self):
+        """Пересчитывает счётчики с нуля по всем сессиям"""
+        self.user_stats = {}
+        for session in self.sessions.values():
+            self._count_session(session, 1)
+        for session_data in self._raw.values():
+            session = FocusSession.from_record(session_data)
+            self._count_session(session, 1)
+
+    def _get_session(self, session_id: str) -> Optional[FocusSession]:
+        session = self.sessions.get(session_id)
+        if session is None and session_id in self._raw:
+            session = FocusSession.from_record(self._raw.pop(session_id))
+            self.sessions[session_id] = session
+        return session
 
     def get_user_sessions(self, user_id: int) -> List[FocusSession]:
-        session_ids = self.user_sessions.get(user_id, [])
-        return [self.sessions[session_id] for session_id in session_ids if session_id in self.sessions]
+        sessions = []
+        for session_id in self.user_sessions.get(user_id, []):
+            session = self._get_session(session_id)
+            if session:
+                sessions.append(session)
+        return sessions
+
+class FSMStateStorage(JsonStorage):
+    """Состояния и данные FSM aiomax: ``{user_id: {"state": ..., "data": ...}}``"""
+
+    file_name = "fsm_states.json"
+
+    def __init__(self, *args, **kwargs):
+        self.states: Dict[int, dict] = {}
+        super().__init__(*args, **kwargs)
+
+    def _reset(self):
+        self.states = {}
+
+    def _items(self):
+        return list(self.states.items())
+
+    def _get(self, user_id: int):
+        return self.states.get(user_id)
+
+    def _load_record(self, user_id_str: str, record: dict):
+        self.states[int(user_id_str)] = record
+
+    def _encode(self, record: dict) -> dict:
+        # Данные FSM меняют обработчики; снапшот пишется из копии
+        return copy.deepcopy(record)
+
+    def load(self, user_id: int) -> Optional[Tuple[Any, Any]]:
+        record = self.states.get(user_id)
+        if record is None:
+            return None
+        return record.get("state"), record.get("data")
+
+    def save(self, user_id: int, state: Any, data: Any):
+        self.states[user_id] = {"state": state, "data": data}
+        self._persist(user_id)
+
+    def delete(self, user_id: int):
+        if self.states.pop(user_id, None) is not None:
+            self._persist(user_id)
+
+
+class PendingDeadlineStorage(JsonStorage):
+    """Найденные, но ещё не подтверждённые дедлайны (для TTLCache): список на пользователя"""
+
+    file_name = "pending_deadlines.json"
+
+    def __init__(self, *args, **kwargs):
+        self.pending: Dict[int, dict] = {}
+        super().__init__(*args, **kwargs)
+
+    def _reset(self):
+        self.pending = {}
+
+    def _items(self):
+        return list(self.pending.items())
+
+    def _get(self, user_id: int):
+        return self.pending.get(user_id)
+
+    def _load_record(self, user_id_str: str, record: dict):
+        # Прежний формат — один дедлайн в поле deadline_info
+        deadlines = record.get('deadlines') or [record['deadline_info']]
+        for info in deadlines:
+            info['deadline'] = datetime.fromisoformat(info['deadline'])
+        self.pending[int(user_id_str)] = {'deadlines': deadlines, 'expires_at': record['expires_at']}
+
+    def _encode(self, record: dict) -> dict:
+        deadlines = [dict(info, deadline=info['deadline'].isoformat()) for info in record['deadlines']]
+        return {'deadlines': deadlines, 'expires_at': record['expires_at']}
+
+    def load_all(self) -> List[Tuple[int, List[dict], float]]:
+        return [
+            (user_id, record['deadlines'], record['expires_at'])
+            for user_id, record in self.pending.items()
+        ]
+
+    def save(self, user_id: int, deadlines: List[dict], expires_at: float):
+        self.pending[user_id] = {'deadlines': deadlines, 'expires_at': expires_at}
+        self._persist(user_id)
+
+    def delete(self, user_id: int):
+        if self.pending.pop(user_id, None) is not None:
+            self._persist(user_id)
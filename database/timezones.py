@@ -0,0 +1,122 @@
+"""Часовые пояса пользователей.
+
+Моменты времени (дедлайны, начало сессий) хранятся в UTC; в местное время
+пользователя они переводятся только для показа и разбора текста. Значения
+без пояса из старых записей считаются временем ``DEFAULT_TIMEZONE``.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from config import Config
+
+UTC = timezone.utc
+
+# Города, по которым пользователь чаще всего указывает пояс (11 поясов России)
+CITY_ZONES = {
+    "калининград": "Europe/Kaliningrad",
+    "москва": "Europe/Moscow",
+    "санкт-петербург": "Europe/Moscow",
+    "петербург": "Europe/Moscow",
+    "спб": "Europe/Moscow",
+    "казань": "Europe/Moscow",
+    "самара": "Europe/Samara",
+    "екатеринбург": "Asia/Yekaterinburg",
+    "пермь": "Asia/Yekaterinburg",
+    "уфа": "Asia/Yekaterinburg",
+    "омск": "Asia/Omsk",
+    "новосибирск": "Asia/Novosibirsk",
+    "томск": "Asia/Tomsk",
+    "красноярск": "Asia/Krasnoyarsk",
+    "иркутск": "Asia/Irkutsk",
+    "якутск": "Asia/Yakutsk",
+    "владивосток": "Asia/Vladivostok",
+    "хабаровск": "Asia/Vladivostok",
+    "магадан": "Asia/Magadan",
+    "камчатка": "Asia/Kamchatka",
+    "петропавловск-камчатский": "Asia/Kamchatka",
+}
+
+# «UTC+5», «GMT-3», «+7», «МСК+4»
+OFFSET_RE = re.compile(r'^(utc|gmt|мск)?\s*([+-])\s*(\d{1,2})$')
+MOSCOW_OFFSET = 3
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: Optional[str] = None) -> ZoneInfo:
+    """Пояс по имени IANA; неизвестное или пустое имя — DEFAULT_TIMEZONE"""
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return ZoneInfo(Config.DEFAULT_TIMEZONE)
+
+
+def user_zone(user) -> ZoneInfo:
+    return get_zone(getattr(user, "timezone", None))
+
+
+def parse_zone(text: str) -> Optional[str]:
+    """Имя пояса IANA из ввода пользователя (имя IANA, город, смещение) или None"""
+    text = text.strip()
+    city = CITY_ZONES.get(text.lower())
+    if city:
+        return city
+
+    match = OFFSET_RE.match(text.lower())
+    if match:
+        base, sign, hours = match.groups()
+        offset = int(hours) * (1 if sign == "+" else -1)
+        if base == "мск":
+            offset += MOSCOW_OFFSET
+        if not -12 <= offset <= 14:
+            return None
+        # У зон Etc/GMT знак обратный: Etc/GMT-5 — это UTC+5
+        return "Etc/UTC" if offset == 0 else f"Etc/GMT{-offset:+d}"
+
+    try:
+        ZoneInfo(text)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+    return text
+
+
+def now_utc() -> datetime:
+    return datetime.now(UTC)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Момент в UTC; время без пояса считается временем DEFAULT_TIMEZONE"""
+    if value.tzinfo is UTC:
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=get_zone())
+    return value.astimezone(UTC)
+
+
+def localize(value: datetime, zone: ZoneInfo) -> datetime:
+    """Время без пояса (настенные часы пользователя) как момент в его поясе"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=zone)
+    return value
+
+
+def to_local(value: datetime, zone: ZoneInfo) -> datetime:
+    """Момент в местном времени пользователя (для показа)"""
+    return as_utc(value).astimezone(zone)
+
+
+def timestamp(value: datetime) -> int:
+    """Unix-время в секундах (для сравнений в индексах)"""
+    return int(as_utc(value).timestamp())
+
+
+def format_offset(zone: ZoneInfo, moment: Optional[datetime] = None) -> str:
+    """Смещение пояса для показа: «UTC+7»"""
+    offset = int(((moment or now_utc()).astimezone(zone).utcoffset() or timedelta(0)).total_seconds())
+    hours, rest = divmod(abs(offset), 3600)
+    minutes = rest // 60
+    return f"UTC{'+' if offset >= 0 else '-'}{hours}" + (f":{minutes:02d}" if minutes else "")
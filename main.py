@@ -1,11 +1,17 @@
 from aiomax import Bot, Router
+import aiohttp
 import asyncio
+import json
 import logging
 import signal
 import sys
 
 from config import Config
-from database import user_storage, task_storage, focus_storage
+import database
+from database import user_storage, task_storage, focus_storage, fsm_store, pending_store
+from database.fsm_storage import PersistentFSMStorage
+from database.flusher import StorageFlusher
+from metrics import MetricsServer, instrument_router, metrics_view
 from routers import (
     onboarding_router,
     deadlines_router,
@@ -13,16 +19,25 @@ from routers import (
     schedule_router,
     FocusState,
 )
+from services.calendar_sync import CalendarSyncService
+from services.dispatcher import MessageDispatcher
+from services.focus_timer import FocusTimerService
 from services.reminder import ReminderService
 from services.state_guard import ensure_command_allowed
+from services.sweeper import HistorySweeper
 from services.statistics import send_stats_message
+from services.webhook import WebhookServer
 
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('bot.log', encoding='utf-8'),
+        # Воркеры шардов (sharding.py) пишут каждый в свой файл
+        logging.FileHandler(
+            'bot.log' if Config.SHARD_INDEX is None else f'bot-shard-{Config.SHARD_INDEX}.log',
+            encoding='utf-8',
+        ),
         logging.StreamHandler()
     ]
 )
@@ -49,9 +64,52 @@ class FocusCampusBot:
         self.task_storage = task_storage
         self.focus_storage = focus_storage
         
+        # Состояния сценариев (онбординг, фокус) в постоянном хранилище
+        if Config.FSM_STORAGE == "persistent":
+            self.bot.storage = PersistentFSMStorage(fsm_store, cache_size=Config.FSM_CACHE_SIZE)
+
+        # Фоновая запись хранилищ на диск
+        self.flusher = StorageFlusher(
+            [user_storage, task_storage, focus_storage, fsm_store, pending_store],
+            interval_ms=Config.STORAGE_FLUSH_INTERVAL_MS,
+        )
+
         # Сервисы
+        self.dispatcher = MessageDispatcher(
+            self.bot.send_message,
+            concurrency=Config.DISPATCH_CONCURRENCY,
+            # Лимит MAX API общий на токен, поэтому делится между шардами
+            rate=Config.DISPATCH_RATE / Config.SHARDS,
+            burst=max(Config.DISPATCH_BURST / Config.SHARDS, 1),
+            max_retries=Config.DISPATCH_MAX_RETRIES,
+        )
+        self.bot.dispatcher = self.dispatcher
         self.reminder_service = ReminderService(self)
         self.bot.reminder_service = self.reminder_service
+        self.focus_timer_service = FocusTimerService(self)
+        self.bot.focus_timer_service = self.focus_timer_service
+        self.history_sweeper = HistorySweeper(
+            self,
+            grace_minutes=Config.OVERDUE_GRACE_MINUTES,
+            archive_after_days=Config.ARCHIVE_AFTER_DAYS,
+            archive_interval=Config.ARCHIVE_INTERVAL,
+            batch=Config.ARCHIVE_BATCH,
+        )
+        self.bot.history_sweeper = self.history_sweeper
+        self.calendar_sync = None
+        if Config.CALENDAR_SYNC_ENABLED:
+            self.calendar_sync = CalendarSyncService(
+                self,
+                interval=Config.CALENDAR_SYNC_INTERVAL,
+                jitter=Config.CALENDAR_SYNC_JITTER,
+                concurrency=Config.CALENDAR_SYNC_CONCURRENCY,
+                horizon_days=Config.CALENDAR_SYNC_HORIZON_DAYS,
+                timeout=Config.CALENDAR_FETCH_TIMEOUT,
+                max_bytes=Config.CALENDAR_MAX_BYTES,
+            )
+        self.bot.calendar_sync = self.calendar_sync
+        self.webhook = None
+        self.metrics_server = None
         
         self.setup_routers()
         self.setup_global_handlers()
@@ -62,6 +120,12 @@ class FocusCampusBot:
         self.bot.add_router(deadlines_router)
         self.bot.add_router(focus_router)
         self.bot.add_router(schedule_router)
+
+        # Счётчики вызовов, ошибок и гистограммы времени обработчиков
+        instrument_router(onboarding_router, "onboarding")
+        instrument_router(deadlines_router, "deadlines")
+        instrument_router(focus_router, "focus")
+        instrument_router(schedule_router, "schedule")
         
     def setup_global_handlers(self):
         """Глобальные обработчики"""
@@ -74,6 +138,8 @@ class FocusCampusBot:
                 "• /focus - начать фокус-сессию Pomodoro\n"
                 "• /deadlines - показать ближайшие дедлайны\n"
                 "• /schedule - информация о вашем расписании\n"
+                "• /timezone - часовой пояс для дат и напоминаний\n"
+                "• /reminders - когда напоминать о дедлайнах\n"
                 "• /help - показать эту справку\n\n"
                 "Просто пришлите текст задания с датой, и я автоматически его добавлю! 🎯"
             )
@@ -92,20 +158,134 @@ class FocusCampusBot:
                 return
 
             await send_stats_message(message)
+
+        instrument_router(self.bot, "global")
     
     async def start(self):
         """Запуск бота и всех сервисов"""
         logger.info("Запуск MAX Focus Campus...")
+        logger.info(
+            f"Storages loaded in {database.startup_seconds:.3f}s ("
+            + ", ".join(
+                f"{type(storage).__name__}: {getattr(storage, 'load_seconds', 0.0):.3f}s"
+                for storage in (user_storage, task_storage, focus_storage)
+            )
+            + ")"
+        )
+
+        await self.flusher.start()
+
+        if Config.METRICS_ENABLED and not self._metrics_on_webhook():
+            port = Config.METRICS_PORT
+            if Config.SHARD_INDEX is not None:
+                port += 1 + Config.SHARD_INDEX
+            self.metrics_server = MetricsServer(Config.WEBHOOK_HOST, port)
+            await self.metrics_server.start()
+
+        # Очередь исходящих сообщений для фоновых сервисов
+        await self.dispatcher.start()
         
         # Запуск сервиса напоминаний
         await self.reminder_service.start()
+
+        # Запуск таймеров фокус-сессий (с восстановлением после рестарта)
+        await self.focus_timer_service.start()
+
+        # Просроченные задачи и перенос старой истории в архив
+        await self.history_sweeper.start()
+
+        # Фоновый импорт календарей пользователей
+        if self.calendar_sync:
+            await self.calendar_sync.start()
         
-        # Запуск бота
-        await self.bot.start_polling()
+        # Запуск бота: апдейты от supervisor (sharding.py), WebHook или опрос
+        if Config.SHARD_INDEX is not None:
+            await self.serve_shard()
+        elif Config.INGRESS_MODE == "webhook":
+            await self.serve_webhook()
+        else:
+            await self.bot.start_polling()
+
+    def _metrics_on_webhook(self) -> bool:
+        """В режиме webhook на общем порту /metrics отдаёт сервер вебхуков"""
+        return (
+            Config.SHARD_INDEX is None
+            and Config.INGRESS_MODE == "webhook"
+            and Config.METRICS_PORT == Config.WEBHOOK_PORT
+        )
+
+    def _api_session(self) -> aiohttp.ClientSession:
+        """Сессия MAX API для режимов без start_polling"""
+        return aiohttp.ClientSession(
+            headers={"Authorization": self.bot.access_token},
+            base_url=self.bot.api_url,
+        )
+
+    async def serve_webhook(self):
+        """Режим WebHook: HTTP-сервер принимает апдейты, пул воркеров их обрабатывает"""
+        async with self._api_session() as session:
+            self.bot.session = session
+            await self.bot.get_me()
+
+            self.webhook = WebhookServer(
+                self.bot.handle_update,
+                host=Config.WEBHOOK_HOST,
+                port=Config.WEBHOOK_PORT,
+                path=Config.WEBHOOK_PATH,
+                secret=Config.WEBHOOK_SECRET or None,
+                workers=Config.WEBHOOK_WORKERS,
+                queue_size=Config.WEBHOOK_QUEUE_SIZE,
+            )
+            if Config.METRICS_ENABLED and self._metrics_on_webhook():
+                self.webhook.app.router.add_get("/metrics", metrics_view)
+            await self.webhook.start()
+
+            if Config.WEBHOOK_URL:
+                subscription = {"url": Config.WEBHOOK_URL}
+                if Config.WEBHOOK_SECRET:
+                    subscription["secret"] = Config.WEBHOOK_SECRET
+                await self.bot.post("subscriptions", json=subscription)
+                logger.info(f"Subscribed to updates at {Config.WEBHOOK_URL}")
+
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.webhook.stop()
+        self.bot.session = None
+
+    async def serve_shard(self):
+        """Режим воркера шарда: апдейты приходят в stdin по одному JSON на строку"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 22)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        async with self._api_session() as session:
+            self.bot.session = session
+            await self.bot.get_me()
+            logger.info(f"Shard {Config.SHARD_INDEX}/{Config.SHARDS} is serving updates")
+
+            # Пустая строка — supervisor закрыл канал и шард завершается
+            while line := await reader.readline():
+                try:
+                    await self.bot.handle_update(json.loads(line))
+                except Exception as e:
+                    logger.exception(e)
+        self.bot.session = None
     
     async def stop(self):
         """Корректная остановка бота"""
+        # Сначала перестаём принимать апдейты и дообрабатываем принятые
+        if self.webhook:
+            await self.webhook.stop()
         await self.reminder_service.stop()
+        await self.focus_timer_service.stop()
+        await self.history_sweeper.stop()
+        if self.calendar_sync:
+            await self.calendar_sync.stop()
+        await self.dispatcher.stop()
+        await self.flusher.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
         logger.info("MAX Focus Campus остановлен")
 
 # Обработка сигналов для корректного завершения
@@ -0,0 +1,233 @@
+"""Метрики в текстовом формате Prometheus.
+
+Модули объявляют свои метрики через ``registry`` (как логгеры через
+``logging.getLogger``), а ``/metrics`` отдаёт их все. Значения меток
+передаются позиционно в порядке ``labelnames``.
+"""
+import bisect
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger("max_focus_campus.metrics")
+
+# Границы корзин гистограмм по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    """Текущее значение; ``callback`` вычисляет его в момент сбора метрик"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                yield self.name, self.callback()
+            except Exception as e:
+                logger.error(f"Error collecting {self.name}: {e!r}")
+            return
+        yield from super().samples()
+
+
+class Histogram:
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Метки -> [счётчики по корзинам (последняя — +Inf), сумма, количество]
+        self._values: Dict[Tuple, List] = {}
+
+    def observe(self, value: float, *labels):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def samples(self):
+        label_names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield (
+                    self.name + "_bucket" + _format_labels(label_names, labels + (_format_value(bound),)),
+                    cumulative,
+                )
+            suffix = _format_labels(self.labelnames, labels)
+            yield self.name + "_sum" + suffix, total
+            yield self.name + "_count" + suffix, count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            # Повторный импорт модуля возвращает уже объявленную метрику
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        gauge = self._register(Gauge(name, documentation, labelnames, callback))
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample, value in metric.samples():
+                lines.append(f"{sample} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HANDLER_CALLS = registry.counter(
+    "campus_handler_calls_total", "Handler invocations", ["router", "handler"]
+)
+HANDLER_ERRORS = registry.counter(
+    "campus_handler_errors_total", "Handler invocations that raised", ["router", "handler"]
+)
+HANDLER_LATENCY = registry.histogram(
+    "campus_handler_latency_seconds", "Handler execution time", ["router", "handler"]
+)
+
+
+def instrument_handler(func, router_name: str):
+    """Оборачивает async-обработчик aiomax подсчётом вызовов, ошибок и времени.
+
+    ``functools.wraps`` сохраняет сигнатуру, по которой aiomax
+    подставляет ``cursor`` и другие аргументы контекста.
+    """
+    if getattr(func, "__instrumented__", False):
+        return func
+    handler_name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        HANDLER_CALLS.inc(router_name, handler_name)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(router_name, handler_name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, router_name, handler_name)
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_router(router, router_name: str):
+    """Инструментирует собственные обработчики и команды роутера (без дочерних)"""
+    for handlers in list(router._handlers.values()) + list(router._commands.values()):
+        for handler in handlers:
+            handler.call = instrument_handler(handler.call, router_name)
+
+
+async def metrics_view(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+class MetricsServer:
+    """Отдельный HTTP-сервер с ``/metrics`` (для режима polling)"""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000):
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", metrics_view)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,20 +1,47 @@
+from typing import Optional, Tuple
+
 from aiomax import Router
-from aiomax.types import Message
+from aiomax.types import Callback, CommandContext, Message
 from aiomax.fsm import FSMCursor
 from aiomax import buttons
-from aiomax.filters import has
-from datetime import datetime
+from aiomax.filters import has, startswith
 
-from database import user_storage, task_storage
+from config import Config
+from database import user_storage, task_storage, pending_store
 from database.models import Task, TaskStatus
+from database.reminder_policy import (
+    DEFAULT_POLICY, format_time_left, parse_offsets, parse_quiet_hours, policy_for,
+)
+from database.timezones import now_utc, to_local, user_zone
 from routers.focus import FocusState
-from services.nlp_parser import extract_deadline_info
+from services.nlp_parser import extract_deadlines
 from services.state_guard import ensure_command_allowed
+from services.ttl_cache import TTLCache
 
 deadlines_router = Router()
 
-# Временное хранилище для найденных дедлайнов
-temp_deadlines = {}
+# Сколько дедлайнов берём из одного сообщения (силлабус, пересланный дайджест)
+MAX_DEADLINES_PER_MESSAGE = 20
+
+# Найденные дедлайны, ожидающие подтверждения: не больше PENDING_DEADLINES_MAX
+# пользователей, неподтверждённые забываются через PENDING_DEADLINES_TTL секунд
+pending_deadlines = TTLCache(
+    "pending_deadlines",
+    maxsize=Config.PENDING_DEADLINES_MAX,
+    ttl=Config.PENDING_DEADLINES_TTL,
+    store=pending_store if Config.PENDING_DEADLINES_PERSIST else None,
+)
+
+# Список /deadlines: задачи на ближайшие DEADLINES_DAYS дней страницами по
+# DEADLINES_PAGE_SIZE, «Далее» передаёт курсор последней показанной задачи
+DEADLINES_DAYS = 30
+DEADLINES_PAGE_SIZE = 10
+PAGE_CALLBACK = "deadlines_page:"
+
+# Отрисованные страницы. В ключе — номер изменения задач пользователя,
+# поэтому после любой правки задач старые страницы больше не находятся;
+# TTL ограничивает устаревание «осталось N дней»
+deadline_pages = TTLCache("deadline_pages", maxsize=10000, ttl=300)
 
 
 @deadlines_router.on_message()
@@ -29,12 +56,16 @@ async def handle_deadline_message(message: Message, cursor: FSMCursor):
     if message.content.startswith("/") or len(message.content) < 10:
         return
 
-    deadline_info = extract_deadline_info(message.content)
+    # Даты в тексте — по часам пользователя
+    deadlines = extract_deadlines(message.content, MAX_DEADLINES_PER_MESSAGE, tz=user_zone(user))
+    if not deadlines:
+        return
 
-    if deadline_info:
-        # Сохраняем временно найденный дедлайн
-        temp_deadlines[message.sender.user_id] = deadline_info
+    # Сохраняем временно найденные дедлайны
+    pending_deadlines.set(message.sender.user_id, deadlines)
 
+    if len(deadlines) == 1:
+        deadline_info = deadlines[0]
         await message.reply(
             f"📅 **Найден дедлайн!**\n\n"
             f"• Задание: {deadline_info['title']}\n"
@@ -46,37 +77,178 @@ async def handle_deadline_message(message: Message, cursor: FSMCursor):
             .add(buttons.MessageButton("✏️ Редактировать"))
             .add(buttons.MessageButton("❌ Отмена")),
         )
+        return
+
+    response = f"📅 **Найдено дедлайнов: {len(deadlines)}**\n\n"
+    for i, deadline_info in enumerate(deadlines, 1):
+        response += (
+            f"{i}. {deadline_info['title']}\n"
+            f"   📍 {deadline_info.get('subject', 'Не указан')} | "
+            f"⏰ {deadline_info['deadline'].strftime('%d.%m.%Y %H:%M')}\n"
+        )
+    response += "\nДобавить все в систему?"
+    await message.reply(
+        response,
+        keyboard=buttons.KeyboardBuilder()
+        .add(buttons.MessageButton("✅ Добавить все дедлайны"))
+        .add(buttons.MessageButton("❌ Отмена")),
+    )
 
 
 # Фильтр передаем как позиционный аргумент
 @deadlines_router.on_message(has("✅ Добавить дедлайн"))
+@deadlines_router.on_message(has("✅ Добавить все дедлайны"))
 async def confirm_deadline(message: Message, cursor: FSMCursor):
     user_id = message.sender.user_id
-    deadline_info = temp_deadlines.get(user_id)
-
-    if deadline_info:
-        # Создаем задачу
-        task = Task(
-            user_id=user_id,
-            title=deadline_info["title"],
-            deadline=deadline_info["deadline"],
-        )
-        task.subject = deadline_info.get("subject", "другое")
+    deadlines = pending_deadlines.pop(user_id)
 
-        task_storage.add_task(task)
-        del temp_deadlines[user_id]
+    if deadlines:
+        user = user_storage.get_user(user_id)
+        zone = user_zone(user)
+        # Создаем задачи и сохраняем их одной записью в хранилище
+        tasks = []
+        for deadline_info in deadlines:
+            task = Task(
+                user_id=user_id,
+                title=deadline_info["title"],
+                deadline=deadline_info["deadline"],
+            )
+            task.subject = deadline_info.get("subject", "другое")
+            tasks.append(task)
 
+        task_storage.add_tasks(tasks)
+
+        if len(tasks) == 1:
+            task = tasks[0]
+            await message.reply(
+                f"✅ **Дедлайн добавлен!**\n\n"
+                f"• Задание: {task.title}\n"
+                f"• Дедлайн: {to_local(task.deadline, zone).strftime('%d.%m.%Y в %H:%M')}\n"
+                f"• Предмет: {task.subject}\n\n"
+                f"Я напомню вам за {_offsets_text(policy_for(user, task.subject).offsets)} до дедлайна! 🎯"
+            )
+        else:
+            await message.reply(
+                f"✅ **Добавлено дедлайнов: {len(tasks)}**\n\n"
+                + "".join(
+                    f"• {task.title} — {to_local(task.deadline, zone).strftime('%d.%m.%Y')}\n"
+                    for task in tasks
+                )
+                + f"\nЯ напомню о каждом за {_offsets_text(policy_for(user).offsets)} до срока! 🎯"
+                "\nНастроить напоминания: /reminders"
+            )
+    else:
         await message.reply(
-            f"✅ **Дедлайн добавлен!**\n\n"
-            f"• Задание: {task.title}\n"
-            f"• Дедлайн: {task.deadline.strftime('%d.%m.%Y в %H:%M')}\n"
-            f"• Предмет: {task.subject}\n\n"
-            "Я напомню вам за 24 часа, 3 часа и 30 минут до дедлайна! 🎯"
+            "❌ Не удалось найти информацию о дедлайне. Попробуйте еще раз."
         )
+
+
+@deadlines_router.on_message(has("❌ Отмена"))
+async def cancel_deadline(message: Message, cursor: FSMCursor):
+    if pending_deadlines.pop(message.sender.user_id) is not None:
+        await message.reply("Хорошо, дедлайны не добавлены.")
+
+
+def _offsets_text(offsets) -> str:
+    """«24 часа, 3 часа и 30 минут»"""
+    parts = [format_time_left(offset) for offset in offsets]
+    return parts[0] if len(parts) == 1 else ", ".join(parts[:-1]) + " и " + parts[-1]
+
+
+def _describe_reminders(user) -> str:
+    settings = user.reminder_policy or {}
+    lines = [f"🔔 Напоминания: за {_offsets_text(settings.get('offsets') or DEFAULT_POLICY.offsets)}"]
+    for subject, offsets in (settings.get("subjects") or {}).items():
+        lines.append(f"   • {subject}: за {_offsets_text(offsets)}")
+    quiet = settings.get("quiet")
+    lines.append(
+        f"🌙 Тихие часы: {quiet[0]:02d}:00–{quiet[1]:02d}:00" if quiet else "🌙 Тихие часы: не заданы"
+    )
+    digest = settings.get("digest")
+    if digest is None:
+        lines.append("📋 Дайджест: выключен")
+    elif Config.REMINDER_DIGEST_WINDOW == 1440:
+        lines.append(f"📋 Дайджест: каждый день в {digest:02d}:00")
     else:
+        lines.append(
+            f"📋 Дайджест: каждые {format_time_left(Config.REMINDER_DIGEST_WINDOW)}, начиная с {digest:02d}:00"
+        )
+    return "\n".join(lines)
+
+
+@deadlines_router.on_command("reminders")
+async def reminder_settings(message: CommandContext, cursor: FSMCursor):
+    user = user_storage.get_user(message.sender.user_id)
+    if not user or not user.onboarding_completed:
+        await message.reply("⚠️ Сначала завершите настройку профиля командой /start")
+        return
+
+    args = message.args
+    if not args:
         await message.reply(
-            "❌ Не удалось найти информацию о дедлайне. Попробуйте еще раз."
+            _describe_reminders(user) + "\n\n"
+            "Настройка:\n"
+            "• /reminders 2д 3ч 30м — за сколько напоминать\n"
+            "• /reminders математика 48ч 2ч — отдельно для предмета\n"
+            "• /reminders тишина 23-8 — не беспокоить ночью (выкл — отключить)\n"
+            "• /reminders дайджест 9 — все напоминания одним сообщением в 9:00 (выкл — отключить)\n"
+            "• /reminders сброс — настройки по умолчанию"
         )
+        return
+
+    settings = dict(user.reminder_policy or {})
+    head = args[0].lower()
+    if head == "сброс":
+        settings = {}
+    elif head == "тишина":
+        value = " ".join(args[1:])
+        if value.lower() in ("выкл", "нет", "off"):
+            settings.pop("quiet", None)
+        else:
+            quiet = parse_quiet_hours(value)
+            if quiet is None:
+                await message.reply("❌ Укажите тихие часы так: /reminders тишина 23-8")
+                return
+            settings["quiet"] = list(quiet)
+    elif head == "дайджест":
+        value = " ".join(args[1:]).lower().removesuffix(":00")
+        if value in ("выкл", "нет", "off"):
+            settings.pop("digest", None)
+        elif not value:
+            settings["digest"] = Config.REMINDER_DIGEST_HOUR
+        elif value.isdigit() and int(value) <= 23:
+            settings["digest"] = int(value)
+        else:
+            await message.reply("❌ Укажите час рассылки так: /reminders дайджест 9")
+            return
+    else:
+        subject, tokens = None, args
+        if parse_offsets(args[:1]) is None:
+            subject, tokens = head, args[1:]
+        subjects = dict(settings.get("subjects") or {})
+        if subject and [token.lower() for token in tokens] == ["сброс"]:
+            subjects.pop(subject, None)
+        else:
+            offsets = parse_offsets(tokens)
+            if offsets is None:
+                await message.reply(
+                    "❌ Не удалось разобрать время напоминаний. Пример: /reminders 24ч 3ч 30м"
+                )
+                return
+            if subject:
+                subjects[subject] = list(offsets)
+            else:
+                settings["offsets"] = list(offsets)
+        if subjects:
+            settings["subjects"] = subjects
+        else:
+            settings.pop("subjects", None)
+
+    user.reminder_policy = settings or None
+    user_storage.update_user(user)
+    # Моменты срабатывания пересчитываются сразу для всех активных задач
+    task_storage.reschedule_reminders(user.user_id)
+    await message.reply("✅ Настройки напоминаний сохранены\n\n" + _describe_reminders(user))
 
 
 @deadlines_router.on_command("deadlines")
@@ -93,25 +265,75 @@ async def show_deadlines(message: Message, cursor: FSMCursor):
     ):
         return
 
-    tasks = task_storage.get_upcoming_deadlines(message.sender.user_id, days=30)
+    text, next_payload = render_deadlines_page(user)
+    await message.reply(text, keyboard=_page_keyboard(1, next_payload))
 
-    if not tasks:
-        await message.reply("📭 У вас нет предстоящих дедлайнов на ближайшие 30 дней!")
+
+@deadlines_router.on_button_callback(startswith(PAGE_CALLBACK))
+async def deadlines_page(callback: Callback, cursor: FSMCursor):
+    user = user_storage.get_user(callback.user.user_id)
+    if not user or not user.onboarding_completed:
         return
 
-    response = "📅 **Ваши ближайшие дедлайны:**\n\n"
-    for i, task in enumerate(tasks[:10], 1):  # Показываем первые 10
-        days_left = (task.deadline - datetime.now()).days
+    page, _, after = callback.payload[len(PAGE_CALLBACK):].partition(":")
+    page = int(page) if page.isdigit() else 1
+    text, next_payload = render_deadlines_page(user, page, after or None)
+    # Сообщение со списком редактируется на месте
+    keyboard = _page_keyboard(page, next_payload)
+    if keyboard is None:
+        # Без клавиатуры aiomax оставил бы прежние кнопки (устаревшую «Далее»);
+        # пустой список вложений снимает их
+        await callback.answer(text=text, keyboard=[], attachments=[])
+    else:
+        await callback.answer(text=text, keyboard=keyboard)
+
+
+def render_deadlines_page(user, page: int = 1, after: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Текст страницы списка дедлайнов и payload кнопки «Далее» (None — страница последняя)"""
+    zone = user_zone(user)
+    key = (user.user_id, task_storage.user_versions.get(user.user_id, 0), zone.key, page, after)
+    cached = deadline_pages.get(key)
+    if cached is not None:
+        return cached
+
+    tasks, next_cursor, total = task_storage.get_deadline_page(
+        user.user_id, days=DEADLINES_DAYS, after=after, limit=DEADLINES_PAGE_SIZE
+    )
+    if not tasks:
+        rendered = (f"📭 У вас нет предстоящих дедлайнов на ближайшие {DEADLINES_DAYS} дней!", None)
+        deadline_pages.set(key, rendered)
+        return rendered
+
+    pages = -(-total // DEADLINES_PAGE_SIZE)
+    now = now_utc()
+    parts = ["📅 **Ваши ближайшие дедлайны:**"]
+    if pages > 1:
+        parts.append(f" (страница {page} из {pages}, всего {total})")
+    parts.append("\n\n")
+    for task in tasks:
+        days_left = (task.deadline - now).days
         status_emoji = "🟢" if days_left > 3 else "🟡" if days_left > 1 else "🔴"
+        parts += [
+            f"{status_emoji} **{task.title}**\n",
+            f"   📍 {task.subject} | ⏰ {to_local(task.deadline, zone).strftime('%d.%m.%Y')}\n",
+            f"   🕐 Осталось: {days_left} дней\n\n",
+        ]
 
-        response += f"{status_emoji} **{task.title}**\n"
-        response += f"   📍 {task.subject} | ⏰ {task.deadline.strftime('%d.%m.%Y')}\n"
-        response += f"   🕐 Осталось: {days_left} дней\n\n"
+    next_payload = f"{PAGE_CALLBACK}{page + 1}:{next_cursor}" if next_cursor else None
+    rendered = ("".join(parts), next_payload)
+    deadline_pages.set(key, rendered)
+    return rendered
 
-    if len(tasks) > 10:
-        response += f"... и еще {len(tasks) - 10} дедлайнов"
 
-    await message.reply(response)
+def _page_keyboard(page: int, next_payload: Optional[str]) -> Optional[buttons.KeyboardBuilder]:
+    if page == 1 and next_payload is None:
+        return None
+    keyboard = buttons.KeyboardBuilder()
+    if page > 1:
+        keyboard.add(buttons.CallbackButton("⏮ В начало", f"{PAGE_CALLBACK}1:"))
+    if next_payload is not None:
+        keyboard.add(buttons.CallbackButton("Далее ▶️", next_payload))
+    return keyboard
 
 
 @deadlines_router.on_message(has("📅 Мои дедлайны"))
@@ -3,11 +3,11 @@ from aiomax.types import Message
 from aiomax.fsm import FSMCursor
 from aiomax import buttons
 from aiomax.filters import has, state as state_filter
-import asyncio
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from database import user_storage, focus_storage
 from database.models import FocusSession
+from database.timezones import now_utc, to_local, user_zone
 from services.state_guard import ensure_command_allowed
 
 focus_router = Router()
@@ -63,14 +63,16 @@ async def handle_focus_duration(message: Message, cursor: FSMCursor):
     cursor.change_state(FocusState.WORKING)
     cursor.change_data(
         {
-            "focus_start": datetime.now().isoformat(),
+            "focus_start": session.start_time.isoformat(),
             "duration": duration,
             "session_id": session.id,
             "pomodoros_completed": 0,
         }
     )
 
-    end_time = datetime.now() + timedelta(minutes=duration)
+    end_time = to_local(
+        now_utc() + timedelta(minutes=duration), user_zone(user_storage.get_user(user_id))
+    )
 
     await message.reply(
         f"⏰ **Фокус-сессия началась!**\n\n"
@@ -82,34 +84,8 @@ async def handle_focus_duration(message: Message, cursor: FSMCursor):
         "**Удачи в работе!** 💪"
     )
 
-    # Запускаем таймер
-    asyncio.create_task(
-        focus_timer(user_id, duration, session.id, message.bot, cursor.storage)
-    )
-
-
-async def focus_timer(user_id: int, duration: int, session_id: str, bot, fsm_storage):
-    await asyncio.sleep(duration * 60)
-
-    # Помечаем сессию как завершенную
-    focus_storage.mark_session_completed(session_id)
-
-    # Сбрасываем состояние пользователя после завершения сессии
-    fsm_storage.clear(user_id)
-
-    await bot.send_message(
-        text=f"✅ **Фокус-сессия завершена!**\n\n"
-        f"Отличная работа! {duration} минут продуктивной работы позади.\n\n"
-        "Сделайте перерыв:\n"
-        "• 🚶 Пройдитесь 5 минут\n"
-        "• 💧 Выпейте воды\n"
-        "• 🧘 Сделайте разминку",
-        user_id=user_id,
-        keyboard=buttons.KeyboardBuilder().add(
-            buttons.MessageButton("🔄 Новая сессия"),
-            buttons.MessageButton("📊 Статистика"),
-        ),
-    )
+    # Ставим окончание сессии в общий планировщик таймеров
+    message.bot.focus_timer_service.schedule(session)
 
 
 @focus_router.on_message(has("🔄 Новая сессия"))
@@ -70,6 +70,7 @@ async def process_university(message: Message, cursor: FSMCursor):
     university = message.content
     user = user_storage.get_user(message.sender.user_id)
     user.university = university
+    user_storage.update_user(user)
 
     cursor.change_state(OnboardingState.GROUP)
     await message.reply(
@@ -83,6 +84,7 @@ async def process_group(message: Message, cursor: FSMCursor):
     group = message.content
     user = user_storage.get_user(message.sender.user_id)
     user.group = group
+    user_storage.update_user(user)
 
     cursor.change_state(OnboardingState.ROLE)
     await message.reply(
@@ -106,6 +108,7 @@ async def process_role(message: Message, cursor: FSMCursor):
 
     user = user_storage.get_user(message.sender.user_id)
     user.role = role_mapping.get(role_text, UserRole.BACHELOR)
+    user_storage.update_user(user)
 
     cursor.change_state(OnboardingState.CALENDAR)
     await message.reply(
@@ -122,6 +125,11 @@ async def process_calendar(message: Message, cursor: FSMCursor):
 
     if calendar_input.lower() != "пропустить":
         user.calendar_url = calendar_input
+        user_storage.update_user(user)
+        # Первый импорт календаря — сразу, не дожидаясь планового обновления
+        calendar_sync = getattr(message.bot, "calendar_sync", None)
+        if calendar_sync:
+            calendar_sync.schedule(user.user_id)
 
     cursor.change_state(OnboardingState.TAGS)
     await message.reply(
@@ -1,10 +1,11 @@
 from aiomax import Router
-from aiomax.types import Message
+from aiomax.types import CommandContext, Message
 from aiomax import buttons
 from aiomax.fsm import FSMCursor
 from aiomax.filters import has
 
-from database import user_storage
+from database import user_storage, task_storage
+from database.timezones import format_offset, parse_zone, user_zone
 from routers.focus import FocusState
 from services.state_guard import ensure_command_allowed
 from services.statistics import send_stats_message
@@ -30,17 +31,51 @@ async def show_schedule(message: Message, cursor: FSMCursor):
         f"• 🎓 Вуз: {user.university}\n"
         f"• 👥 Группа: {user.group}\n"
         f"• 🏷️ Предметы: {', '.join(user.tags) if user.tags else 'Не указаны'}\n"
-        f"• 📅 Календарь: {'Подключен ✅' if user.calendar_url else 'Не подключен ❌'}\n\n"
+        f"• 📅 Календарь: {'Подключен ✅' if user.calendar_url else 'Не подключен ❌'}\n"
+        f"• 🕐 Часовой пояс: {user_zone(user).key} ({format_offset(user_zone(user))})\n\n"
         "Используйте команды:\n"
         "• /deadlines - показать дедлайны\n"
         "• /focus - начать фокус-сессию\n"
-        "• /stats - статистика продуктивности",
+        "• /stats - статистика продуктивности\n"
+        "• /timezone - сменить часовой пояс",
         keyboard=buttons.KeyboardBuilder()
         .add(buttons.MessageButton("📅 Мои дедлайны"))
         .row(buttons.MessageButton("🎯 Начать фокус"), buttons.MessageButton("📊 Статистика"))
     )
 
 
+@schedule_router.on_command("timezone")
+async def set_timezone(message: CommandContext, cursor: FSMCursor):
+    user = user_storage.get_user(message.sender.user_id)
+    if not user or not user.onboarding_completed:
+        await message.reply("⚠️ Сначала завершите настройку профиля командой /start")
+        return
+
+    if not message.args_raw.strip():
+        await message.reply(
+            f"🕐 Ваш часовой пояс: {user_zone(user).key} ({format_offset(user_zone(user))})\n\n"
+            "Чтобы сменить его, укажите город, смещение или имя пояса:\n"
+            "• /timezone Новосибирск\n"
+            "• /timezone UTC+7\n"
+            "• /timezone Asia/Novosibirsk"
+        )
+        return
+
+    zone_name = parse_zone(message.args_raw)
+    if zone_name is None:
+        await message.reply("❌ Не удалось распознать часовой пояс. Попробуйте, например: /timezone UTC+5")
+        return
+
+    user.timezone = zone_name
+    user_storage.update_user(user)
+    # Сроки хранятся в UTC; перепланировать нужно только тихие часы напоминаний
+    task_storage.reschedule_reminders(user.user_id)
+    await message.reply(
+        f"✅ Часовой пояс сохранён: {zone_name} ({format_offset(user_zone(user))})\n"
+        "Даты из новых сообщений и время в напоминаниях будут по этому поясу."
+    )
+
+
 @schedule_router.on_message(has("📊 Статистика"))
 @schedule_router.on_message(has("📊 Мой прогресс"))
 async def schedule_stats_button(message: Message, cursor: FSMCursor):
@@ -1,4 +1,4 @@
-from .nlp_parser import extract_deadline_info
+from .nlp_parser import extract_deadline_info, extract_deadlines, iter_deadlines
 from .reminder import ReminderService
 
-__all__ = ['extract_deadline_info', 'ReminderService']
\ No newline at end of file
+__all__ = ['extract_deadline_info', 'extract_deadlines', 'iter_deadlines', 'ReminderService']
\ No newline at end of file
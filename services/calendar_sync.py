@@ -0,0 +1,558 @@
+import asyncio
+import base64
+import hashlib
+import heapq
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import aiohttp
+
+from database.models import Task, TaskStatus
+from database.timezones import as_utc, localize, now_utc, user_zone
+from metrics import registry
+from services.nlp_parser import guess_subject
+
+logger = logging.getLogger("max_focus_campus.calendar")
+
+# Верхняя граница сна планировщика
+MAX_SLEEP = 300
+# Первая повторная попытка после ошибки загрузки (дальше удваивается до интервала)
+RETRY_BASE = 60
+# Метка задач, пришедших из календаря
+CALENDAR_TAG = "календарь"
+
+CALENDAR_FETCHES = registry.counter(
+    "campus_calendar_fetch_total", "Calendar feed fetches by result (modified, not_modified, error)",
+    ["result"],
+)
+CALENDAR_EVENTS = registry.counter(
+    "campus_calendar_events_total", "Calendar events by result (added, updated, unchanged, skipped)",
+    ["result"],
+)
+CALENDAR_FEED_CACHE = registry.counter(
+    "campus_calendar_feed_cache_total",
+    "Calendar feed lookups by result (hit, miss, coalesced with an in-flight fetch)",
+    ["result"],
+)
+CALENDAR_SYNC_SECONDS = registry.histogram(
+    "campus_calendar_sync_seconds", "Time to refresh one calendar feed for all its subscribers"
+)
+
+# Ошибки загрузки ленты, после которых повторяем попытку позже
+FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError)
+
+
+def normalize_calendar_url(url: Optional[str]) -> Optional[str]:
+    """Ссылка для загрузки: webcal:// превращается в https://, прочие схемы не поддерживаются"""
+    url = (url or "").strip()
+    if url.lower().startswith("webcal://"):
+        url = "https://" + url[len("webcal://"):]
+    if not url.lower().startswith(("http://", "https://")):
+        return None
+    return url
+
+
+def calendar_task_id(user_id: int, uid: str) -> str:
+    """Постоянный id задачи для события: повторный импорт находит ту же задачу"""
+    digest = hashlib.blake2b(f"{user_id}\0{uid}".encode(), digest_size=9).digest()
+    return "ics-" + base64.urlsafe_b64encode(digest).decode()
+
+
+def _unescape(value: str) -> str:
+    return (
+        value.replace("\\n", "\n").replace("\\N", "\n")
+        .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+    )
+
+
+def parse_ics_datetime(params: Dict[str, str], value: str) -> Optional[datetime]:
+    """DTSTART/DUE как момент времени.
+
+    ``...Z`` — UTC; ``TZID`` — указанная зона. Дата без времени (конец дня),
+    время без зоны и неизвестная зона — «плавающее» время без tzinfo:
+    оно относится к поясу пользователя и переводится при импорте.
+    """
+    value = value.strip()
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime.strptime(value[:8], "%Y%m%d").replace(hour=23, minute=59)
+        moment = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    except ValueError:
+        return None
+
+    if value.endswith("Z"):
+        return moment.replace(tzinfo=timezone.utc)
+    tzid = params.get("TZID")
+    if tzid:
+        try:
+            zone = ZoneInfo(tzid.strip('"'))
+        except (ZoneInfoNotFoundError, ValueError):
+            return moment
+        return moment.replace(tzinfo=zone)
+    return moment
+
+
+class VEventParser:
+    """Построчный разбор .ics: ``feed`` возвращает событие на ``END:VEVENT``.
+
+    Событие — словарь ``{ИМЯ: (параметры, значение)}``; свёрнутые строки
+    склеиваются, свойства вложенных компонентов (VALARM) пропускаются.
+    Весь файл в памяти не держится — только текущее событие.
+    """
+
+    def __init__(self):
+        self._line: Optional[str] = None
+        self._event: Optional[dict] = None
+        self._nested = 0
+
+    def feed(self, line: str) -> Optional[dict]:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if self._line is not None:
+                self._line += line[1:]
+            return None
+        previous, self._line = self._line, line
+        return self._process(previous) if previous else None
+
+    def close(self) -> Optional[dict]:
+        previous, self._line = self._line, None
+        return self._process(previous) if previous else None
+
+    def _process(self, line: str) -> Optional[dict]:
+        head, _, value = line.partition(":")
+        name, *raw_params = head.split(";")
+        name = name.upper()
+
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and self._event is None:
+                self._event = {}
+            elif self._event is not None:
+                self._nested += 1
+            return None
+        if name == "END":
+            if self._event is not None and self._nested:
+                self._nested -= 1
+            elif value.upper() == "VEVENT" and self._event is not None:
+                event, self._event = self._event, None
+                return event
+            return None
+
+        if self._event is not None and not self._nested and name not in self._event:
+            params = {}
+            for param in raw_params:
+                key, _, param_value = param.partition("=")
+                params[key.upper()] = param_value
+            self._event[name] = (params, value)
+        return None
+
+
+def iter_vevents(lines: Iterable[str]) -> Iterator[dict]:
+    """События из уже прочитанных строк (удобно для проверки разбора)"""
+    parser = VEventParser()
+    for line in lines:
+        event = parser.feed(line)
+        if event is not None:
+            yield event
+    event = parser.close()
+    if event is not None:
+        yield event
+
+
+def event_fields(event: dict) -> Optional[tuple]:
+    """(uid, название, срок, описание, предмет) для события или None, если импортировать нечего"""
+    uid = event.get("UID", (None, ""))[1].strip()
+    summary = _unescape(event.get("SUMMARY", (None, ""))[1]).strip()
+    status = event.get("STATUS", (None, ""))[1].strip().upper()
+    if not uid or not summary or status == "CANCELLED":
+        return None
+
+    params, value = event.get("DUE") or event.get("DTSTART") or ({}, "")
+    deadline = parse_ics_datetime(params, value)
+    if deadline is None:
+        return None
+
+    description = None
+    if "DESCRIPTION" in event:
+        description = _unescape(event["DESCRIPTION"][1]).strip() or None
+    return uid, summary[:200], deadline, description, guess_subject(summary)
+
+
+class CalendarSyncService:
+    """Фоновый импорт .ics-календарей пользователей в задачи.
+
+    Лента хранится и обновляется по URL, а не по пользователю: студенты
+    одной группы присылают одну ссылку на расписание, и на всех
+    подписчиков приходится одна загрузка и один разбор за цикл обновления.
+    Одновременные запросы одной ленты ждут общую загрузку, а в течение
+    ``interval * (1 - jitter)`` после неё отдаётся разобранный результат.
+
+    Все загрузки идут через одну ``aiohttp.ClientSession`` с пулом
+    соединений на ``concurrency`` подключений. Для ленты запоминаются
+    ETag и Last-Modified; повторный запрос условный, ответ 304 обходится
+    без скачивания и разбора. Тело читается построчно и разбирается
+    по одному VEVENT; по хэшу содержимого пользователям, уже получившим
+    эту версию ленты, повторный импорт не делается (в том числе когда
+    сервер не поддерживает условные запросы). Событие становится задачей
+    с id, вычисленным из UID, поэтому повторный импорт обновляет ту же
+    задачу, а не создаёт копию. Следующее обновление ленты планируется
+    через ``interval`` секунд со случайным разбросом ``jitter``.
+    """
+
+    def __init__(
+        self,
+        bot,
+        interval: float = 3600,
+        jitter: float = 0.1,
+        concurrency: int = 8,
+        horizon_days: int = 60,
+        timeout: float = 30,
+        max_bytes: int = 5 * 1024 * 1024,
+    ):
+        self.bot = bot
+        self.interval = interval
+        self.jitter = jitter
+        self.fresh_for = interval * (1 - jitter)
+        self.concurrency = concurrency
+        self.horizon = timedelta(days=horizon_days)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.user_storage = getattr(bot, "user_storage", None)
+        self.task_storage = getattr(bot, "task_storage", None)
+
+        self.is_running = False
+        self.task = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._wakeup = None
+        self._slots = None
+        self._inflight = set()
+        # (момент запуска по time.monotonic, url); устаревшие записи пропускаются
+        self._queue: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}
+        # url -> состояние ленты (см. _feed)
+        self._feeds: Dict[str, dict] = {}
+        self._user_urls: Dict[int, str] = {}
+        # user_id -> хэш версии ленты, уже импортированной пользователю
+        self._applied: Dict[int, str] = {}
+
+    async def start(self):
+        """Запуск планировщика и распределение первых загрузок по времени"""
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        user_ids = self.user_storage.get_calendar_user_ids() if self.user_storage else []
+        for user_id in user_ids:
+            self._subscribe(user_id)
+        for url in self._feeds:
+            self._schedule_feed(url, random.uniform(0, self.interval * self.jitter))
+        self.task = asyncio.create_task(self._sync_loop())
+        logger.info(f"Calendar sync started for {len(user_ids)} users, {len(self._feeds)} feeds")
+
+    async def stop(self):
+        """Остановка планировщика и незавершённых загрузок"""
+        self.is_running = False
+        tasks = [task for task in (self.task, *self._inflight) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.session:
+            await self.session.close()
+            self.session = None
+        logger.info("Calendar sync stopped")
+
+    def schedule(self, user_id: int, delay: float = 0):
+        """Подписывает пользователя на ленту из профиля и планирует её обработку"""
+        url = self._subscribe(user_id)
+        if url is not None:
+            self._schedule_feed(url, delay)
+
+    def _feed(self, url: str) -> dict:
+        feed = self._feeds.get(url)
+        if feed is None:
+            feed = self._feeds[url] = {
+                "etag": None,
+                "last_modified": None,
+                "content_hash": None,
+                # Разобранные события: кортежи из event_fields
+                "events": [],
+                "fetched_at": None,
+                "failures": 0,
+                "fetch": None,
+                "subscribers": set(),
+            }
+        return feed
+
+    def _subscribe(self, user_id: int) -> Optional[str]:
+        user = self.user_storage.get_user(user_id) if self.user_storage else None
+        url = normalize_calendar_url(user.calendar_url if user else None)
+        if user and user.calendar_url and url is None:
+            logger.warning(f"Unsupported calendar URL for user {user_id}")
+
+        previous = self._user_urls.get(user_id)
+        if previous is not None and previous != url:
+            self._unsubscribe(user_id)
+        if url is None:
+            return None
+        self._user_urls[user_id] = url
+        self._feed(url)["subscribers"].add(user_id)
+        return url
+
+    def _unsubscribe(self, user_id: int):
+        url = self._user_urls.pop(user_id, None)
+        self._applied.pop(user_id, None)
+        feed = self._feeds.get(url)
+        if feed is None:
+            return
+        feed["subscribers"].discard(user_id)
+        if not feed["subscribers"] and feed["fetch"] is None:
+            del self._feeds[url]
+            self._scheduled.pop(url, None)
+
+    def _schedule_feed(self, url: str, delay: float):
+        due = time.monotonic() + delay
+        self._scheduled[url] = due
+        heapq.heappush(self._queue, (due, url))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _pop_due(self) -> Optional[str]:
+        now = time.monotonic()
+        while self._queue and self._queue[0][0] <= now:
+            due, url = heapq.heappop(self._queue)
+            if self._scheduled.get(url) == due:
+                del self._scheduled[url]
+                return url
+        return None
+
+    async def _sync_loop(self):
+        while self.is_running:
+            try:
+                url = self._pop_due()
+                if url is None:
+                    await self._wait_for_next()
+                    continue
+                await self._slots.acquire()
+                task = asyncio.create_task(self._run_feed(url))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in calendar sync loop: {e}")
+                await asyncio.sleep(MAX_SLEEP)
+
+    async def _wait_for_next(self):
+        delay = min(self._queue[0][0] - time.monotonic(), MAX_SLEEP) if self._queue else MAX_SLEEP
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_feed(self, url: str):
+        """Обновляет ленту и раздаёт её всем подписчикам"""
+        feed = self._feeds.get(url)
+        delay = self._jittered(self.interval)
+        try:
+            if feed is None or not feed["subscribers"]:
+                if feed is not None and feed["fetch"] is None:
+                    del self._feeds[url]
+                return
+            with CALENDAR_SYNC_SECONDS.time():
+                await self.fetch_feed(url)
+                for user_id in list(feed["subscribers"]):
+                    self._apply(user_id, url, feed)
+                    # Не занимаем цикл событий надолго при сотнях подписчиков
+                    await asyncio.sleep(0)
+        except FETCH_ERRORS:
+            delay = self._jittered(min(self.interval, RETRY_BASE * 2 ** (feed["failures"] - 1)))
+        except Exception as e:
+            logger.error(f"Error syncing calendar {url}: {e}")
+        finally:
+            self._slots.release()
+        if self.is_running and url in self._feeds:
+            if feed["fetched_at"] is not None and not feed["failures"]:
+                # Лента могла быть загружена раньше по запросу нового подписчика
+                delay -= time.monotonic() - feed["fetched_at"]
+            self._schedule_feed(url, max(delay, 0))
+
+    async def fetch_feed(self, url: str) -> dict:
+        """Состояние ленты с событиями: из кэша, из общей загрузки или новой загрузкой"""
+        feed = self._feed(url)
+        if feed["fetch"] is not None:
+            CALENDAR_FEED_CACHE.inc("coalesced")
+            await asyncio.shield(feed["fetch"])
+            return feed
+        if feed["fetched_at"] is not None and time.monotonic() - feed["fetched_at"] < self.fresh_for:
+            CALENDAR_FEED_CACHE.inc("hit")
+            return feed
+
+        CALENDAR_FEED_CACHE.inc("miss")
+        feed["fetch"] = asyncio.create_task(self._fetch(url, feed))
+        try:
+            await asyncio.shield(feed["fetch"])
+        finally:
+            feed["fetch"] = None
+        return feed
+
+    async def _fetch(self, url: str, feed: dict):
+        try:
+            status = await self._download(url, feed)
+        except FETCH_ERRORS as e:
+            feed["failures"] += 1
+            CALENDAR_FETCHES.inc("error")
+            logger.warning(f"Calendar fetch failed for {url}: {type(e).__name__}: {e}")
+            raise
+        feed["failures"] = 0
+        feed["fetched_at"] = time.monotonic()
+        CALENDAR_FETCHES.inc(status)
+
+    async def _download(self, url: str, feed: dict) -> str:
+        headers = {}
+        if feed["etag"]:
+            headers["If-None-Match"] = feed["etag"]
+        if feed["last_modified"]:
+            headers["If-Modified-Since"] = feed["last_modified"]
+
+        async with self.session.get(url, headers=headers) as response:
+            if response.status == 304:
+                return "not_modified"
+            response.raise_for_status()
+
+            events = []
+            seen = set()
+            digest = hashlib.sha256()
+            parser = VEventParser()
+            size = 0
+            async for raw_line in response.content:
+                size += len(raw_line)
+                if size > self.max_bytes:
+                    raise ValueError(f"calendar is larger than {self.max_bytes} bytes")
+                digest.update(raw_line)
+                event = parser.feed(raw_line.decode("utf-8", errors="replace"))
+                if event is not None:
+                    self._collect_event(event, events, seen)
+            event = parser.close()
+            if event is not None:
+                self._collect_event(event, events, seen)
+
+            # Состояние меняем только после полного успешного чтения
+            feed["etag"] = response.headers.get("ETag")
+            feed["last_modified"] = response.headers.get("Last-Modified")
+
+        content_hash = digest.hexdigest()
+        if content_hash == feed["content_hash"]:
+            return "not_modified"
+        feed["content_hash"] = content_hash
+        feed["events"] = events
+        logger.info(f"Calendar {url} parsed: {len(events)} events, {len(feed['subscribers'])} subscribers")
+        return "modified"
+
+    @staticmethod
+    def _collect_event(event: dict, events: list, seen: set):
+        fields = event_fields(event)
+        # Повторы с RECURRENCE-ID делят UID — берётся первое вхождение
+        if fields is None or fields[0] in seen:
+            CALENDAR_EVENTS.inc("skipped")
+            return
+        seen.add(fields[0])
+        events.append(fields)
+
+    async def sync_user(self, user_id: int) -> Optional[dict]:
+        """Загружает (или берёт из кэша) ленту пользователя и импортирует её; None — календаря нет"""
+        url = self._subscribe(user_id)
+        if url is None:
+            return None
+        feed = self._feeds[url]
+        try:
+            await self.fetch_feed(url)
+        except FETCH_ERRORS as e:
+            return {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        return self._apply(user_id, url, feed)
+
+    def _apply(self, user_id: int, url: str, feed: dict) -> dict:
+        """Импортирует пользователю текущую версию ленты, если он её ещё не получил"""
+        if feed["content_hash"] is None or self._applied.get(user_id) == feed["content_hash"]:
+            return {"status": "not_modified"}
+        user = self.user_storage.get_user(user_id)
+        if user is None or normalize_calendar_url(user.calendar_url) != url:
+            self._unsubscribe(user_id)
+            return {"status": "not_modified"}
+
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "skipped": 0, "removed": 0}
+        zone = user_zone(user)
+        now = now_utc()
+        new_tasks = []
+        for uid, title, deadline, description, subject in feed["events"]:
+            deadline = as_utc(localize(deadline, zone))
+            if deadline < now or deadline > now + self.horizon:
+                counts["skipped"] += 1
+            else:
+                fields = (uid, title, deadline, description, subject)
+                counts[self._import_event(user_id, fields, new_tasks)] += 1
+        # Новые задачи сохраняются одной записью, а не перезаписью на событие
+        if new_tasks:
+            self.task_storage.add_tasks(new_tasks)
+        counts["removed"] = self._remove_vanished(user_id, feed["events"], now)
+        self._applied[user_id] = feed["content_hash"]
+
+        for result, count in counts.items():
+            if count:
+                CALENDAR_EVENTS.inc(result, amount=count)
+        logger.info(f"Calendar synced for user {user_id}: {counts}")
+        return {"status": "modified", **counts}
+
+    def _remove_vanished(self, user_id: int, events: list, now) -> int:
+        """Удаляет будущие активные задачи календаря, событий которых больше нет в ленте"""
+        feed_ids = {calendar_task_id(user_id, event[0]) for event in events}
+        vanished = [
+            task.id
+            for task in self.task_storage.get_upcoming_deadlines(user_id, days=self.horizon.days + 1)
+            if CALENDAR_TAG in task.tags and task.id.startswith("ics-")
+            and task.id not in feed_ids and task.deadline >= now
+        ]
+        return self.task_storage.delete_tasks(vanished) if vanished else 0
+
+    def _import_event(self, user_id: int, fields: tuple, new_tasks: List[Task]) -> str:
+        """Обновляет задачу по событию или добавляет новую в ``new_tasks``; возвращает исход для счётчиков"""
+        uid, title, deadline, description, subject = fields
+        task_id = calendar_task_id(user_id, uid)
+        task = self.task_storage.get_task(task_id)
+        if task is None:
+            new_tasks.append(Task(
+                user_id=user_id,
+                title=title,
+                deadline=deadline,
+                id=task_id,
+                description=description,
+                subject=subject,
+                tags=(CALENDAR_TAG,),
+            ))
+            return "added"
+
+        # Просроченное событие перенесли на будущее: задача снова активна
+        reopen = task.status == TaskStatus.OVERDUE and task.deadline != deadline
+        if (task.status != TaskStatus.PENDING and not reopen) or (
+            task.title == title and task.deadline == deadline and task.description == description
+        ):
+            return "unchanged"
+        task.title = title
+        if task.deadline != deadline:
+            # Срок перенесён: напоминания по новому сроку отправляются заново
+            task.reminders_sent = ()
+        task.deadline = deadline
+        task.description = description
+        self.task_storage.update_task(task)
+        if reopen:
+            self.task_storage.update_task_status(task.id, TaskStatus.PENDING)
+        return "updated"
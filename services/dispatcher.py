@@ -0,0 +1,188 @@
+import asyncio
+from collections import defaultdict, deque
+import logging
+import time
+from typing import Awaitable, Callable, Deque, Dict, Set
+
+from aiomax import exceptions
+
+from metrics import registry
+
+logger = logging.getLogger("max_focus_campus.dispatcher")
+
+SEND_LATENCY = registry.histogram(
+    "campus_send_latency_seconds", "Outbound send_message latency (successful attempts)"
+)
+SEND_RESULTS = registry.counter(
+    "campus_messages_total", "Outbound messages by result (sent, failed, retry)", ["result"]
+)
+
+# Ошибки, которые не исправятся повторной отправкой
+NON_RETRYABLE = (
+    exceptions.InvalidToken,
+    exceptions.ChatNotFound,
+    exceptions.IncorrectTextLength,
+    exceptions.AccessDeniedException,
+    exceptions.NotFoundException,
+)
+
+
+class TokenBucket:
+    """Ограничение частоты запросов: ``rate`` токенов в секунду, запас ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class MessageDispatcher:
+    """Общая очередь исходящих сообщений для фоновых сервисов.
+
+    Сообщения одного пользователя отправляются строго по порядку, разные
+    пользователи обслуживаются параллельно (не больше ``concurrency``
+    одновременных запросов) с общим ограничением частоты и повторами
+    с экспоненциальной задержкой.
+    """
+
+    def __init__(
+        self,
+        send: Callable[..., Awaitable],
+        concurrency: int = 8,
+        rate: float = 25.0,
+        burst: float = 25.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        self.send = send
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._pending: Dict[int, Deque] = defaultdict(deque)
+        self._scheduled: Set[int] = set()
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._workers = []
+        self._depth = 0
+
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.send_time_total = 0.0
+        self.send_time_max = 0.0
+        self.queue_wait_max = 0.0
+        registry.gauge(
+            "campus_dispatch_queue_depth", "Outbound messages waiting to be sent",
+            callback=lambda: self._depth,
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self._depth
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self._depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "send_latency_avg": self.send_time_total / self.sent if self.sent else 0.0,
+            "send_latency_max": self.send_time_max,
+            "queue_wait_max": self.queue_wait_max,
+        }
+
+    async def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+        logger.info(f"Message dispatcher started with {self.concurrency} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        """Дожидается отправки очереди (не дольше ``timeout``) и останавливает воркеров"""
+        deadline = time.monotonic() + timeout
+        while self._depth and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Message dispatcher stopped: {self.metrics()}")
+
+    def enqueue(self, user_id: int, **kwargs) -> asyncio.Future:
+        """Ставит сообщение в очередь пользователя.
+
+        Возвращает future с отправленным сообщением (или ``None``, если
+        отправить не удалось); ждать его не обязательно.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[user_id].append((kwargs, future, time.monotonic()))
+        self._depth += 1
+        if user_id not in self._scheduled:
+            self._scheduled.add(user_id)
+            self._ready.put_nowait(user_id)
+        return future
+
+    async def _worker(self):
+        while True:
+            user_id = await self._ready.get()
+            queue = self._pending[user_id]
+            kwargs, future, enqueued_at = queue.popleft()
+            self.queue_wait_max = max(self.queue_wait_max, time.monotonic() - enqueued_at)
+
+            try:
+                result = await self._deliver(user_id, kwargs)
+            finally:
+                self._depth -= 1
+                # Пользователь возвращается в конец очереди, чтобы не держать воркера
+                if queue:
+                    self._ready.put_nowait(user_id)
+                else:
+                    self._scheduled.discard(user_id)
+                    del self._pending[user_id]
+
+            if not future.done():
+                future.set_result(result)
+
+    async def _deliver(self, user_id: int, kwargs: dict):
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            started = time.monotonic()
+            try:
+                message = await self.send(user_id=user_id, **kwargs)
+            except NON_RETRYABLE as e:
+                logger.error(f"Dropping message to user {user_id}: {e!r}")
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error sending message to user {user_id}: {e!r}")
+                    break
+                self.retries += 1
+                SEND_RESULTS.inc("retry")
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+            else:
+                elapsed = time.monotonic() - started
+                self.sent += 1
+                self.send_time_total += elapsed
+                self.send_time_max = max(self.send_time_max, elapsed)
+                SEND_LATENCY.observe(elapsed)
+                SEND_RESULTS.inc("sent")
+                return message
+
+        self.failed += 1
+        SEND_RESULTS.inc("failed")
+        return None
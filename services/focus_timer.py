@@ -0,0 +1,124 @@
+import asyncio
+import heapq
+from datetime import timedelta
+import logging
+
+from aiomax import buttons
+
+from database.timezones import now_utc
+
+logger = logging.getLogger("max_focus_campus.focus_timer")
+
+# Верхняя граница сна цикла (страховка от скачков системных часов)
+MAX_SLEEP = 300
+# Сессии, закончившиеся давно (например, пока бот был выключен),
+# завершаются без уведомления пользователя
+STALE_AFTER = timedelta(hours=1)
+
+
+class FocusTimerService:
+    """Единый планировщик окончания фокус-сессий.
+
+    Вместо отдельной asyncio-задачи на каждую сессию держит min-heap
+    времён окончания (``start_time + duration``), при старте восстанавливает
+    незавершённые сессии из ``FocusStorage`` и завершает наступившие пачкой.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.is_running = False
+        self.task = None
+        self._wakeup = None
+        self._heap = []
+        self.focus_storage = getattr(bot, "focus_storage", None)
+        self.dispatcher = getattr(bot, "dispatcher", None)
+
+    async def start(self):
+        """Запуск планировщика и восстановление активных сессий"""
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+        if self.focus_storage:
+            sessions = self.focus_storage.get_active_sessions()
+            for session in sessions:
+                self.schedule(session)
+            logger.info(f"Restored {len(sessions)} active focus sessions")
+        self.task = asyncio.create_task(self._timer_loop())
+        logger.info("Focus timer service started")
+
+    async def stop(self):
+        """Остановка планировщика"""
+        self.is_running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Focus timer service stopped")
+
+    def schedule(self, session):
+        """Ставит сессию в очередь на завершение"""
+        end_time = session.start_time + timedelta(minutes=session.duration)
+        heapq.heappush(self._heap, (end_time, session.id, session.user_id, session.duration))
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _timer_loop(self):
+        while self.is_running:
+            try:
+                await self._complete_due()
+                await self._wait_for_next()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in focus timer loop: {e}")
+                await asyncio.sleep(MAX_SLEEP)
+
+    async def _wait_for_next(self):
+        delay = MAX_SLEEP
+        if self._heap:
+            delay = min(max((self._heap[0][0] - now_utc()).total_seconds(), 0), MAX_SLEEP)
+
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _complete_due(self):
+        """Завершает все наступившие сессии одной записью в хранилище"""
+        now = now_utc()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        if not due:
+            return
+
+        self.focus_storage.mark_sessions_completed([session_id for _, session_id, _, _ in due])
+
+        fsm_storage = self.bot.bot.storage
+        for end_time, session_id, user_id, duration in due:
+            # Сбрасываем состояние, только если пользователь всё ещё в этой сессии
+            data = fsm_storage.get_data(user_id)
+            if isinstance(data, dict) and data.get("session_id") == session_id:
+                fsm_storage.clear(user_id)
+
+            if now - end_time <= STALE_AFTER:
+                self._notify(user_id, duration)
+
+        logger.info(f"Completed {len(due)} focus sessions")
+
+    def _notify(self, user_id: int, duration: int):
+        self.dispatcher.enqueue(
+            user_id,
+            text=f"✅ **Фокус-сессия завершена!**\n\n"
+            f"Отличная работа! {duration} минут продуктивной работы позади.\n\n"
+            "Сделайте перерыв:\n"
+            "• 🚶 Пройдитесь 5 минут\n"
+            "• 💧 Выпейте воды\n"
+            "• 🧘 Сделайте разминку",
+            keyboard=buttons.KeyboardBuilder().add(
+                buttons.MessageButton("🔄 Новая сессия"),
+                buttons.MessageButton("📊 Статистика"),
+            ),
+        )
@@ -1,85 +1,246 @@
+import hashlib
+from itertools import islice
 import re
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Union
+from zoneinfo import ZoneInfo
+
+from database.timezones import get_zone, localize
+from services.ttl_cache import TTLCache
+
+MONTHS = {
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4,
+    'мая': 5, 'июня': 6, 'июля': 7, 'августа': 8,
+    'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12
+}
+
+# Все паттерны дат в одном выражении; порядок групп задаёт приоритет
+# (как в прежнем списке паттернов: первым выигрывает полный формат даты)
+DATE_PATTERN_PRIORITY = ['dd_mm_yyyy', 'russian_date', 'days_after', 'until_dd_mm']
+# Просмотр вперёд по первому символу отсекает позиции, где не начинается
+# ни один паттерн, до перебора альтернатив (в несколько раз быстрее)
+DATE_RE = re.compile(
+    r'(?=[\dдч])(?:'
+    r'(?P<dd_mm_yyyy>(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{2,4}))'
+    r'|(?P<russian_date>(\d{1,2})\s+(' + '|'.join(MONTHS) + r'))'
+    r'|(?P<days_after>через\s+(\d+)\s+(?:день|дня|дней))'
+    # «до 12.12» без года; если за датой идёт год, это полный формат.
+    # (?!\d) не даёт месяцу укоротиться до одной цифры («до 12.1» из «12.12.2026»)
+    r'|(?P<until_dd_mm>до\s+(\d{1,2})[\.\/](\d{1,2})(?!\d)(?![\.\/]\d))'
+    r')'
+)
+_GROUP_OFFSETS = {name: DATE_RE.groupindex[name] for name in DATE_PATTERN_PRIORITY}
+
+# Границы фрагментов длинного текста: перевод строки или конец предложения
+# (точки внутри дат вида 12.12.2026 не отделены пробелом и границей не считаются)
+SEGMENT_RE = re.compile(r'[^\n]+?(?:[.!?;](?=\s)|$)', re.MULTILINE)
+# Маркеры списков в начале фрагмента: «1)», «2.», «-», «•»
+BULLET_RE = re.compile(r'^\s*(?:\d{1,2}[.)]\s+|[-–—•*]\s*)')
+_WORD_RE = re.compile(r'[^\W\d_]')
+
+# Разобранные сообщения: одно объявление пересылают в бота десятки студентов.
+# Ключ — пояс, местный день разбора и хэш нормализованного текста:
+# даты без года («12 марта», «до 12.12») зависят от текущей даты
+PARSE_CACHE_SIZE = 4096
+_parse_cache = TTLCache("deadline_parse", maxsize=PARSE_CACHE_SIZE, ttl=24 * 3600)
+
+SUBJECT_KEYWORDS = {
+    'математика': ['мат', 'алгебр', 'геометр', 'математик'],
+    'программирование': ['прог', 'код', 'алгоритм', 'python', 'java'],
+    'физика': ['физик', 'механи', 'оптик', 'термодинамик'],
+    'английский': ['англ', 'english', 'language', 'speaking']
+}
+_SUBJECTS = list(SUBJECT_KEYWORDS)
+_KEYWORD_SUBJECT = {
+    keyword: priority
+    for priority, keywords in reversed(list(enumerate(SUBJECT_KEYWORDS.values())))
+    for keyword in keywords
+}
+# Просмотр вперёд находит вхождения в каждой позиции, в том числе
+# перекрывающиеся; при общем начале побеждает ключ предмета с меньшим приоритетом
+SUBJECT_RE = re.compile(
+    '(?=[' + re.escape(''.join(sorted({keyword[0] for keyword in _KEYWORD_SUBJECT}))) + '])'
+    '(?=(' + '|'.join(
+        re.escape(keyword)
+        for keywords in SUBJECT_KEYWORDS.values()
+        for keyword in sorted(keywords, key=len, reverse=True)
+    ) + '))'
+)
+
 
 def extract_deadline_info(text: str) -> Optional[Dict]:
     """Извлечение информации о дедлайне из текста"""
-    
-    # Паттерны для дат
-    date_patterns = [
-        (r'(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{2,4})', 'dd_mm_yyyy'),  # DD.MM.YYYY
-        (r'(\d{1,2})\s+(января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)', 'russian_date'),
-        (r'через\s+(\d+)\s+(день|дня|дней)', 'days_after'),
-        (r'до\s+(\d{1,2})[\.\/](\d{1,2})', 'until_dd_mm'),
-    ]
-    
-    # Поиск даты
-    deadline_date = None
-    for pattern, pattern_type in date_patterns:
-        match = re.search(pattern, text.lower())
-        if match:
-            deadline_date = parse_date_from_match(match, pattern_type)
-            if deadline_date:
-                break
-    
+    text_lower = text.lower()
+    deadline_date = find_deadline(text_lower)
+
     if not deadline_date:
         return None
-    
+
     # Извлечение названия (первые 3-7 слов)
     words = text.split()[:7]
     title = ' '.join(words)
-    
+
     return {
         'title': title,
         'deadline': deadline_date,
-        'subject': guess_subject(text),
+        'subject': guess_subject(text_lower),
         'confidence': 0.7
     }
 
+
+def iter_deadlines(text: str, tz: Optional[ZoneInfo] = None) -> Iterator[Dict]:
+    """Все дедлайны длинного текста (силлабус, пересланный дайджест) по мере нахождения.
+
+    Текст разбирается по строкам и предложениям; у каждой найденной даты
+    своё название — первые слова текста от предыдущей даты до неё (или
+    после неё, если дата стоит в начале). Предмет определяется по этой
+    части, а если в ней нет ключевых слов — по всему тексту. Повторы
+    (то же название и дата) пропускаются.
+
+    Даты понимаются как время в поясе ``tz`` (по умолчанию DEFAULT_TIMEZONE),
+    сроки возвращаются с поясом.
+    """
+    zone = tz or get_zone()
+    now = datetime.now(zone)
+    for spec in _iter_deadline_specs(text, now.replace(tzinfo=None)):
+        yield _resolve(spec, now)
+
+
+def normalize_text(text: str) -> str:
+    """Текст без лишних пробелов и пустых строк — разбор от этого не меняется"""
+    return '\n'.join(' '.join(line.split()) for line in text.splitlines() if line.strip())
+
+
+def extract_deadlines(text: str, limit: int = 20, tz: Optional[ZoneInfo] = None) -> List[Dict]:
+    """Как ``iter_deadlines`` (не больше ``limit``), но с кэшем разборов.
+
+    Относительные сроки («через 3 дня») хранятся в кэше как смещение
+    и пересчитываются от текущего момента при каждом обращении.
+    """
+    zone = tz or get_zone()
+    now = datetime.now(zone)
+    normalized = normalize_text(text)
+    key = (
+        zone.key, now.date(), limit, hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+    )
+    specs = _parse_cache.get(key)
+    if specs is None:
+        specs = list(islice(_iter_deadline_specs(normalized, now.replace(tzinfo=None)), limit))
+        _parse_cache.set(key, specs)
+    return [_resolve(spec, now) for spec in specs]
+
+
+def _resolve(spec: Dict, now: datetime) -> Dict:
+    """Срок с поясом ``now``: смещение — от текущего момента, дата — по местным часам"""
+    if isinstance(spec['deadline'], timedelta):
+        return dict(spec, deadline=now + spec['deadline'])
+    return dict(spec, deadline=localize(spec['deadline'], now.tzinfo))
+
+
+def _iter_deadline_specs(text: str, now: datetime) -> Iterator[Dict]:
+    """Разбор для iter_deadlines: срок — местная дата без пояса или смещение от ``now``"""
+    text_subject = None
+    seen = set()
+    for segment in SEGMENT_RE.finditer(text):
+        segment_text = segment.group()
+        segment_lower = segment_text.lower()
+        matches = [
+            (match, deadline)
+            for match in DATE_RE.finditer(segment_lower)
+            if (deadline := _parse_match(match, match.lastgroup, now))
+        ]
+        for i, (match, deadline) in enumerate(matches):
+            start = matches[i - 1][0].end() if i else 0
+            end = match.end()
+            if not _WORD_RE.search(segment_text, start, match.start()):
+                # Дата в начале («15.11 — коллоквиум»): название идёт после неё
+                end = matches[i + 1][0].start() if i + 1 < len(matches) else len(segment_text)
+            context = BULLET_RE.sub('', segment_text[start:end].strip(' ,;.'))
+            title = ' '.join(context.split()[:7])
+            if not title or (title, deadline) in seen:
+                continue
+            seen.add((title, deadline))
+
+            subject = guess_subject(context)
+            if subject == 'другое':
+                if text_subject is None:
+                    text_subject = guess_subject(text)
+                subject = text_subject
+            yield {
+                'title': title,
+                'deadline': deadline,
+                'subject': subject,
+                'confidence': 0.7
+            }
+
+
+def find_deadline(text_lower: str) -> Optional[datetime]:
+    """Один проход по тексту: первое совпадение каждого типа, затем выбор по приоритету"""
+    first_matches = {}
+    for match in DATE_RE.finditer(text_lower):
+        pattern_type = match.lastgroup
+        if pattern_type not in first_matches:
+            first_matches[pattern_type] = match
+
+    for pattern_type in DATE_PATTERN_PRIORITY:
+        match = first_matches.get(pattern_type)
+        if match:
+            deadline_date = parse_date_from_match(match, pattern_type)
+            if deadline_date:
+                return deadline_date
+    return None
+
+
 def parse_date_from_match(match, pattern_type: str) -> Optional[datetime]:
     """Парсинг даты из найденного совпадения"""
     now = datetime.now()
-    
+    deadline = _parse_match(match, pattern_type, now)
+    if isinstance(deadline, timedelta):
+        return now + deadline
+    return deadline
+
+
+def _parse_match(match, pattern_type: str, now: datetime) -> Optional[Union[datetime, timedelta]]:
+    """Дата из совпадения; для «через N дней» — смещение от текущего момента"""
+    offset = _GROUP_OFFSETS[pattern_type]
+
     try:
         if pattern_type == 'days_after':
-            days = int(match.group(1))
-            return now + timedelta(days=days)
-        
+            return timedelta(days=int(match.group(offset + 1)))
+
         elif pattern_type == 'russian_date':
-            day = int(match.group(1))
-            month_name = match.group(2)
-            months = {
-                'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4,
-                'мая': 5, 'июня': 6, 'июля': 7, 'августа': 8,
-                'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12
-            }
-            month = months[month_name]
+            day = int(match.group(offset + 1))
+            month = MONTHS[match.group(offset + 2)]
             year = now.year if month >= now.month else now.year + 1
             return datetime(year, month, day)
-        
-        elif pattern_type in ['dd_mm_yyyy', 'until_dd_mm']:
-            day, month, year = map(int, match.groups())
+
+        elif pattern_type == 'dd_mm_yyyy':
+            day, month, year = map(int, match.group(offset + 1, offset + 2, offset + 3))
             if year < 100:
                 year += 2000
             return datetime(year, month, day)
-    
+
+        elif pattern_type == 'until_dd_mm':
+            day, month = map(int, match.group(offset + 1, offset + 2))
+            deadline = datetime(now.year, month, day)
+            if deadline.date() < now.date():
+                deadline = deadline.replace(year=now.year + 1)
+            return deadline
+
     except Exception:
         return None
-    
+
     return None
 
+
 def guess_subject(text: str) -> str:
     """Определение предмета по ключевым словам"""
-    subject_keywords = {
-        'математика': ['мат', 'алгебр', 'геометр', 'математик'],
-        'программирование': ['прог', 'код', 'алгоритм', 'python', 'java'],
-        'физика': ['физик', 'механи', 'оптик', 'термодинамик'],
-        'английский': ['англ', 'english', 'language', 'speaking']
-    }
-    
-    text_lower = text.lower()
-    for subject, keywords in subject_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            return subject
-    
-    return 'другое'
\ No newline at end of file
+    best = len(_SUBJECTS)
+    for match in SUBJECT_RE.finditer(text.lower()):
+        priority = _KEYWORD_SUBJECT[match.group(1)]
+        if priority < best:
+            best = priority
+            if best == 0:
+                break
+
+    return _SUBJECTS[best] if best < len(_SUBJECTS) else 'другое'
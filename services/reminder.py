@@ -1,22 +1,53 @@
 import asyncio
-from datetime import datetime, timedelta
 import logging
+import time
+from functools import partial
+from typing import Dict, Optional, Set, Tuple
 
 from database import user_storage, task_storage
+from database.models import TaskStatus
+from database.reminder_policy import format_time_left, policy_for
+from database.timezones import timestamp, to_local, user_zone
+from metrics import registry
 
 logger = logging.getLogger("max_focus_campus.reminder")
 
+# Верхняя граница сна цикла (страховка от скачков системных часов)
+MAX_SLEEP = 300
+# Повтор неотправленного напоминания: через 60, 120, 240... секунд, не больше 5 раз
+RETRY_DELAY = 60
+MAX_DELIVERY_RETRIES = 5
+
+REMINDER_TICK_SECONDS = registry.histogram(
+    "campus_reminder_tick_seconds", "Time to process due reminders in one loop iteration"
+)
+REMINDER_MESSAGES = registry.counter(
+    "campus_reminder_messages_total", "Reminder messages queued by kind (single, digest)", ["kind"]
+)
+REMINDER_ITEMS = registry.counter(
+    "campus_reminder_items_total", "Task reminders delivered, including those batched into digests"
+)
+
 class ReminderService:
     def __init__(self, bot):
         self.bot = bot
         self.is_running = False
         self.task = None
+        self._wakeup = None
         self.user_storage = getattr(bot, "user_storage", None)
         self.task_storage = getattr(bot, "task_storage", None)
+        self.dispatcher = getattr(bot, "dispatcher", None)
+        # Напоминания (task_id, смещение), ещё не отправленные диспетчером
+        self._in_flight: Set[Tuple[str, int]] = set()
+        # Число неудачных отправок напоминания (task_id, смещение)
+        self._failures: Dict[Tuple[str, int], int] = {}
     
     async def start(self):
         """Запуск сервиса напоминаний"""
         self.is_running = True
+        self._wakeup = asyncio.Event()
+        if self.task_storage:
+            self.task_storage.deadline_index.add_listener(self._wakeup.set)
         self.task = asyncio.create_task(self._reminder_loop())
         logger.info("Reminder service started")
     
@@ -32,57 +63,136 @@ class ReminderService:
         logger.info("Reminder service stopped")
     
     async def _reminder_loop(self):
-        """Основной цикл проверки напоминаний"""
+        """Основной цикл: спим ровно до ближайшего напоминания из индекса"""
         while self.is_running:
             try:
-                await self._check_deadlines()
-                await asyncio.sleep(60)  # Проверка каждую минуту
+                with REMINDER_TICK_SECONDS.time():
+                    await self._check_deadlines()
+                await self._wait_for_next()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in reminder loop: {e}")
-                await asyncio.sleep(60)
+                await asyncio.sleep(MAX_SLEEP)
+
+    async def _wait_for_next(self):
+        """Ожидание до следующего напоминания или до добавления новой задачи"""
+        delay = MAX_SLEEP
+        next_fire = self.task_storage.deadline_index.next_fire_time() if self.task_storage else None
+        if next_fire is not None:
+            delay = min(max(next_fire - time.time(), 0), MAX_SLEEP)
+
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
     
-    async def _check_deadlines(self):
-        """Проверка приближающихся дедлайнов"""
+    async def _check_deadlines(self, now: Optional[float] = None):
+        """Отправка наступивших напоминаний из индекса дедлайнов"""
         try:
             if not self.user_storage or not self.task_storage:
                 logger.warning("Storage is not configured for reminder service")
                 return
 
-            # Получаем всех пользователей
-            for user_id in list(self.user_storage.users.keys()):
-                tasks = self.task_storage.get_upcoming_deadlines(user_id, days=1)
-                
-                for task in tasks:
-                    time_left = task.deadline - datetime.now()
-                    
-                    # Напоминание за 24 часа
-                    if timedelta(hours=23) < time_left <= timedelta(hours=24):
-                        await self._send_reminder(user_id, task, "24 часа")
-                    
-                    # Напоминание за 3 часа
-                    elif timedelta(hours=2.5) < time_left <= timedelta(hours=3):
-                        await self._send_reminder(user_id, task, "3 часа")
-                    
-                    # Напоминание за 30 минут
-                    elif timedelta(minutes=25) < time_left <= timedelta(minutes=30):
-                        await self._send_reminder(user_id, task, "30 минут")
+            # Наступившие напоминания группируются по пользователю: в режиме
+            # дайджеста (/reminders дайджест) у его задач общий момент
+            # срабатывания, и они уходят одним сообщением
+            due_by_user = {}
+            for task_id, offset, fire_at in self.task_storage.deadline_index.pop_due(now):
+                task = self.task_storage.get_task(task_id)
+                if (
+                    not task
+                    or task.status != TaskStatus.PENDING
+                    or offset in task.reminders_sent
+                    or (task_id, offset) in self._in_flight
+                ):
+                    continue
+                due_by_user.setdefault(task.user_id, []).append((task, offset, fire_at))
+
+            for user_id, due in due_by_user.items():
+                # Напоминание, перенесённое из тихих часов или в дайджест, показывает фактический остаток
+                items = [
+                    (task, format_time_left((timestamp(task.deadline) - fire_at) // 60))
+                    for task, _, fire_at in due
+                ]
+                if len(items) > 1 and self._digest_enabled(user_id):
+                    messages = [(await self._send_digest(user_id, items), due)]
+                else:
+                    messages = [
+                        (await self._send_reminder(user_id, *item), [entry])
+                        for item, entry in zip(items, due)
+                    ]
+                # Отправленным напоминание считается после успешной отправки,
+                # а не постановки в очередь: иначе сбой отправки или рестарт
+                # с непустой очередью теряют его навсегда
+                for future, entries in messages:
+                    sent = [(task.id, offset) for task, offset, _ in entries]
+                    self._in_flight.update(sent)
+                    future.add_done_callback(partial(self._on_delivered, sent))
             
         except Exception as e:
             logger.error(f"Error checking deadlines: {e}")
+
+    def _digest_enabled(self, user_id: int) -> bool:
+        """Пользователь включил дайджест командой /reminders дайджест"""
+        return policy_for(self.user_storage.get_user(user_id)).digest_hour is not None
+
+    def _on_delivered(self, sent: list, future: asyncio.Future):
+        """Запоминает напоминания, если диспетчер отправил сообщение"""
+        self._in_flight.difference_update(sent)
+        if future.cancelled() or future.result() is None:
+            self._schedule_retry(sent)
+            return
+        for task_id, offset in sent:
+            self._failures.pop((task_id, offset), None)
+            task = self.task_storage.get_task(task_id)
+            if task is not None and offset not in task.reminders_sent:
+                self.task_storage.mark_reminder_sent(task, offset)
+        REMINDER_ITEMS.inc(amount=len(sent))
     
-    async def _send_reminder(self, user_id: int, task, time_left: str):
-        """Отправка напоминания пользователю"""
-        try:
-            await self.bot.bot.send_message(
-                text=f"⏰ **Напоминание о дедлайне!**\n\n"
-                     f"**Задание:** {task.title}\n"
-                     f"**Дедлайн:** {task.deadline.strftime('%d.%m.%Y в %H:%M')}\n"
-                     f"**Осталось:** {time_left}\n\n"
-                     f"Не забудьте выполнить задание вовремя! 💪",
-                user_id=user_id
+    def _schedule_retry(self, sent: list):
+        """Возвращает неотправленные напоминания в индекс с растущей паузой"""
+        now = time.time()
+        retried = 0
+        for key in sent:
+            failures = self._failures.get(key, 0) + 1
+            if failures > MAX_DELIVERY_RETRIES:
+                self._failures.pop(key, None)
+                continue
+            self._failures[key] = failures
+            self.task_storage.deadline_index.retry(*key, now + RETRY_DELAY * 2 ** (failures - 1))
+            retried += 1
+        logger.warning(f"Reminder delivery failed for {len(sent)} tasks; {retried} scheduled for retry")
+
+    async def _send_reminder(self, user_id: int, task, time_left: str) -> asyncio.Future:
+        """Постановка напоминания в очередь исходящих сообщений; future — результат отправки"""
+        deadline = to_local(task.deadline, user_zone(self.user_storage.get_user(user_id)))
+        future = self.dispatcher.enqueue(
+            user_id,
+            text=f"⏰ **Напоминание о дедлайне!**\n\n"
+                 f"**Задание:** {task.title}\n"
+                 f"**Дедлайн:** {deadline.strftime('%d.%m.%Y в %H:%M')}\n"
+                 f"**Осталось:** {time_left}\n\n"
+                 f"Не забудьте выполнить задание вовремя! 💪",
+        )
+        REMINDER_MESSAGES.inc("single")
+        logger.info(f"Queued reminder to user {user_id} for task {task.title}")
+        return future
+
+    async def _send_digest(self, user_id: int, items: list) -> asyncio.Future:
+        """Одно сообщение со всеми наступившими напоминаниями пользователя"""
+        zone = user_zone(self.user_storage.get_user(user_id))
+        items.sort(key=lambda item: item[0].deadline)
+        text = f"📋 **Дайджест дедлайнов: {len(items)}**\n\n"
+        for task, time_left in items:
+            deadline = to_local(task.deadline, zone)
+            text += (
+                f"• **{task.title}**\n"
+                f"   ⏰ {deadline.strftime('%d.%m.%Y в %H:%M')} | осталось {time_left}\n"
             )
-            logger.info(f"Sent reminder to user {user_id} for task {task.title}")
-        except Exception as e:
-            logger.error(f"Error sending reminder to user {user_id}: {e}")
+        text += "\nНе забудьте выполнить задания вовремя! 💪"
+        future = self.dispatcher.enqueue(user_id, text=text)
+        REMINDER_MESSAGES.inc("digest")
+        logger.info(f"Queued reminder digest to user {user_id} with {len(items)} tasks")
+        return future
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from database.timezones import now_utc
+from metrics import registry
+
+logger = logging.getLogger("max_focus_campus.sweeper")
+
+# Верхняя граница сна цикла просрочек (страховка от скачков системных часов)
+MAX_SLEEP = 300
+
+OVERDUE_TASKS = registry.counter(
+    "campus_tasks_overdue_total", "Pending tasks moved to overdue after their deadline"
+)
+ARCHIVED_RECORDS = registry.counter(
+    "campus_archived_records_total", "Records moved from the hot store to the archive", ["kind"]
+)
+
+
+class HistorySweeper:
+    """Уборка истории: просроченные задачи и перенос старых записей в архив.
+
+    Первый цикл спит до ближайшего срока из индекса дедлайнов и переводит
+    наступившие задачи в «просрочено». Второй раз в ``archive_interval`` секунд
+    переносит завершённые и просроченные задачи и завершённые сессии старше
+    ``archive_after_days`` дней в архив, пачками по ``batch`` записей.
+    """
+
+    def __init__(
+        self,
+        bot,
+        grace_minutes: int = 0,
+        archive_after_days: int = 30,
+        archive_interval: int = 86400,
+        batch: int = 5000,
+    ):
+        self.bot = bot
+        self.task_storage = getattr(bot, "task_storage", None)
+        self.focus_storage = getattr(bot, "focus_storage", None)
+        self.grace = grace_minutes * 60
+        self.archive_after = timedelta(days=archive_after_days)
+        self.archive_interval = archive_interval
+        self.batch = batch
+        self.is_running = False
+        self._tasks = []
+        self._wakeup = None
+
+    async def start(self):
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+        self.task_storage.deadline_index.add_listener(self._wakeup.set)
+        self._tasks = [
+            asyncio.create_task(self._overdue_loop()),
+            asyncio.create_task(self._archive_loop()),
+        ]
+        logger.info("History sweeper started")
+
+    async def stop(self):
+        self.is_running = False
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        logger.info("History sweeper stopped")
+
+    async def _overdue_loop(self):
+        while self.is_running:
+            try:
+                self.sweep_overdue()
+                await self._wait_for_next()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in overdue loop: {e}")
+                await asyncio.sleep(MAX_SLEEP)
+
+    async def _wait_for_next(self):
+        """Ожидание до ближайшего срока или до добавления новой задачи"""
+        delay = MAX_SLEEP
+        next_expiry = self.task_storage.deadline_index.next_expiry_time()
+        if next_expiry is not None:
+            delay = min(max(next_expiry + self.grace - time.time(), 0), MAX_SLEEP)
+
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def sweep_overdue(self, now: Optional[float] = None) -> int:
+        """Переводит в «просрочено» задачи, срок которых истёк к ``now``"""
+        now = time.time() if now is None else now
+        expired = self.task_storage.expire_overdue(now - self.grace)
+        if expired:
+            OVERDUE_TASKS.inc(amount=len(expired))
+            logger.info(f"Marked {len(expired)} tasks as overdue")
+        return len(expired)
+
+    async def _archive_loop(self):
+        while self.is_running:
+            try:
+                await self.archive_history()
+                await asyncio.sleep(self.archive_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in archive loop: {e}")
+                await asyncio.sleep(MAX_SLEEP)
+
+    async def archive_history(self) -> Dict[str, int]:
+        """Один проход архивации; возвращает число перенесённых записей по видам"""
+        before = now_utc() - self.archive_after
+        counts = {}
+        for kind, storage in (("tasks", self.task_storage), ("sessions", self.focus_storage)):
+            total = 0
+            # Кандидаты выбираются один раз за проход, дальше работа идёт пачками
+            candidates = storage.archive_candidates(before) if storage is not None and storage.archive else []
+            for start in range(0, len(candidates), self.batch):
+                archived, records, counters = storage.archive_batch(candidates[start:start + self.batch])
+                if not archived:
+                    continue
+                # Сжатие, fsync сегментов и сводки — в отдельном потоке; записи
+                # удаляются из горячего хранилища только после успешной записи
+                await asyncio.to_thread(storage.archive.write, kind, records, counters)
+                total += storage.drop_archived(archived, counters)
+            if total:
+                ARCHIVED_RECORDS.inc(kind, amount=total)
+            counts[kind] = total
+        if any(counts.values()):
+            logger.info(f"Archived history older than {before.isoformat()}: {counts}")
+        return counts
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+import time
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from metrics import registry
+
+CACHE_EVENTS = registry.counter(
+    "campus_cache_total", "Cache lookups and removals by result (hit, miss, expired, evicted)",
+    ["cache", "result"],
+)
+CACHE_HIT_RATIO = registry.gauge(
+    "campus_cache_hit_ratio", "Share of cache lookups served from the cache", ["cache"]
+)
+
+
+class TTLCache:
+    """Ограниченный кэш с истечением по времени и вытеснением по LRU.
+
+    Запись живёт ``ttl`` секунд с момента ``set``; при переполнении
+    сначала удаляются истёкшие записи, затем давно не использованные.
+    Если передан ``store`` (``load_all``/``save``/``delete``), каждое
+    изменение дублируется в него, а при создании кэш восстанавливает
+    неистёкшие записи — так ожидающие подтверждения переживают рестарт.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 10_000,
+        ttl: float = 3600,
+        store=None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self.clock = clock
+        # ключ -> (значение, момент истечения)
+        self._items: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._next_purge = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+        if store is not None:
+            self._restore()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _restore(self):
+        now = self.clock()
+        for key, value, expires_at in sorted(self.store.load_all(), key=lambda item: item[2]):
+            if expires_at <= now:
+                self.store.delete(key)
+                continue
+            self._items[key] = (value, expires_at)
+        while len(self._items) > self.maxsize:
+            key, _ = self._items.popitem(last=False)
+            self.store.delete(key)
+
+    def _remove(self, key, result: str):
+        del self._items[key]
+        if self.store is not None:
+            self.store.delete(key)
+        CACHE_EVENTS.inc(self.name, result)
+
+    def get(self, key) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            CACHE_EVENTS.inc(self.name, "miss")
+            self._update_hit_ratio()
+            return None
+
+        value, expires_at = item
+        if expires_at <= self.clock():
+            self.expired += 1
+            self._remove(key, "expired")
+            self._update_hit_ratio()
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        CACHE_EVENTS.inc(self.name, "hit")
+        self._update_hit_ratio()
+        return value
+
+    def _update_hit_ratio(self):
+        CACHE_HIT_RATIO.set(self.hits / (self.hits + self.misses + self.expired), self.name)
+
+    def set(self, key, value):
+        now = self.clock()
+        expires_at = now + self.ttl
+        self._items[key] = (value, expires_at)
+        self._items.move_to_end(key)
+        if self.store is not None:
+            self.store.save(key, value, expires_at)
+
+        if len(self._items) > self.maxsize:
+            self.purge_expired(now)
+        while len(self._items) > self.maxsize:
+            self.evicted += 1
+            self._remove(next(iter(self._items)), "evicted")
+
+    def pop(self, key) -> Optional[Any]:
+        """Извлекает значение и удаляет запись (None, если нет или истекла)"""
+        value = self.get(key)
+        if key in self._items:
+            del self._items[key]
+            if self.store is not None:
+                self.store.delete(key)
+        return value
+
+    def clear(self):
+        """Удаляет все записи и обнуляет счётчики"""
+        if self.store is not None:
+            for key in self._items:
+                self.store.delete(key)
+        self._items.clear()
+        self.hits = self.misses = self.expired = self.evicted = 0
+
+    def purge_expired(self, now: Optional[float] = None):
+        """Удаляет все истёкшие записи; полный проход не чаще раза в ttl/10"""
+        now = self.clock() if now is None else now
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.ttl / 10
+        for key in [key for key, (_, expires_at) in self._items.items() if expires_at <= now]:
+            self.expired += 1
+            self._remove(key, "expired")
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses + self.expired
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
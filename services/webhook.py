@@ -0,0 +1,164 @@
+import asyncio
+from contextvars import ContextVar
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from aiohttp import web
+
+from metrics import registry
+
+logger = logging.getLogger("max_focus_campus.webhook")
+
+SECRET_HEADER = "X-Max-Bot-Api-Secret"
+
+WEBHOOK_UPDATES = registry.counter(
+    "campus_webhook_updates_total", "Webhook updates by result (accepted, rejected)", ["result"]
+)
+
+# Задачи, которые aiomax создаёт для обработчиков внутри handle_update
+_handler_tasks: ContextVar[Optional[List[asyncio.Task]]] = ContextVar(
+    "webhook_handler_tasks", default=None
+)
+
+
+def _tracking_task_factory(loop, coro, **kwargs):
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    tasks = _handler_tasks.get()
+    if tasks is not None:
+        tasks.append(task)
+    return task
+
+
+class WebhookServer:
+    """Приём апдейтов MAX API через WebHook.
+
+    Запрос подтверждается сразу после постановки апдейта в очередь
+    ограниченного размера; апдейты обрабатывают ``workers`` воркеров.
+    ``Bot.handle_update`` только запускает обработчики отдельными задачами,
+    поэтому воркер дожидается и их — одновременно выполняется не больше
+    ``workers`` апдейтов. Если очередь заполнена, сервер отвечает 503,
+    и MAX повторит доставку позже.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[dict], Awaitable],
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        path: str = "/webhook",
+        secret: Optional[str] = None,
+        workers: int = 16,
+        queue_size: int = 1000,
+    ):
+        self.handle = handle
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret
+        self.workers = workers
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = []
+        self._runner: Optional[web.AppRunner] = None
+        # Маршруты можно дополнить до start() (например, /metrics)
+        self.app = web.Application()
+        self.app.router.add_post(self.path, self._receive)
+
+        self.received = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.handle_time_max = 0.0
+        registry.gauge(
+            "campus_webhook_queue_depth", "Webhook updates waiting for a worker",
+            callback=lambda: self._queue.qsize(),
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "received": self.received,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "handle_time_max": self.handle_time_max,
+        }
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() is None:
+            loop.set_task_factory(_tracking_task_factory)
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(
+            f"Webhook server listening on {self.host}:{self.port}{self.path} "
+            f"with {self.workers} workers"
+        )
+
+    async def stop(self, timeout: float = 10.0):
+        """Перестаёт принимать запросы и дообрабатывает очередь (не дольше ``timeout``)"""
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self.queue_depth} unprocessed webhook updates")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Webhook server stopped: {self.metrics()}")
+
+    async def _receive(self, request: web.Request) -> web.Response:
+        if self.secret and request.headers.get(SECRET_HEADER) != self.secret:
+            return web.Response(status=403)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            WEBHOOK_UPDATES.inc("rejected")
+            return web.Response(status=503)
+        self.received += 1
+        WEBHOOK_UPDATES.inc("accepted")
+        return web.json_response({"success": True})
+
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            started = time.monotonic()
+            tasks = []
+            token = _handler_tasks.set(tasks)
+            try:
+                await self.handle(update)
+            except Exception as e:
+                self.failed += 1
+                logger.exception(e)
+            finally:
+                _handler_tasks.reset(token)
+
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    self.failed += 1
+                    logger.error(f"Error handling {update.get('update_type')} update: {result!r}")
+
+            self.processed += 1
+            self.handle_time_max = max(self.handle_time_max, time.monotonic() - started)
+            self._queue.task_done()
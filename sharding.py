@@ -0,0 +1,238 @@
+"""Запуск бота несколькими процессами с разбиением пользователей по шардам.
+
+``SHARDS=4 python sharding.py`` поднимает supervisor: он один опрашивает
+MAX API (``/updates``) и передаёт каждый апдейт воркеру, которому
+принадлежит пользователь (``user_id % SHARDS``). Воркеры — обычные
+``python main.py`` с переменной ``SHARD_INDEX``: у каждого свои хранилища
+в ``DATA_DIR/shard-<n>``, FSM-состояния, таймеры и напоминания.
+Канал до воркера — его stdin, по одному апдейту в JSON на строку.
+
+Существующие данные перед первым запуском раскладываются по шардам:
+``python -m database.partition --shards 4``.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from typing import List, Optional
+
+import aiohttp
+from aiomax import Bot
+
+from config import Config
+
+logger = logging.getLogger("max_focus_campus.sharding")
+
+LAYOUT_FILE = "shards.json"
+DATA_FILES = (
+    "users.json", "tasks.json", "focus_sessions.json", "fsm_states.json", "pending_deadlines.json",
+    # Архив истории тоже хранится по шардам: data/shard-<n>/archive
+    "archive",
+)
+# Пауза перед перезапуском упавшего воркера
+RESTART_DELAY = 1.0
+
+
+def shard_for(user_id: int, shards: int) -> int:
+    return user_id % shards
+
+
+def shard_data_dir(data_root: str, index: int) -> str:
+    return os.path.join(data_root, f"shard-{index}")
+
+
+def update_user_id(update: dict) -> Optional[int]:
+    """Пользователь, к которому относится апдейт MAX API"""
+    if "callback" in update:
+        return update["callback"]["user"]["user_id"]
+    if "message" in update:
+        sender = update["message"].get("sender")
+        if sender:
+            return sender["user_id"]
+    if "user" in update:
+        return update["user"]["user_id"]
+    return update.get("user_id")
+
+
+def check_layout(data_root: str, shards: int):
+    """Проверяет, что данные разложены под это число шардов.
+
+    Для нового развёртывания записывает ``shards.json``; при данных
+    в корне ``data_root`` или другом числе шардов бросает ``RuntimeError``.
+    """
+    path = os.path.join(data_root, LAYOUT_FILE)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            layout = json.load(f)
+        if layout.get("shards") != shards:
+            raise RuntimeError(
+                f"{data_root} is partitioned into {layout.get('shards')} shards, "
+                f"SHARDS={shards}; re-partitioning is not supported"
+            )
+        return
+
+    if any(os.path.exists(os.path.join(data_root, name)) for name in DATA_FILES):
+        raise RuntimeError(
+            f"{data_root} contains unpartitioned data; run "
+            f"`python -m database.partition --shards {shards}` first"
+        )
+    os.makedirs(data_root, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"shards": shards}, f)
+
+
+class ShardWorker:
+    """Процесс-воркер одного шарда и канал до него"""
+
+    def __init__(self, index: int, shards: int):
+        self.index = index
+        self.shards = shards
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.forwarded = 0
+        self.dropped = 0
+
+    async def spawn(self):
+        env = dict(os.environ, SHARD_INDEX=str(self.index), SHARDS=str(self.shards))
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "main.py",
+            stdin=asyncio.subprocess.PIPE,
+            env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        logger.info(f"Shard {self.index} worker started (pid {self.process.pid})")
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def send(self, update: dict):
+        if not self.alive:
+            self.dropped += 1
+            logger.error(f"Shard {self.index} is down, dropping {update.get('update_type')} update")
+            return
+        try:
+            self.process.stdin.write(json.dumps(update, ensure_ascii=False).encode() + b"\n")
+            # Если воркер не успевает, опрос ждёт освобождения буфера канала
+            await self.process.stdin.drain()
+            self.forwarded += 1
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.dropped += 1
+            logger.error(f"Error forwarding update to shard {self.index}: {e!r}")
+
+    async def close(self, timeout: float):
+        """Закрывает канал (воркер завершается сам) и ждёт выхода процесса"""
+        if not self.alive:
+            return
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shard {self.index} did not stop in {timeout}s, terminating")
+            self.process.terminate()
+            await self.process.wait()
+
+
+class ShardSupervisor:
+    """Единственный опрос обновлений и маршрутизация по воркерам"""
+
+    def __init__(self, bot: Bot, shards: int):
+        self.bot = bot
+        self.shards = shards
+        self.workers: List[ShardWorker] = [ShardWorker(i, shards) for i in range(shards)]
+        self.is_running = False
+        self._watchers = []
+
+    async def start(self):
+        self.is_running = True
+        for worker in self.workers:
+            await worker.spawn()
+        self._watchers = [asyncio.create_task(self._watch(worker)) for worker in self.workers]
+        logger.info(f"Supervisor started with {self.shards} shards")
+
+    async def stop(self, timeout: float = 30.0):
+        self.is_running = False
+        self.bot.polling = False
+        for watcher in self._watchers:
+            watcher.cancel()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+        await asyncio.gather(*(worker.close(timeout) for worker in self.workers))
+        logger.info(
+            "Supervisor stopped: "
+            + ", ".join(
+                f"shard {w.index}: {w.forwarded} forwarded, {w.dropped} dropped"
+                for w in self.workers
+            )
+        )
+
+    async def _watch(self, worker: ShardWorker):
+        """Перезапускает воркер, если он завершился сам"""
+        while self.is_running:
+            returncode = await worker.process.wait()
+            if not self.is_running:
+                return
+            logger.error(f"Shard {worker.index} exited with code {returncode}, restarting")
+            await asyncio.sleep(RESTART_DELAY)
+            await worker.spawn()
+
+    async def route(self, update: dict):
+        user_id = update_user_id(update)
+        # Апдейты без пользователя (служебные события чатов) обрабатывает шард 0
+        index = shard_for(user_id, self.shards) if user_id is not None else 0
+        await self.workers[index].send(update)
+
+    async def poll(self):
+        """Цикл опроса ``/updates`` (как ``Bot.start_polling``, но без обработчиков)"""
+        self.bot.polling = True
+        session = aiohttp.ClientSession(
+            headers={"Authorization": self.bot.access_token},
+            base_url=self.bot.api_url,
+        )
+        async with session:
+            self.bot.session = session
+            await self.bot.get_me()
+            logger.info(f"Polling for @{self.bot.username} in supervisor")
+
+            while self.bot.polling:
+                try:
+                    updates = await self.bot.get_updates()
+                    for update in updates.get("updates", []):
+                        await self.route(update)
+                except asyncio.CancelledError:
+                    break
+                except Exception as e:
+                    logger.exception(e)
+                    await asyncio.sleep(3)
+        self.bot.session = None
+
+
+async def main():
+    check_layout(Config.DATA_DIR, Config.SHARDS)
+    supervisor = ShardSupervisor(Bot(access_token=Config.BOT_TOKEN), Config.SHARDS)
+
+    loop = asyncio.get_running_loop()
+    poll_task = None
+    for sig in [signal.SIGTERM, signal.SIGINT]:
+        loop.add_signal_handler(sig, lambda: poll_task and poll_task.cancel())
+
+    await supervisor.start()
+    try:
+        poll_task = asyncio.create_task(supervisor.poll())
+        await poll_task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await supervisor.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('supervisor.log', encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+    asyncio.run(main())
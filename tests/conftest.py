@@ -0,0 +1,10 @@
+"""Окружение тестов: задаётся до импорта модулей бота.
+
+``database`` создаёт хранилища при импорте, поэтому каталог данных —
+временный, а не data/ из репозитория.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "test-token")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="campus-tests-"))
@@ -0,0 +1,155 @@
+"""CalendarSyncService против локального сервера лент: 304/ETag, общая загрузка, битые VEVENT."""
+import asyncio
+import hashlib
+import tempfile
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+
+from database.storage import TaskStorage, UserStorage
+from services.calendar_sync import CALENDAR_TAG, CalendarSyncService
+
+
+def vevent(uid: str, days: int, summary: str = "Контрольная по физике") -> list:
+    start = datetime.now(timezone.utc) + timedelta(days=days)
+    return [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTART:{start:%Y%m%dT%H%M%S}Z",
+        f"SUMMARY:{summary}",
+        "END:VEVENT",
+    ]
+
+
+def calendar(*events: list, complete: bool = True) -> bytes:
+    """Лента из событий; ``complete=False`` — оборванная, без END:VCALENDAR"""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for event in events:
+        lines += event
+    if complete:
+        lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+class FeedServer:
+    """Отдаёт ``body`` с ETag и отвечает 304 на условный запрос с тем же ETag"""
+
+    def __init__(self, body: bytes, delay: float = 0):
+        self.body = body
+        self.delay = delay
+        self.full = 0
+        self.not_modified = 0
+        self.conditional = []
+
+    @property
+    def etag(self) -> str:
+        return '"' + hashlib.md5(self.body).hexdigest() + '"'
+
+    async def handle(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.delay)
+        self.conditional.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == self.etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": self.etag})
+        self.full += 1
+        return web.Response(body=self.body, content_type="text/calendar", headers={"ETag": self.etag})
+
+
+async def _with_service(server: FeedServer, users: int, scenario):
+    app = web.Application()
+    app.router.add_get("/group.ics", server.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        user_storage = UserStorage(data_dir)
+        task_storage = TaskStorage(data_dir)
+        for user_id in range(1, users + 1):
+            user = user_storage.create_user(user_id)
+            user.calendar_url = f"http://127.0.0.1:{port}/group.ics"
+        service = CalendarSyncService(SimpleNamespace(user_storage=user_storage, task_storage=task_storage))
+        service.session = aiohttp.ClientSession()
+        try:
+            return await scenario(service, task_storage)
+        finally:
+            await service.session.close()
+            await runner.cleanup()
+
+
+def _expire(service: CalendarSyncService):
+    """Следующий цикл обновления: кэш разобранных лент устарел"""
+    for feed in service._feeds.values():
+        feed["fetched_at"] -= service.interval
+
+
+def test_unchanged_feed_is_requested_conditionally():
+    server = FeedServer(calendar(vevent("a@campus", 3), vevent("b@campus", 5)))
+
+    async def scenario(service, task_storage):
+        first = await service.sync_user(1)
+        _expire(service)
+        second = await service.sync_user(1)
+        return first, second, len(task_storage.tasks)
+
+    first, second, tasks = asyncio.run(_with_service(server, 1, scenario))
+
+    assert first["status"] == "modified" and first["added"] == 2
+    assert second == {"status": "not_modified"}
+    assert server.full == 1 and server.not_modified == 1
+    assert server.conditional == [None, server.etag]
+    assert tasks == 2
+
+
+def test_concurrent_subscribers_share_one_download():
+    server = FeedServer(calendar(vevent("a@campus", 3)), delay=0.05)
+
+    async def scenario(service, task_storage):
+        results = await asyncio.gather(*(service.sync_user(user_id) for user_id in range(1, 6)))
+        return results, len(task_storage.tasks)
+
+    results, tasks = asyncio.run(_with_service(server, 5, scenario))
+
+    assert server.full == 1
+    assert [result["added"] for result in results] == [1] * 5
+    assert tasks == 5
+
+
+def test_malformed_events_are_skipped():
+    no_uid = [line for line in vevent("x", 4) if not line.startswith("UID")]
+    bad_date = ["BEGIN:VEVENT", "UID:bad-date@campus", "DTSTART:2026XX01T1000", "SUMMARY:Зачёт", "END:VEVENT"]
+    no_summary = [line for line in vevent("no-summary@campus", 4) if not line.startswith("SUMMARY")]
+    unterminated = ["BEGIN:VEVENT", "UID:cut@campus", "DTSTART:20300101T100000Z", "SUMMARY:Обрыв"]
+    server = FeedServer(calendar(
+        vevent("ok@campus", 3), no_uid, bad_date, ["garbage without colon"], no_summary, unterminated,
+        complete=False,
+    ))
+
+    async def scenario(service, task_storage):
+        result = await service.sync_user(1)
+        return result, [task.title for task in task_storage.tasks.values()]
+
+    result, titles = asyncio.run(_with_service(server, 1, scenario))
+
+    assert result["status"] == "modified" and result["added"] == 1
+    assert titles == ["Контрольная по физике"]
+
+
+def test_events_removed_from_feed_are_dropped():
+    server = FeedServer(calendar(vevent("a@campus", 3), vevent("b@campus", 5)))
+
+    async def scenario(service, task_storage):
+        await service.sync_user(1)
+        server.body = calendar(vevent("a@campus", 3))
+        _expire(service)
+        result = await service.sync_user(1)
+        return result, list(task_storage.tasks.values())
+
+    result, tasks = asyncio.run(_with_service(server, 1, scenario))
+
+    assert result["removed"] == 1
+    assert len(tasks) == 1 and CALENDAR_TAG in tasks[0].tags
@@ -0,0 +1,94 @@
+"""MessageDispatcher с подставной функцией отправки: повторы, отказы, лимит частоты."""
+import asyncio
+import time
+
+from aiomax import exceptions
+
+from services.dispatcher import MessageDispatcher
+
+
+class FakeSender:
+    """send_message, падающий ``failures`` раз подряд для каждого пользователя"""
+
+    def __init__(self, failures: int = 0, error: Exception = None):
+        self.failures = failures
+        self.error = error or ConnectionError("network is down")
+        self.calls = []
+        self.delivered = []
+
+    async def __call__(self, user_id: int, text: str):
+        self.calls.append((user_id, text, time.monotonic()))
+        if sum(call[0] == user_id for call in self.calls) <= self.failures:
+            raise self.error
+        self.delivered.append((user_id, text))
+        return (user_id, text)
+
+
+async def _dispatch(sender: FakeSender, messages, **options) -> list:
+    dispatcher = MessageDispatcher(sender, **options)
+    await dispatcher.start()
+    try:
+        futures = [dispatcher.enqueue(user_id, text=text) for user_id, text in messages]
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout=5)
+    finally:
+        await dispatcher.stop()
+    return results, dispatcher
+
+
+def test_retries_transient_errors_until_sent():
+    sender = FakeSender(failures=2)
+    results, dispatcher = asyncio.run(_dispatch(sender, [(1, "hi")], max_retries=3, backoff=0.01))
+
+    assert results == [(1, "hi")]
+    assert len(sender.calls) == 3
+    assert dispatcher.metrics()["retries"] == 2
+    assert dispatcher.sent == 1 and dispatcher.failed == 0
+
+
+def test_gives_up_after_max_retries():
+    sender = FakeSender(failures=10)
+    results, dispatcher = asyncio.run(_dispatch(sender, [(1, "hi")], max_retries=2, backoff=0.01))
+
+    assert results == [None]
+    assert len(sender.calls) == 3
+    assert dispatcher.failed == 1 and dispatcher.sent == 0
+
+
+def test_non_retryable_error_is_not_repeated():
+    sender = FakeSender(failures=10, error=exceptions.ChatNotFound("chat not found"))
+    results, dispatcher = asyncio.run(_dispatch(sender, [(1, "hi")], max_retries=3, backoff=0.01))
+
+    assert results == [None]
+    assert len(sender.calls) == 1
+    assert dispatcher.retries == 0 and dispatcher.failed == 1
+
+
+def test_backoff_grows_between_attempts():
+    sender = FakeSender(failures=2)
+    asyncio.run(_dispatch(sender, [(1, "hi")], max_retries=3, backoff=0.05))
+
+    moments = [moment for _, _, moment in sender.calls]
+    assert moments[1] - moments[0] >= 0.05
+    assert moments[2] - moments[1] >= 0.1
+
+
+def test_rate_limit_spaces_sends():
+    sender = FakeSender()
+    messages = [(user_id, "hi") for user_id in range(1, 7)]
+    started = time.monotonic()
+    results, _ = asyncio.run(_dispatch(sender, messages, concurrency=6, rate=20, burst=1))
+    elapsed = time.monotonic() - started
+
+    assert all(results)
+    # Запас в один токен, дальше 20 в секунду: пять ожиданий по 50 мс
+    assert elapsed >= 0.2
+
+
+def test_keeps_per_user_order():
+    sender = FakeSender()
+    messages = [(user_id, f"{user_id}-{n}") for n in range(5) for user_id in (1, 2, 3)]
+    asyncio.run(_dispatch(sender, messages, concurrency=3, rate=1000, burst=1000))
+
+    for user_id in (1, 2, 3):
+        texts = [text for uid, text in sender.delivered if uid == user_id]
+        assert texts == [f"{user_id}-{n}" for n in range(5)]